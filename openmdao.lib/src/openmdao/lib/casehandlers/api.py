@@ -3,12 +3,21 @@ iterators in the standard library.
 """
 
 from openmdao.lib.casehandlers.db import DBCaseIterator, DBCaseRecorder, \
-                                         case_db_to_dict
+                                         case_db_to_dict, case_db_to_arrays, \
+                                         case_db_chunks, case_db_array_query, \
+                                         migrate_db
 
 from openmdao.lib.casehandlers.listcaserecorder import ListCaseRecorder
 from openmdao.lib.casehandlers.listcaseiter import ListCaseIterator
 
 from openmdao.lib.casehandlers.dumpcaserecorder import DumpCaseRecorder
 
+from openmdao.lib.casehandlers.chunkedcases import ChunkedCaseRecorder, \
+                                                   ChunkedCaseIterator
+
 from openmdao.lib.casehandlers.caseset import CaseArray, CaseSet, caseiter_to_caseset
 
+from openmdao.lib.casehandlers.pipeline import CasePipeline
+
+from openmdao.lib.casehandlers.fanout import FanOutCaseRecorder
+
@@ -1,11 +1,183 @@
 
-from openmdao.main.case import Case
+from cPickle import dumps, HIGHEST_PROTOCOL
+
+import numpy
+
+from openmdao.main.case import Case, CaseBlock
+
+
+def _dtype_for(value):
+    """Return the dtype of a column for holding `value`."""
+    if isinstance(value, (bool, numpy.bool_)):
+        return numpy.dtype(bool)
+    if isinstance(value, (int, numpy.integer)):
+        return numpy.dtype(numpy.int64)
+    if isinstance(value, (float, numpy.floating)):
+        return numpy.dtype(numpy.float64)
+    return numpy.dtype(object)
+
+def _common_dtype(dtype, value):
+    """Return the dtype of a column of `dtype` that must also hold `value`,
+    which is `dtype` if `value` fits.
+    """
+    if dtype.kind == 'O':
+        return dtype
+    vtype = _dtype_for(value)
+    if vtype == dtype or (dtype.kind == 'f' and vtype.kind == 'i'):
+        return dtype
+    if dtype.kind == 'i' and vtype.kind == 'f':
+        return vtype
+    return numpy.dtype(object)
+
+
+class _Columns(object):
+    """Rows of values, stored as one numpy array per column.  Columns of
+    ints, floats or bools have that dtype, others are object arrays.  The
+    arrays are grown by doubling.  A count of each distinct row, keyed by
+    the bytes of its numeric values and its other values, is kept so that
+    membership tests don't have to compare every row.
+    """
+    
+    def __init__(self, ncols, rows=()):
+        self._cols = [None] * ncols
+        self._size = 0
+        self._rowkeys = []  # key of each row
+        self._counts = {}   # row key -> number of rows with that key
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._size
+        if idx < 0 or idx >= self._size:
+            raise IndexError('row index out of range')
+        return tuple([col[idx] if col.dtype.kind == 'O' else col[idx].item()
+                      for col in self._cols])
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
+
+    def column(self, idx):
+        """Return the values in column `idx`, as a view of our storage."""
+        col = self._cols[idx]
+        if col is None:
+            return numpy.array([])
+        return col[:self._size]
+
+    def copy(self):
+        """Return a copy of this object."""
+        cols = _Columns(0)
+        cols._cols = [None if col is None else col[:self._size].copy()
+                          for col in self._cols]
+        cols._size = self._size
+        cols._rowkeys = self._rowkeys[:]
+        cols._counts = self._counts.copy()
+        return cols
+
+    def append(self, row):
+        """Add a row at the end."""
+        size = self._size
+        for i, (col, value) in enumerate(zip(self._cols, row)):
+            if col is None:
+                col = self._cols[i] = numpy.empty(4, _dtype_for(value))
+            else:
+                dtype = _common_dtype(col.dtype, value)
+                if dtype != col.dtype:
+                    col = self._cols[i] = col.astype(dtype)
+                    self._rekey()
+                if size == len(col):
+                    newcol = numpy.empty(2 * size, col.dtype)
+                    newcol[:size] = col[:size]
+                    col = self._cols[i] = newcol
+            col[size] = value
+        self._size += 1
+        key = self._key(size)
+        self._rowkeys.append(key)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def pop(self, idx=-1):
+        """Remove and return the row at `idx`."""
+        row = self[idx]
+        if idx < 0:
+            idx += self._size
+        for col in self._cols:
+            col[idx:self._size-1] = col[idx+1:self._size]
+        self._size -= 1
+        key = self._rowkeys.pop(idx)
+        self._counts[key] -= 1
+        if not self._counts[key]:
+            del self._counts[key]
+        return row
+
+    def remove(self, row):
+        """Remove the first row equal to `row`. Raises ValueError if
+        there isn't one.
+        """
+        key = self.row_key(row)
+        if key is None or key not in self._counts:
+            raise ValueError('row not found')
+        self.pop(self._rowkeys.index(key))
+
+    def contains(self, row):
+        """Return True if there's a row equal to `row`."""
+        key = self.row_key(row)
+        return key is not None and key in self._counts
+
+    def row_key(self, row):
+        """Return the key for `row`, or None if the values of `row` don't
+        fit in our columns (so it can't be one of our rows).
+        """
+        if self._size == 0:
+            return None
+        numeric = []
+        others = []
+        for col, value in zip(self._cols, row):
+            if col.dtype.kind == 'O':
+                others.append(_hashable(value))
+            elif _common_dtype(col.dtype, value) != col.dtype:
+                return None
+            else:
+                numeric.append(numpy.array(value, col.dtype).tostring())
+        return (''.join(numeric), tuple(others))
+
+    def _key(self, idx):
+        """Return the key for row `idx`."""
+        numeric = []
+        others = []
+        for col in self._cols:
+            if col.dtype.kind == 'O':
+                others.append(_hashable(col[idx]))
+            else:
+                numeric.append(col[idx:idx+1].tostring())
+        return (''.join(numeric), tuple(others))
+
+    def _rekey(self):
+        """Recompute row keys after the dtype of a column changes."""
+        self._rowkeys = [self._key(i) for i in range(self._size)]
+        self._counts = {}
+        for key in self._rowkeys:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+
+def _hashable(value):
+    """Return `value` if it's hashable, else its pickle."""
+    try:
+        hash(value)
+    except TypeError:
+        return dumps(value, HIGHEST_PROTOCOL)
+    return value
+
 
 class CaseArray(object):
     """A CaseRecorder/CaseIterator containing Cases having the same set of
     input/output strings but different data. Cases are not necessarily unique.
     """
-    def __init__(self, obj=None, parent_uuid=None, names=None):
+    def __init__(self, obj=None, parent_uuid=None, names=None,
+                 columnar=False):
         """
         obj: dict, Case, or None
             if obj is a dict, it is assumed to contain all var names/exprs as keys, with
@@ -25,12 +197,18 @@ class CaseArray(object):
             names/expressions that the Cases will contain. This is useful if you
             only want this container to keep track of some subset of the contents
             of Cases that are recorded in it.
+            
+        columnar: bool
+            If True, the values are stored in a numpy array per name, and
+            indexing with a name returns a view of that array rather than a
+            list.  This is much faster for large numbers of Cases.
         """
         self._parent_uuid = parent_uuid
+        self._columnar = columnar
         if names is None:
-            self._names = []
+            self._set_names([])
         else:
-            self._names = names[:]
+            self._set_names(names)
         self._values = []
         if isinstance(obj, dict):
             self._add_dict_cases(obj)
@@ -42,11 +220,22 @@ class CaseArray(object):
             raise TypeError("obj must be a dict, a Case, or None")
     
     def copy(self):
-        ca = CaseArray(parent_uuid=self._parent_uuid, names=self._names)
-        ca._values = self._values[:]
+        ca = CaseArray(parent_uuid=self._parent_uuid, names=self._names,
+                       columnar=self._columnar)
+        ca._values = self._copy_values()
         ca._split_idx = self._split_idx
         return ca
         
+    def _copy_values(self):
+        if isinstance(self._values, _Columns):
+            return self._values.copy()
+        return self._values[:]
+        
+    def _set_names(self, names):
+        self._names = names[:]
+        self._name_idx = dict([(name, i) for i, name in enumerate(names)])
+        self._block = None
+        
     def remove(self, case):
         """Remove the given Case from this CaseArray."""
         try:
@@ -62,7 +251,7 @@ class CaseArray(object):
                 if name not in dct:
                     raise KeyError("'%s' is not a member of the dict" % name)
         else:
-            self._names = dct.keys()
+            self._set_names(dct.keys())
         self._split_idx = len(self._names) # treat all names as inputs
         biglist = []
         for key in self._names:
@@ -101,7 +290,7 @@ class CaseArray(object):
             names.extend(case.keys(iotype='out'))
             tmp.extend(case.values(iotype='out'))
 
-        self._names = names
+        self._set_names(names)
         self._add_values(tmp)
         
     def record(self, case):
@@ -126,9 +315,13 @@ class CaseArray(object):
         """
         if isinstance(key, basestring): # return all of the values for the given name
             try: 
-                idx = self._names.index(key)
-            except ValueError as err: 
+                idx = self._name_idx[key]
+            except KeyError: 
                 raise KeyError("CaseSet has no input or outputs named %s"%key )
+            if self._columnar:
+                if isinstance(self._values, _Columns):
+                    return self._values.column(idx)
+                return numpy.array([])
             return [lst[idx] for lst in self._values]
         else:  # key is the case numbe
             return self._case_from_values(self._values[key])
@@ -136,11 +329,14 @@ class CaseArray(object):
     
             
     def _case_from_values(self, values):
-        return Case(inputs=[(n,v) for n,v in zip(self._names[0:self._split_idx],
-                                                 values[0:self._split_idx])],
-                    outputs=[(n,v) for n,v in zip(self._names[self._split_idx:],
-                                                  values[self._split_idx:])],
-                    parent_uuid=self._parent_uuid)
+        # All of our Cases have the same names, so they're made by a
+        # CaseBlock that handles the names only once.
+        block = self._block
+        if block is None or len(block.inputs) != self._split_idx:
+            block = self._block = CaseBlock(self._names[0:self._split_idx],
+                                            outputs=self._names[self._split_idx:],
+                                            parent_uuid=self._parent_uuid)
+        return block.make_case(values)
         
     def _get_case_data(self, case):
         """Return a list of values for the case in the same order as our values.
@@ -152,6 +348,11 @@ class CaseArray(object):
             raise KeyError("input or output is missing from case: %s" % str(err))
         
     def _add_values(self, vals):
+        self._append_values(vals)
+        
+    def _append_values(self, vals):
+        if self._columnar and not isinstance(self._values, _Columns):
+            self._values = _Columns(len(vals))
         self._values.append(vals)
 
     def __len__(self):
@@ -164,6 +365,8 @@ class CaseArray(object):
             values = self._get_case_data(case)
         except KeyError:
             return False
+        if isinstance(self._values, _Columns):
+            return self._values.contains(values)
         for val in self._values:
             if val == values:
                 return True
@@ -195,7 +398,8 @@ class CaseSet(CaseArray):
     """A CaseRecorder/CaseIterator containing Cases having the same set of
     input/output strings but different data.  All Cases in the set are unique.
     """
-    def __init__(self, obj=None, parent_uuid=None, names=None):
+    def __init__(self, obj=None, parent_uuid=None, names=None,
+                 columnar=False):
         """
         obj: dict, Case, or None
             if obj is a dict, it is assumed to contain all var names as keys, with
@@ -215,13 +419,19 @@ class CaseSet(CaseArray):
             names/expressions that the Cases will contain. This is useful if you
             only want this container to keep track of some subset of the contents
             of Cases that are recorded in it.
+            
+        columnar: bool (optional)
+            If True, the values are stored in a numpy array per name, and
+            indexing with a name returns a view of that array rather than a
+            list.
         """
         self._tupset = set()
-        super(CaseSet, self).__init__(obj, parent_uuid, names)
+        super(CaseSet, self).__init__(obj, parent_uuid, names, columnar)
 
     def copy(self):
-        cs = CaseSet(parent_uuid=self._parent_uuid, names=self._names)
-        cs._values = self._values[:]
+        cs = CaseSet(parent_uuid=self._parent_uuid, names=self._names,
+                     columnar=self._columnar)
+        cs._values = self._copy_values()
         cs._tupset = self._tupset.copy()
         cs._split_idx = self._split_idx
         return cs
@@ -230,7 +440,7 @@ class CaseSet(CaseArray):
         tup = tuple(vals)
         if tup not in self._tupset:
             self._tupset.add(tup)
-            self._values.append(tup)
+            self._append_values(tup)
 
     def __contains__(self, case):
         if not isinstance(case, Case):
@@ -242,9 +452,12 @@ class CaseSet(CaseArray):
         return values in self._tupset
     
     def _make_case_set(self, tupset):
-        cs = CaseSet(parent_uuid=self._parent_uuid)
-        cs._names = self._names[:]
-        cs._values = list(tupset)
+        cs = CaseSet(parent_uuid=self._parent_uuid, names=self._names,
+                     columnar=self._columnar)
+        if self._columnar and tupset:
+            cs._values = _Columns(len(self._names), tupset)
+        else:
+            cs._values = list(tupset)
         cs._tupset = tupset
         cs._split_idx = self._split_idx
         return cs
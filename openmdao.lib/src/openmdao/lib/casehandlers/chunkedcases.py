@@ -0,0 +1,327 @@
+"""
+A case recorder and iterator that keep Cases in an append-only binary file
+holding chunks of Cases.  Within a chunk, the values of each variable
+are stored together as one dataset, so numeric array values of a
+variable can be read across Cases directly from a memory map of the file
+without reading the rest of the data.
+
+The file is a header followed by chunk records.  Each record is a length
+followed by a pickled description of the chunk (its Cases, and the
+dtype, shape and location of each dataset) and the datasets themselves.
+Numeric values (floats, ints, and numeric numpy arrays) are stored as raw
+data, aligned within the file.  Other values, and the values of a variable
+whose type or shape varies within a chunk, are pickled.  A record is
+written with a single write, and a reader ignores a record that isn't
+complete, so a file can be read while a run is still appending to it,
+and a file left by a run that died contains every chunk written before
+that.
+"""
+
+import mmap
+import os
+import struct
+from cPickle import dumps, loads, HIGHEST_PROTOCOL
+
+import numpy
+from numpy import ndarray
+
+from openmdao.main.interfaces import implements, ICaseRecorder, ICaseIterator
+from openmdao.main.case import Case
+
+__all__ = ['ChunkedCaseRecorder', 'ChunkedCaseIterator']
+
+_MAGIC = 'OMCHUNK\0'
+_VERSION = 1
+_HEADER = struct.Struct('<8sI')
+# Each record starts with the length of the record (including this), and
+# the length of the pickled chunk description that follows.
+_RECORD = struct.Struct('<QQ')
+# Alignment of records and datasets in the file.
+_ALIGN = 16
+
+
+def _pad(size):
+    """Return the number of bytes needed to align `size`."""
+    return -size % _ALIGN
+
+
+def _dataset_type(value):
+    """Return (dtype, shape, is_scalar) describing how `value` is stored,
+    or None if it must be pickled.
+    """
+    if isinstance(value, ndarray):
+        if value.dtype.kind in 'biufc':
+            return (value.dtype.str, value.shape, False)
+    elif type(value) in (float, int):
+        return (numpy.dtype(type(value)).str, (), True)
+    return None
+
+
+class ChunkedCaseRecorder(object):
+    """Records Cases to an append-only binary file, `chunk_size` Cases at a
+    time. Cases not yet written are written by :meth:`flush`,
+    :meth:`close` and :meth:`get_iterator`.  If `append` is True, Cases
+    are added to an existing file, otherwise the file is overwritten.  If
+    `fsync` is True, each chunk is forced to disk after it's written.
+    """
+
+    implements(ICaseRecorder)
+
+    def __init__(self, filename, chunk_size=100, append=False, fsync=False):
+        self.filename = filename
+        self.chunk_size = max(chunk_size, 1)
+        self.fsync = fsync
+        self._pending = []
+        if append and os.path.exists(filename) and os.path.getsize(filename):
+            # Drop anything after the last complete record, which would be
+            # left if a previous run died while writing.
+            end = _scan(filename)[1]
+            self._file = open(filename, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(filename, 'wb')
+            header = _HEADER.pack(_MAGIC, _VERSION)
+            self._file.write(header + '\0' * _pad(len(header)))
+            self._file.flush()
+
+    def record(self, case):
+        """Record the given Case."""
+        if self._file is None:
+            raise RuntimeError('ChunkedCaseRecorder for %s has been closed'
+                               % self.filename)
+        info = (case.uuid, case.parent_uuid, case.label, case.msg or '',
+                case.retries)
+        values = []
+        for sense, iotype in (('i', 'in'), ('o', 'out')):
+            for name, value in case.items(iotype=iotype):
+                # Copy arrays, so later changes to them aren't recorded.
+                if isinstance(value, ndarray):
+                    value = value.copy()
+                values.append((name, sense, value))
+        self._pending.append((info, values))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write any pending Cases to the file."""
+        if self._pending:
+            self._file.write(self._chunk(self._pending))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending = []
+
+    def close(self):
+        """Write any pending Cases and close the file."""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def get_iterator(self):
+        """Return a ChunkedCaseIterator for our file."""
+        if self._file is not None:
+            self.flush()
+        return ChunkedCaseIterator(self.filename)
+
+    def _chunk(self, cases):
+        """Return a string containing the record for the given cases."""
+        # Group values into a dataset for each variable.
+        datasets = {}
+        order = []
+        for index, (info, values) in enumerate(cases):
+            for name, sense, value in values:
+                key = (name, sense)
+                try:
+                    dataset = datasets[key]
+                except KeyError:
+                    dataset = datasets[key] = ([], [])
+                    order.append(key)
+                dataset[0].append(index)
+                dataset[1].append(value)
+
+        # Build each dataset's data, and its description:
+        # (name, sense, dtype, shape, is_scalar, case indices, offset, size)
+        # where offset is from the start of the data part of the record.
+        blocks = []
+        descs = []
+        offset = 0
+        for key in order:
+            name, sense = key
+            indices, values = datasets[key]
+            # Values are stored as raw data only if they all have the same
+            # type, so they're read back unchanged and in order.
+            dtypes = set([_dataset_type(value) for value in values])
+            dtype = dtypes.pop() if len(dtypes) == 1 else None
+            if dtype is None:
+                data = dumps(values, HIGHEST_PROTOCOL)
+                desc = (name, sense, None, None, False)
+            else:
+                data = numpy.array(values, dtype=dtype[0]).tostring()
+                desc = (name, sense) + dtype
+            if len(indices) == len(cases):
+                indices = None  # in every Case
+            descs.append(desc + (indices, offset, len(data)))
+            blocks.append(data)
+            blocks.append('\0' * _pad(len(data)))
+            offset += len(data) + _pad(len(data))
+
+        meta = dumps(([info for info, values in cases], descs),
+                     HIGHEST_PROTOCOL)
+        head_size = _RECORD.size + len(meta)
+        head_size += _pad(head_size)
+        head = _RECORD.pack(head_size + offset, len(meta)) + meta
+        return ''.join([head, '\0' * _pad(len(head))] + blocks)
+
+
+def _scan(filename, start=None):
+    """Read the descriptions of the complete records in the given file,
+    starting at offset `start` (after the header if None). Returns a list of
+    (data offset, case info list, dataset descriptions) and the offset of
+    the end of the last complete record.
+    """
+    size = os.path.getsize(filename)
+    chunks = []
+    with open(filename, 'rb') as inp:
+        if start is None:
+            header = inp.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise IOError("'%s' is not a chunked case file" % filename)
+            magic, version = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise IOError("'%s' is not a chunked case file" % filename)
+            if version > _VERSION:
+                raise IOError("'%s' has unsupported version %d"
+                              % (filename, version))
+            start = _HEADER.size + _pad(_HEADER.size)
+        while start + _RECORD.size <= size:
+            inp.seek(start)
+            length, metasize = _RECORD.unpack(inp.read(_RECORD.size))
+            if length == 0 or start + length > size:
+                break  # record is still being written
+            infos, descs = loads(inp.read(metasize))
+            head_size = _RECORD.size + metasize
+            chunks.append((start + head_size + _pad(head_size), infos, descs))
+            start += length
+    return chunks, start
+
+
+class ChunkedCaseIterator(object):
+    """Iterates over the Cases in a file written by a
+    :class:`ChunkedCaseRecorder`.  The file is only read, so it can be
+    used while another process is still recording to the file.  Cases
+    recorded after this was created are seen after :meth:`refresh`.
+    """
+
+    implements(ICaseIterator)
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._chunks = []
+        self._end = None
+        self._map = None
+        self.refresh()
+
+    def refresh(self):
+        """Find any chunks added to the file since the last refresh."""
+        chunks, self._end = _scan(self.filename, self._end)
+        self._chunks.extend(chunks)
+        if chunks:
+            # Arrays returned earlier may still refer to the old map, so
+            # it's left for garbage collection rather than closed.
+            with open(self.filename, 'rb') as inp:
+                self._map = mmap.mmap(inp.fileno(), self._end,
+                                      access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return sum([len(infos) for start, infos, descs in self._chunks])
+
+    def __iter__(self):
+        return self._next_case()
+
+    def _next_case(self):
+        """ Generator which returns Cases one at a time. """
+        for start, infos, descs in self._chunks:
+            inputs = [[] for info in infos]
+            outputs = [[] for info in infos]
+            for desc in descs:
+                name, sense = desc[:2]
+                lists = inputs if sense == 'i' else outputs
+                indices = desc[5]
+                if indices is None:
+                    indices = range(len(infos))
+                for index, value in zip(indices,
+                                        self._read(start, desc, len(indices),
+                                                   copy=True)):
+                    lists[index].append((name, value))
+            for info, ins, outs in zip(infos, inputs, outputs):
+                uuid, parent, label, msg, retries = info
+                yield Case(inputs=ins, outputs=outs, label=label, msg=msg,
+                           retries=retries, case_uuid=uuid,
+                           parent_uuid=parent)
+
+    def _read(self, start, desc, count, copy=False):
+        """Return the `count` values of the dataset described by `desc` in
+        the chunk with data starting at `start`. Numeric values are returned
+        as an array which, unless `copy` is True, is a read-only view of the
+        file. Scalars are returned as a list if `copy` is True.
+        """
+        name, sense, dtype, shape, scalar, indices, offset, size = desc
+        start += offset
+        if dtype is None:
+            return loads(self._map[start:start+size])
+        shape = (count,) + tuple(shape)
+        if size == 0:
+            value = numpy.zeros(shape, dtype)
+        else:
+            value = numpy.frombuffer(self._map, dtype,
+                                     size / numpy.dtype(dtype).itemsize,
+                                     start).reshape(shape)
+        if copy:
+            if scalar:
+                return value.tolist()
+            return value.copy()
+        return value
+
+    def get_names(self):
+        """Return the set of names of the recorded variables."""
+        names = set()
+        for start, infos, descs in self._chunks:
+            names.update([desc[0] for desc in descs])
+        return names
+
+    def iter_values(self, name):
+        """Generates the values of variable `name`, chunk by chunk.  For
+        each chunk, yields the indices of the Cases having the variable
+        (counting Cases from the start of the file), and the values.
+        Numeric values are an array (read-only) mapped from the file, with
+        the first dimension indexing the Cases. Other values are a list.
+        """
+        base = 0
+        for start, infos, descs in self._chunks:
+            for desc in descs:
+                if desc[0] == name:
+                    indices = desc[5]
+                    if indices is None:
+                        indices = range(len(infos))
+                    yield ([base + i for i in indices],
+                           self._read(start, desc, len(indices)))
+            base += len(infos)
+
+    def get_values(self, name):
+        """Return the values of variable `name` in all recorded Cases that
+        have it, in the order they were recorded.  If the values are numeric
+        and all the same shape, returns an array with the first dimension
+        indexing the Cases, otherwise a list.
+        """
+        parts = [values for indices, values in self.iter_values(name)]
+        if len(parts) == 1 and isinstance(parts[0], ndarray):
+            return parts[0]
+        if parts and all([isinstance(values, ndarray) for values in parts]) \
+           and len(set([values.shape[1:] for values in parts])) == 1:
+            return numpy.concatenate(parts)
+        result = []
+        for values in parts:
+            result.extend(values)
+        return result
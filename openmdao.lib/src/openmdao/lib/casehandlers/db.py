@@ -1,16 +1,242 @@
 
+import Queue
 import sys
 import sqlite3
+import threading
+import struct
+import time
 import uuid
+import zlib
 from cPickle import dumps, loads, HIGHEST_PROTOCOL, UnpicklingError
 from optparse import OptionParser
 
+import numpy
+from numpy import ndarray
+
 from openmdao.main.interfaces import implements, ICaseRecorder, ICaseIterator
 from openmdao.main.case import Case
 
 _casetable_attrs = set(['id','uuid','parent','label','msg','retries','model_id','timeEnter'])
 _vartable_attrs = set(['var_id','name','case_id','sense','value'])
 
+# Queued to a DBCaseRecorder's writer thread to make it write pending Cases.
+_FLUSH = object()
+
+# Version of the DB layout, kept in the DB's user_version.
+#   0: all variable values in the casevars table.
+#   1: values in casevalues, names in varnames, scalars optionally in
+#      columns of casedata, and casevars is a view combining them.
+SCHEMA_VERSION = 1
+
+def _create_tables(connection, exstr=''):
+    """Create the tables for the current schema version."""
+    connection.execute("""
+    create table %s cases(
+     id INTEGER PRIMARY KEY,
+     uuid TEXT,
+     parent TEXT,
+     label TEXT,
+     msg TEXT,
+     retries INTEGER,
+     model_id TEXT,
+     timeEnter TEXT
+     )""" % exstr)
+    
+    # wide is 1 if there is a column v<id> in casedata for the variable.
+    connection.execute("""
+    create table %s varnames(
+     id INTEGER PRIMARY KEY,
+     name TEXT,
+     sense TEXT,
+     wide INTEGER
+     )""" % exstr)
+    
+    connection.execute("""
+    create table %s casevalues(
+     var_id INTEGER PRIMARY KEY,
+     name_id INTEGER,
+     case_id INTEGER,
+     value BLOB
+     )""" % exstr)
+    
+    connection.execute("""
+    create table %s casedata(
+     case_id INTEGER PRIMARY KEY
+     )""" % exstr)
+    
+    connection.execute("create unique index if not exists varnames_name"
+                       " on varnames(name, sense)")
+    connection.execute("create index if not exists casevalues_case_id"
+                       " on casevalues(case_id)")
+    connection.execute("create index if not exists casevalues_name_id"
+                       " on casevalues(name_id)")
+    _create_view(connection)
+    connection.execute("pragma user_version=%d" % SCHEMA_VERSION)
+
+def _create_view(connection):
+    """(Re)create the casevars view, which has the same columns as the
+    version 0 casevars table.
+    """
+    sql = ["""select casevalues.var_id, varnames.name, casevalues.case_id,
+                     varnames.sense, casevalues.value
+              from casevalues join varnames on casevalues.name_id=varnames.id"""]
+    for vid, name, sense in connection.execute(
+                   "select id, name, sense from varnames where wide=1"):
+        sql.append("select NULL, '%s', case_id, '%s', v%d from casedata"
+                   " where v%d is not NULL"
+                   % (name.replace("'", "''"), sense, vid, vid))
+    connection.execute("drop view if exists casevars")
+    connection.execute("create view casevars as %s" % ' union all '.join(sql))
+
+def _get_version(connection):
+    """Return the schema version of the DB, or None if it has no tables."""
+    cur = connection.execute("select type from sqlite_master"
+                             " where name='casevars'")
+    if cur.fetchone() is None:
+        return None
+    return connection.execute("pragma user_version").fetchone()[0]
+
+def _migrate(connection):
+    """Convert a DB to the current schema version, in one transaction."""
+    isolation = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        connection.execute("begin")
+        try:
+            if _get_version(connection) == 0:
+                connection.execute("alter table casevars rename to oldvars")
+                _create_tables(connection, 'if not exists')
+                connection.execute("""
+                insert into varnames(name, sense, wide)
+                 select distinct name, sense, 0 from oldvars""")
+                connection.execute("""
+                insert into casevalues(var_id, name_id, case_id, value)
+                 select oldvars.var_id, varnames.id, oldvars.case_id,
+                        oldvars.value
+                 from oldvars join varnames
+                  on oldvars.name=varnames.name and
+                     oldvars.sense=varnames.sense""")
+                connection.execute("drop table oldvars")
+        except:
+            connection.execute("rollback")
+            raise
+        connection.execute("commit")
+    finally:
+        connection.isolation_level = isolation
+
+def migrate_db(dbname):
+    """
+    Convert a case DB file written by an older version of DBCaseRecorder
+    to the current layout, which has indexes and stores each variable name
+    only once. Older DB files can still be read, but queries on them
+    are slow.
+    
+    dbname: str
+        The name of the sqlite DB file.
+    """
+    connection = _connect(dbname)
+    try:
+        _migrate(connection)
+    finally:
+        connection.close()
+
+# Start of a BLOB holding an array encoded by _encode_array.  A pickle
+# can't start with this.
+_ARRAY_MAGIC = '\x93NDA'
+_ARRAY_COMPRESSED = 1
+# magic, flags, number of dimensions, length of dtype string
+_ARRAY_HEADER = struct.Struct('<4sBBB')
+_ARRAY_ALIGN = 16
+
+def _encode_array(value, compress=False):
+    """Return a string holding the dtype, shape and data of the numeric
+    array `value`, compressing the data with zlib if `compress` is True and
+    that makes it smaller.
+    """
+    dtype = value.dtype.str
+    data = value.tostring()  # always in C order
+    flags = 0
+    if compress:
+        compressed = zlib.compress(data, 1)
+        if len(compressed) < len(data):
+            data = compressed
+            flags |= _ARRAY_COMPRESSED
+    header = ''.join([_ARRAY_HEADER.pack(_ARRAY_MAGIC, flags, value.ndim,
+                                         len(dtype)),
+                      struct.pack('<%dq' % value.ndim, *value.shape),
+                      dtype])
+    # pad so the data is aligned within the BLOB
+    return ''.join([header, '\0' * (-len(header) % _ARRAY_ALIGN), data])
+
+def _decode_array(blob, copy=False):
+    """Return the array encoded in `blob` by :func:`_encode_array`. Unless
+    the data is compressed or `copy` is True, the array uses the memory of
+    `blob` and is read-only.
+    """
+    magic, flags, ndim, dlen = _ARRAY_HEADER.unpack_from(blob)
+    offset = _ARRAY_HEADER.size
+    shape = struct.unpack_from('<%dq' % ndim, blob, offset)
+    offset += 8 * ndim
+    dtype = numpy.dtype(str(blob[offset:offset+dlen]))
+    offset += dlen
+    offset += -offset % _ARRAY_ALIGN
+    if flags & _ARRAY_COMPRESSED:
+        blob = zlib.decompress(blob[offset:])
+        offset = 0
+        copy = False
+    if len(blob) == offset:
+        return numpy.zeros(shape, dtype)
+    value = numpy.frombuffer(blob, dtype, offset=offset).reshape(shape)
+    # some numpy routines fail on misaligned data
+    if copy or not value.flags.aligned:
+        return value.copy()
+    return value
+
+def _decode(blob, copy=False):
+    """Return the value held in BLOB `blob`, either an encoded array or a
+    pickle.
+    """
+    if blob[:len(_ARRAY_MAGIC)] == _ARRAY_MAGIC:
+        return _decode_array(blob, copy)
+    return loads(str(blob))
+
+def _array_func(func):
+    """Return a function for use in SQL that applies `func` to encoded
+    arrays, returning NULL for other values.
+    """
+    def wrapper(value, *args):
+        if isinstance(value, buffer) and \
+           value[:len(_ARRAY_MAGIC)] == _ARRAY_MAGIC:
+            result = func(_decode_array(value), *args)
+            return result.item() if isinstance(result, numpy.generic) \
+                                 else result
+        return None
+    return wrapper
+
+# Reductions usable in case_db_array_query, also available in SQL
+# queries on the case DB as array_<name>(value).
+_reductions = {
+    'sum': numpy.sum,
+    'min': numpy.min,
+    'max': numpy.max,
+    'mean': numpy.mean,
+    'norm': lambda value: numpy.sqrt(numpy.vdot(value, value).real),
+}
+
+def _connect(dbname, **kwargs):
+    """Return a connection to the given DB with our array functions
+    defined.
+    """
+    connection = sqlite3.connect(dbname, **kwargs)
+    # array_item(value, i) is element i of the flattened array
+    connection.create_function('array_item', 2,
+                               _array_func(lambda value, i: value.flat[i]))
+    connection.create_function('array_size', 1,
+                               _array_func(lambda value: value.size))
+    for name, func in _reductions.items():
+        connection.create_function('array_%s' % name, 1, _array_func(func))
+    return connection
+
 def _query_split(query):
     """Return a tuple of lhs, relation, rhs after splitting on 
     a list of allowed operators.
@@ -54,93 +280,130 @@ class DBCaseIterator(object):
         self._dbfile = value
         if self._connection:
             self._connection.close()
-        self._connection = sqlite3.connect(value)
+        self._connection = _connect(value)
 
     def __iter__(self):
         return self._next_case()
 
     def _next_case(self):
         """ Generator which returns Cases one at a time. """
-        # figure out which selectors are for cases and which are for variables
-        sql = ["SELECT * FROM cases"]
+        # figure out which selectors are for cases and which are for variables,
+        # and get the cases and their variables in one query, ordered by case
+        sql = ["""SELECT cases.id,cases.uuid,cases.parent,cases.label,cases.msg,
+                         cases.retries,casevars.name,casevars.sense,casevars.value
+                  FROM cases JOIN casevars ON casevars.case_id=cases.id"""]
+        conds = []
         if self.selectors is not None:
             for sel in self.selectors:
                 rhs,rel,lhs = _query_split(sel)
                 if rhs in _casetable_attrs:
-                    if len(sql) == 1:
-                        sql.append("WHERE %s%s%s" % (rhs,rel,lhs))
-                    else:
-                        sql.append("AND %s%s%s" % (rhs,rel,lhs))
-            
-        casecur = self._connection.cursor()
-        casecur.execute(' '.join(sql))
-          
-        sql = ['SELECT var_id,name,case_id,sense,value from casevars WHERE case_id=%s']
-        if self.selectors is not None:
-            for sel in self.selectors:
-                rhs,rel,lhs = _query_split(sel)
-                if rhs in _vartable_attrs:
-                    sql.append("AND %s%s%s" % (rhs,rel,lhs))
-        combined = ' '.join(sql)
-        varcur = self._connection.cursor()
+                    conds.append("cases.%s%s%s" % (rhs,rel,lhs))
+                elif rhs in _vartable_attrs:
+                    conds.append("casevars.%s%s%s" % (rhs,rel,lhs))
+        if conds:
+            sql.append("WHERE %s" % ' AND '.join(conds))
+        sql.append("ORDER BY cases.id")
         
-        for cid,text_id,parent,label,msg,retries,model_id,timeEnter in casecur:
-            varcur.execute(combined % cid)
-            inputs = []
-            outputs = []
-            for var_id, vname, case_id, sense, value in varcur:
-                if not isinstance(value, (float,int,str)):
-                    try:
-                        value = loads(str(value))
-                    except UnpicklingError as err:
-                        raise UnpicklingError("can't unpickle value '%s' for case '%s' from database: %s" %
-                                              (vname, cname, str(err)))
-                if sense=='i':
-                    inputs.append((vname, value))
-                else:
-                    outputs.append((vname, value))
-            if len(inputs) > 0 or len(outputs) > 0:
-                yield Case(inputs=inputs, outputs=outputs,
-                           retries=retries,msg=msg,label=label,
-                           case_uuid=text_id, parent_uuid=parent)
+        cur = self._connection.cursor()
+        cur.execute(' '.join(sql))
+        
+        current = None
+        for cid,text_id,parent,label,msg,retries,vname,sense,value in cur:
+            if cid != current:
+                if current is not None:
+                    yield Case(inputs=inputs, outputs=outputs, **caseinfo)
+                current = cid
+                inputs = []
+                outputs = []
+                caseinfo = dict(retries=retries, msg=msg, label=label,
+                                case_uuid=text_id, parent_uuid=parent)
+            if isinstance(value, buffer):  # pickled or encoded array
+                try:
+                    value = _decode(value, copy=True)
+                except UnpicklingError as err:
+                    raise UnpicklingError("can't unpickle value '%s' for case '%s' from database: %s" %
+                                          (vname, text_id, str(err)))
+            if sense=='i':
+                inputs.append((vname, value))
+            else:
+                outputs.append((vname, value))
+        if current is not None:
+            yield Case(inputs=inputs, outputs=outputs, **caseinfo)
             
 
 class DBCaseRecorder(object):
-    """Records Cases to a relational DB (sqlite). Values other than floats,
-    ints or strings are pickled and are opaque to SQL queries.
+    """Records Cases to a relational DB (sqlite). Numeric numpy arrays are
+    stored as their dtype, shape and raw data, compressed if `compress` is
+    True, and can be used in SQL queries via the array_item, array_size,
+    array_sum, array_min, array_max, array_mean and array_norm functions.
+    Other values that aren't floats, ints or strings are pickled and are
+    opaque to SQL queries.
+
+    Variable names are stored once, in the varnames table, and values are
+    stored in the casevalues table, indexed by case and by name.  If `wide`
+    is True, float and int values are instead stored in a column per
+    variable in the casedata table, with one row per Case, which is much
+    faster to query for large numbers of Cases.  The casevars view presents
+    the values from both as rows of (var_id, name, case_id, sense, value).
+    When `append` is True, a DB written by an older version of
+    DBCaseRecorder is converted to the current layout.
+
+    By default each Case is committed to the DB as soon as it's recorded.
+    To avoid the cost of a commit per Case, set `batch_size` and/or
+    `flush_interval`.  Cases are then buffered and written in a single
+    transaction when `batch_size` Cases are pending or when `flush_interval`
+    seconds have passed since the oldest pending Case was recorded.  If
+    `background` is True, the writes are done by a separate thread so that
+    :meth:`record` doesn't wait for the DB.
+
+    Each batch is written atomically, so if the process dies the DB will
+    contain only complete Cases, but Cases still pending are lost. Call
+    :meth:`flush` to write pending Cases, and :meth:`close` when done
+    recording.  :meth:`get_iterator` flushes before returning.  If writing
+    a batch fails its Cases are dropped, later Cases are still written, and
+    the next call to :meth:`record`, :meth:`flush` or :meth:`close` raises
+    a RuntimeError giving the number of Cases dropped.
     """
     
     implements(ICaseRecorder)
     
-    def __init__(self, dbfile=':memory:', model_id='', append=False):
+    def __init__(self, dbfile=':memory:', model_id='', append=False,
+                 batch_size=1, flush_interval=None, background=False,
+                 wide=False, compress=False):
         self.dbfile = dbfile  # this creates the connection
         self.model_id = model_id
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+        self.wide = wide
+        self.compress = compress
         
         if append:
-            exstr = 'if not exists'
+            if _get_version(self._connection) < SCHEMA_VERSION:
+                _migrate(self._connection)
+            _create_tables(self._connection, 'if not exists')
         else:
-            exstr = ''
-        
-        self._connection.execute("""
-        create table %s cases(
-         id INTEGER PRIMARY KEY,
-         uuid TEXT,
-         parent TEXT,
-         label TEXT,
-         msg TEXT,
-         retries INTEGER,
-         model_id TEXT,
-         timeEnter TEXT
-         )""" % exstr)
-        
-        self._connection.execute("""
-        create table %s casevars(
-         var_id INTEGER PRIMARY KEY,
-         name TEXT,
-         case_id INTEGER,
-         sense TEXT,
-         value BLOB
-         )""" % exstr)
+            _create_tables(self._connection)
+        self._connection.commit()
+
+        # We manage transactions ourselves so that adding a column to
+        # casedata doesn't commit a partially written batch.
+        self._connection.isolation_level = None
+        self._names = {}  # (name, sense) -> [varnames id, wide]
+
+        self._pending = []
+        self._first_pending = None  # time oldest pending Case was recorded
+        self._lock = threading.Lock()
+        self._error = None  # (first error, number of Cases dropped)
+        self._error_lock = threading.Lock()
+        if background:
+            self._queue = Queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop,
+                                            name='DBCaseRecorder writer')
+            self._writer.daemon = True
+            self._writer.start()
+        else:
+            self._queue = None
+            self._writer = None
 
     @property
     def dbfile(self):
@@ -153,39 +416,217 @@ class DBCaseRecorder(object):
     def dbfile(self, value):
         """Set the DB file and connect to it."""
         self._dbfile = value
-        self._connection = sqlite3.connect(value)
+        # Our writer thread, or any other thread calling record (e.g., one
+        # of a FanOutCaseRecorder) must be able to use our connection,
+        # because an in-memory DB can't be shared between connections.
+        # Writes are serialized by self._lock.
+        self._connection = _connect(value, check_same_thread=False)
     
     def record(self, case):
         """Record the given Case."""
-        cur = self._connection.cursor()
-        
-        cur.execute("""insert into cases(id,uuid,parent,label,msg,retries,model_id,timeEnter) 
-                           values (?,?,?,?,?,?,?,DATETIME('NOW'))""", 
-                                     (None, case.uuid, case.parent_uuid, case.label,
-                                      case.msg or '', case.retries, 
-                                      self.model_id))
-        case_id = cur.lastrowid
-        # insert the inputs and outputs into the vars table.  Pickle them if they're not one of the
-        # built-in types int, float, or str.
-        
-        for name,value in case.items(iotype='in'):
-            if isinstance(value, (float,int,str)):
-                v = (None, name, case_id, 'i', value)
+        if self._connection is None:
+            raise RuntimeError('DBCaseRecorder for %s has been closed'
+                               % self._dbfile)
+        self._check_error()
+        rows = self._get_rows(case)
+        if self._queue is not None:
+            self._queue.put(rows)
+            return
+
+        if not self._pending:
+            self._first_pending = time.time()
+        self._pending.append(rows)
+        if len(self._pending) >= self.batch_size or \
+           (self.flush_interval is not None and
+            time.time() - self._first_pending >= self.flush_interval):
+            self.flush()
+
+    def _get_rows(self, case):
+        """Return the row for the cases table and the rows for the casevars
+        table (minus the case_id) for the given Case.  Values that aren't
+        int, float or str are encoded or pickled now, so later changes to
+        them aren't recorded.
+        """
+        caserow = (None, case.uuid, case.parent_uuid, case.label,
+                   case.msg or '', case.retries, self.model_id,
+                   time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))
+        varrows = []
+        for sense, iotype in (('i', 'in'), ('o', 'out')):
+            for name, value in case.items(iotype=iotype):
+                if isinstance(value, ndarray) and value.dtype.kind in 'biufc':
+                    value = sqlite3.Binary(_encode_array(value, self.compress))
+                elif not isinstance(value, (float,int,str)):
+                    value = sqlite3.Binary(dumps(value, HIGHEST_PROTOCOL))
+                varrows.append((name, sense, value))
+        return (caserow, varrows)
+
+    def _get_name(self, cur, name, sense, wide, new):
+        """Return the [id, wide] entry from varnames for the given variable,
+        adding it or its casedata column if necessary.  New entries are
+        put in `new` rather than our cache, in case the transaction fails.
+        Returns True as the second item if a column was added.
+        """
+        key = (name, sense)
+        try:
+            entry = self._names[key]
+        except KeyError:
+            try:
+                entry = new[key]
+            except KeyError:
+                cur.execute("select id, wide from varnames"
+                            " where name=? and sense=?", key)
+                entry = cur.fetchone()
+                if entry is None:
+                    cur.execute("insert into varnames(name, sense, wide)"
+                                " values (?,?,0)", key)
+                    entry = [cur.lastrowid, 0]
+                else:
+                    entry = list(entry)
+                new[key] = entry
+        added = False
+        if wide and not entry[1]:
+            # another recorder may have added the column already
+            cur.execute("select wide from varnames where id=?", (entry[0],))
+            if not cur.fetchone()[0]:
+                cur.execute("alter table casedata add column v%d" % entry[0])
+                cur.execute("update varnames set wide=1 where id=?",
+                            (entry[0],))
+                added = True
+            entry = [entry[0], 1]
+            new[key] = entry
+        return entry, added
+
+    def _write(self, batch):
+        """Write a list of (caserow, varrows) to the DB in one transaction."""
+        with self._lock:
+            cur = self._connection.cursor()
+            new = {}
+            cur.execute("begin")
+            try:
+                values = []
+                widerows = {}  # rows for casedata keyed by column ids
+                view_changed = False
+                for caserow, varrows in batch:
+                    cur.execute("""insert into cases(id,uuid,parent,label,msg,retries,model_id,timeEnter) 
+                                   values (?,?,?,?,?,?,?,?)""", caserow)
+                    case_id = cur.lastrowid
+                    cols = []
+                    row = [case_id]
+                    for name, sense, value in varrows:
+                        wide = self.wide and isinstance(value, (float,int))
+                        entry, added = self._get_name(cur, name, sense,
+                                                      wide, new)
+                        view_changed = view_changed or added
+                        if wide:
+                            cols.append(entry[0])
+                            row.append(value)
+                        else:
+                            values.append((None, entry[0], case_id, value))
+                    if self.wide:
+                        widerows.setdefault(tuple(cols), []).append(row)
+                cur.executemany("insert into casevalues(var_id,name_id,case_id,value) values(?,?,?,?)",
+                                values)
+                for cols, rows in widerows.items():
+                    names = ''.join([',v%d' % vid for vid in cols])
+                    cur.executemany("insert into casedata(case_id%s) values(?%s)"
+                                    % (names, ',?' * len(cols)), rows)
+                if view_changed:
+                    _create_view(self._connection)
+            except:
+                cur.execute("rollback")
+                raise
+            cur.execute("commit")
+            self._names.update(new)
+
+    def _write_loop(self):
+        """Runs in the writer thread, writing Cases from the queue in
+        batches until it gets None.
+        """
+        while True:
+            rows = self._queue.get()
+            ntasks = 1
+            stop = rows is None
+            batch = []
+            if rows is not None and rows is not _FLUSH:
+                batch.append(rows)
+                start = time.time()
+                while len(batch) < self.batch_size:
+                    try:
+                        if self.flush_interval is None:
+                            rows = self._queue.get()
+                        else:
+                            timeout = start + self.flush_interval - time.time()
+                            if timeout <= 0:
+                                break
+                            rows = self._queue.get(timeout=timeout)
+                    except Queue.Empty:
+                        break
+                    ntasks += 1
+                    if rows is None or rows is _FLUSH:
+                        stop = rows is None
+                        break
+                    batch.append(rows)
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as err:
+                    self._dropped(err, len(batch))
+            for i in range(ntasks):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _dropped(self, err, count):
+        """Note that `count` Cases were dropped because of `err`."""
+        with self._error_lock:
+            if self._error is None:
+                self._error = (err, count)
             else:
-                v = (None, name, case_id, 'i', sqlite3.Binary(dumps(value,HIGHEST_PROTOCOL)))
-            cur.execute("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)", 
-                        v)
-        for name,value in case.items(iotype='out'):
-            if isinstance(value, (float,int,str)):
-                v = (None, name, case_id, 'o', value)
+                self._error = (self._error[0], self._error[1] + count)
+
+    def _check_error(self):
+        """Raise any error from writing Cases, which may have happened in
+        the writer thread, in the caller's thread.
+        """
+        with self._error_lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError('DBCaseRecorder for %s failed to write %d Cases: %s'
+                               % (self._dbfile, error[1], error[0]))
+
+    def flush(self):
+        """Write all pending Cases to the DB."""
+        if self._queue is not None:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+        elif self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                self._write(batch)
+            except Exception as err:
+                self._dropped(err, len(batch))
+        self._check_error()
+
+    def close(self):
+        """Write all pending Cases to the DB and close the connection."""
+        if self._connection is None:
+            return
+        try:
+            if self._queue is not None:
+                self._queue.put(None)
+                self._writer.join()
+                self._queue = None
+                self._check_error()
             else:
-                v = (None, name, case_id, 'o', sqlite3.Binary(dumps(value,HIGHEST_PROTOCOL)))
-            cur.execute("insert into casevars(var_id,name,case_id,sense,value) values(?,?,?,?,?)", 
-                        v)
-        self._connection.commit()
+                self.flush()
+        finally:
+            self._connection.close()
+            self._connection = None
     
     def get_iterator(self):
         """Return a DBCaseIterator that points to our current DB."""
+        self.flush()
         return DBCaseIterator(dbfile=self._dbfile, connection=self._connection)
 
 
@@ -201,7 +642,7 @@ def list_db_vars(dbname):
     dbname: str
         The name of the sqlite DB file.
     """
-    connection = sqlite3.connect(dbname)
+    connection = _connect(dbname)
     varcur = connection.cursor()
     varcur.execute("SELECT name from casevars")
     varnames = set([v for v in varcur])
@@ -235,64 +676,245 @@ def case_db_to_dict(dbname, varnames, case_sql='', var_sql='', include_errors=Fa
         If True, include data from cases that reported an error.
         
     """
-    connection = sqlite3.connect(dbname)
     vardict = dict([(name,[]) for name in varnames])
+    varnames = vardict.keys()
+    connection = _connect(dbname)
+    try:
+        for values in _case_db_rows(connection, varnames, case_sql, var_sql,
+                                    include_errors, copy=True):
+            for name, value in zip(varnames, values):
+                vardict[name].append(value)
+    finally:
+        connection.close()
+    return vardict
 
-    sql = ["SELECT id FROM cases"]
+
+def case_db_to_arrays(dbname, varnames, case_sql='', var_sql='',
+                      include_errors=False):
+    """
+    Retrieve the values of specified variables from a sqlite DB containing
+    Case data, using a single query.
+    
+    Returns a dict containing a numpy array of values for each entry, keyed
+    on variable name.  If the values are themselves arrays, the result will
+    have one more dimension than they do.  As in :func:`case_db_to_dict`,
+    only cases containing ALL of the specified variables are included.
+    
+    dbname: str
+        The name of the sqlite DB file.
+        
+    varnames: list[str]
+        Iterator of names of variables to be retrieved.
+        
+    case_sql: str (optional)
+        SQL syntax that will be placed in the WHERE clause for Case retrieval.
+        
+    var_sql: str (optional)
+        SQL syntax that will be placed in the WHERE clause for variable retrieval.
+    
+    include_errors: bool (optional) [False]
+        If True, include data from cases that reported an error.
+    """
+    varnames = _unique(varnames)
+    connection = _connect(dbname)
+    try:
+        return _to_arrays(varnames, list(_case_db_rows(connection, varnames,
+                                                       case_sql, var_sql,
+                                                       include_errors)))
+    finally:
+        connection.close()
+
+
+def case_db_chunks(dbname, varnames, chunk_size=10000, case_sql='',
+                   var_sql='', include_errors=False):
+    """
+    Like :func:`case_db_to_arrays`, but generates a dict of arrays for
+    each `chunk_size` cases, so a DB too large to fit in memory can be
+    processed.  The last dict may have fewer cases.  The remaining
+    arguments are as for :func:`case_db_to_arrays`.
+    """
+    varnames = _unique(varnames)
+    connection = _connect(dbname)
+    try:
+        rows = []
+        for values in _case_db_rows(connection, varnames, case_sql, var_sql,
+                                    include_errors):
+            rows.append(values)
+            if len(rows) == chunk_size:
+                yield _to_arrays(varnames, rows)
+                rows = []
+        if rows:
+            yield _to_arrays(varnames, rows)
+    finally:
+        connection.close()
+
+
+def case_db_array_query(dbname, varname, index=None, reduction=None,
+                        case_sql='', var_sql='', include_errors=False):
+    """
+    Retrieve part of, or a reduction of, the array values of a variable
+    from a sqlite DB containing Case data.  Each stored array is decoded
+    in turn, and only the requested part is kept.
+    
+    Returns a numpy array with one entry for each case containing the
+    variable.
+    
+    dbname: str
+        The name of the sqlite DB file.
+        
+    varname: str
+        The name of the variable.
+        
+    index: int, slice or tuple (optional)
+        Index applied to each value, e.g., ``(slice(None), 0)`` selects the
+        first column of 2D arrays.
+        
+    reduction: str or function (optional)
+        Applied to each value (after indexing). One of 'sum', 'min', 'max',
+        'mean' or 'norm', or a function taking an array.
+        
+    case_sql: str (optional)
+        SQL syntax that will be placed in the WHERE clause for Case retrieval.
+        
+    var_sql: str (optional)
+        SQL syntax that will be placed in the WHERE clause for variable retrieval.
+    
+    include_errors: bool (optional) [False]
+        If True, include data from cases that reported an error.
+    """
+    if isinstance(reduction, basestring):
+        try:
+            reduction = _reductions[reduction]
+        except KeyError:
+            raise ValueError("unknown reduction '%s', must be one of %s"
+                             % (reduction, sorted(_reductions.keys())))
+    connection = _connect(dbname)
+    try:
+        results = []
+        for (value,) in _case_db_rows(connection, [varname], case_sql,
+                                      var_sql, include_errors):
+            value = numpy.asarray(value)
+            if index is not None:
+                value = value[index]
+            if reduction is not None:
+                value = reduction(value)
+            # copy, so the memory of the stored value isn't kept
+            results.append(numpy.array(value))
+        return numpy.array(results)
+    finally:
+        connection.close()
+
+
+def _unique(names):
+    """Return a list of `names` without duplicates, in the same order."""
+    seen = set()
+    return [name for name in names if not (name in seen or seen.add(name))]
+
+
+def _to_arrays(varnames, rows):
+    """Return a dict of arrays from a list of tuples of values of
+    `varnames`.
+    """
+    if rows:
+        return dict([(name, numpy.array(values))
+                     for name, values in zip(varnames, zip(*rows))])
+    return dict([(name, numpy.array([])) for name in varnames])
+
+
+def _wide_columns(connection, varnames):
+    """Return the ids of the casedata columns holding all of the values of
+    `varnames`, or None if some values aren't in casedata columns.
+    """
+    if not varnames or _get_version(connection) < 1:
+        return None
+    cols = []
+    for name in varnames:
+        entries = connection.execute("SELECT id, wide FROM varnames"
+                                     " WHERE name=?", (name,)).fetchall()
+        if len(entries) != 1 or not entries[0][1]:
+            return None
+        cols.append(entries[0][0])
+    cur = connection.execute("SELECT count(*) FROM casevalues WHERE name_id IN (%s)"
+                             % ','.join(['?'] * len(cols)), cols)
+    if cur.fetchone()[0]:
+        return None
+    return cols
+
+
+def _case_db_rows(connection, varnames, case_sql='', var_sql='',
+                  include_errors=False, fetch_size=1000, copy=False):
+    """Generator yielding a tuple of the values of `varnames` for each case
+    in the DB that has all of them.  The DB is read in one query.  Unless
+    `copy` is True, array values may be read-only views of the data read
+    from the DB, for callers that copy or reduce them anyway.
+    """
+    nvars = len(varnames)
+    if nvars == 0:
+        return
+    
     qlist = []
     if case_sql:
-        qlist.append(case_sql)
+        qlist.append('(%s)' % case_sql)
     if not include_errors:
         qlist.append("msg = ''")
-            
-    if qlist:
+    
+    cols = None if var_sql else _wide_columns(connection, varnames)
+    if cols is not None:
+        # every value is in a casedata column, so just read the columns
+        sql = ["SELECT %s FROM cases JOIN casedata ON casedata.case_id=cases.id"
+               % ','.join(['v%d' % col for col in cols])]
+        qlist.extend(['v%d IS NOT NULL' % col for col in cols])
         sql.append("WHERE %s" % ' AND '.join(qlist))
-        
-    casecur = connection.cursor()
-    casecur.execute(' '.join(sql))
-    
-    sql = ["SELECT name, value from casevars WHERE case_id=%s"]
-    vars_added = False
-    for i,name in enumerate(vardict.keys()):
-        if i==0:
-            sql.append("AND (")
-        else:
-            sql.append("OR")
-        sql.append("name='%s'" % name)
-        vars_added = True
-    if vars_added: sql.append(")")
+        sql.append("ORDER BY cases.id")
+        cur = connection.execute(' '.join(sql))
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield row
     
+    sql = ["""SELECT casevars.case_id, casevars.name, casevars.value
+              FROM cases JOIN casevars ON casevars.case_id=cases.id"""]
+    qlist.append("name IN (%s)" % ','.join(['?'] * nvars))
     if var_sql:
-        sql.append(" AND %s" % var_sql)
-    combined = ' '.join(sql)
-    
-    varcur = connection.cursor()
+        qlist.append('(%s)' % var_sql)
+    sql.append("WHERE %s" % ' AND '.join(qlist))
+    sql.append("ORDER BY casevars.case_id")
+    cur = connection.execute(' '.join(sql), varnames)
     
-    for case_id in casecur:
-        casedict = {}
-        varcur.execute(combined % case_id)
-        for vname, value in varcur:
-            if not isinstance(value, (float,int,str)):
+    index = dict([(name, i) for i, name in enumerate(varnames)])
+    current = None
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            break
+        for case_id, vname, value in rows:
+            if case_id != current:
+                # skip cases that don't have every variable, to avoid
+                # data mismatches
+                if current is not None and len(found) == nvars:
+                    yield tuple(values)
+                current = case_id
+                values = [None] * nvars
+                found = set()
+            if isinstance(value, buffer):  # pickled or encoded array
                 try:
-                    value = loads(str(value))
+                    value = _decode(value, copy)
                 except UnpicklingError as err:
                     raise UnpicklingError("can't unpickle value '%s' from database: %s" %
                                           (vname, str(err)))
-            casedict[vname] = value
-        
-        if len(casedict) != len(vardict):
-            continue   # case doesn't contain a complete set of specified vars, so skip it to avoid data mismatches
-        
-        for name, value in casedict.items():
-            vardict[name].append(value)
-            
-    return vardict
+            i = index[vname]
+            values[i] = value
+            found.add(i)
+    if current is not None and len(found) == nvars:
+        yield tuple(values)
 
 
 def _get_lines(dbname, xnames, ynames, case_sql=None, var_sql=None): 
     """Return a list of lines which will be fed to the plot function."""
     
-    vardict = case_db_to_dict(dbname, xnames+ynames, case_sql, var_sql)
+    vardict = case_db_to_arrays(dbname, xnames+ynames, case_sql, var_sql)
 
     lines = []
     yvals = []
@@ -300,7 +922,7 @@ def _get_lines(dbname, xnames, ynames, case_sql=None, var_sql=None):
     for i,name in enumerate(ynames):
         yvals.append(vardict[name])
         if len(xnames) == 0:
-            xvals.append(range(len(vardict[name])))
+            xvals.append(numpy.arange(len(vardict[name])))
         elif len(xnames) == 1:
             xvals.append(vardict[xnames[0]])
         else:
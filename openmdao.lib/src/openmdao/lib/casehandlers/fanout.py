@@ -0,0 +1,258 @@
+"""
+A case recorder that passes each Case on to several other recorders, each
+fed through its own bounded queue by its own thread, so a slow recorder
+doesn't hold up the driver or the other recorders.
+"""
+
+import Queue
+import threading
+import time
+
+from numpy import ndarray
+
+from openmdao.main.interfaces import implements, ICaseRecorder
+from openmdao.main.case import Case
+
+__all__ = ['FanOutCaseRecorder']
+
+# Queued to a sink's thread to make it flush its recorder.
+_FLUSH = object()
+
+
+def _snapshot(case):
+    """Return a copy of `case`, so changes made to it after it's recorded
+    (e.g., when it's retried) don't affect what's recorded.
+    """
+    def copy(items):
+        return [(name, value.copy() if isinstance(value, ndarray) else value)
+                for name, value in items]
+    return Case(inputs=copy(case.items(iotype='in')),
+                outputs=copy(case.items(iotype='out')),
+                max_retries=case.max_retries, retries=case.retries,
+                label=case.label, case_uuid=case.uuid,
+                parent_uuid=case.parent_uuid, msg=case.msg)
+
+
+class _Sink(object):
+    """A recorder and the queue and thread feeding it. If `queue_size` is
+    0, Cases are recorded directly in the caller's thread.
+    """
+
+    def __init__(self, recorder, queue_size, overflow):
+        if overflow not in ('block', 'drop'):
+            raise ValueError("overflow must be 'block' or 'drop', not %r"
+                             % overflow)
+        self.recorder = recorder
+        self.overflow = overflow
+        self.recorded = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.blocked_time = 0.
+        self.max_queued = 0
+        self.errors = 0
+        self.closed = False
+        self._error = None
+        if queue_size > 0:
+            self._queue = Queue.Queue(queue_size)
+            self._thread = threading.Thread(target=self._loop,
+                                            name='FanOutCaseRecorder sink')
+            self._thread.daemon = True
+            self._thread.start()
+        else:
+            self._queue = None
+            self._thread = None
+
+    def put(self, case):
+        """Queue `case` for recording, or record it if we have no queue."""
+        if self.closed:
+            raise RuntimeError('FanOutCaseRecorder for %s has been closed'
+                               % self.recorder)
+        if self._queue is None:
+            self._record(case)
+            return
+        try:
+            self._queue.put_nowait(case)
+        except Queue.Full:
+            if self.overflow == 'drop':
+                self.dropped += 1
+                return
+            self.blocked += 1
+            start = time.time()
+            self._queue.put(case)
+            self.blocked_time += time.time() - start
+        self.max_queued = max(self.max_queued, self._queue.qsize())
+
+    def _record(self, case):
+        try:
+            self.recorder.record(case)
+        except Exception as err:
+            self.errors += 1
+            self._error = err
+        else:
+            self.recorded += 1
+
+    def _call(self, name):
+        """Call the method `name` of our recorder, if it has one."""
+        method = getattr(self.recorder, name, None)
+        if method is not None:
+            try:
+                method()
+            except Exception as err:
+                self.errors += 1
+                self._error = err
+
+    def _loop(self):
+        """Runs in our thread, recording Cases from the queue until it gets
+        None, which closes our recorder.
+        """
+        while True:
+            case = self._queue.get()
+            try:
+                if case is None:
+                    self._call('close')
+                    return
+                elif case is _FLUSH:
+                    self._call('flush')
+                else:
+                    self._record(case)
+            finally:
+                self._queue.task_done()
+
+    def check_error(self):
+        """Raise any error from recording in the caller's thread."""
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise RuntimeError('FanOutCaseRecorder failed to record to %s: %s'
+                               % (self.recorder, err))
+
+    def flush(self):
+        """Wait until all queued Cases are recorded, then flush."""
+        if self.closed:
+            return
+        if self._queue is None:
+            self._call('flush')
+        else:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def close(self):
+        """Record all queued Cases, close the recorder and stop our thread."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._queue is None:
+            self._call('close')
+        else:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def get_stats(self):
+        """Return a dict of our statistics."""
+        return dict(recorder=self.recorder, recorded=self.recorded,
+                    queued=self._queue.qsize() if self._queue else 0,
+                    max_queued=self.max_queued, blocked=self.blocked,
+                    blocked_time=self.blocked_time, dropped=self.dropped,
+                    errors=self.errors)
+
+
+class FanOutCaseRecorder(object):
+    """Records each Case to all of the given `recorders`.  Each recorder
+    is fed from its own queue of up to `queue_size` Cases by its own thread,
+    so :meth:`record` returns without waiting for the recorders and a slow
+    recorder doesn't delay the others.  Each recorder gets the Cases in the
+    order they were recorded.  The recorder's ``flush`` and ``close``
+    methods, if any, are also called from its thread.
+
+    When a recorder's queue is full, `overflow` determines what happens:
+    'block' waits until there's room, and 'drop' drops the Case for that
+    recorder.  Both are counted in the statistics returned by
+    :meth:`get_stats`.  A `queue_size` of 0 records in the caller's thread.
+    Errors from a recorder are raised as a RuntimeError by the next call to
+    :meth:`record`, :meth:`flush` or :meth:`close`.  After :meth:`close`,
+    :meth:`record` raises a RuntimeError and :meth:`flush` does nothing.
+
+    Since Cases are recorded later, a copy of each Case is queued.
+    """
+
+    implements(ICaseRecorder)
+
+    def __init__(self, recorders=(), queue_size=1000, overflow='block'):
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._sinks = []
+        for recorder in recorders:
+            self.add_recorder(recorder)
+
+    def add_recorder(self, recorder, queue_size=None, overflow=None):
+        """Add a recorder, optionally with its own `queue_size` and
+        `overflow` setting.
+        """
+        if queue_size is None:
+            queue_size = self.queue_size
+        if overflow is None:
+            overflow = self.overflow
+        self._sinks.append(_Sink(recorder, queue_size, overflow))
+
+    @property
+    def recorders(self):
+        """The list of recorders."""
+        return [sink.recorder for sink in self._sinks]
+
+    def record(self, case):
+        """Queue the given Case for each recorder."""
+        self._check_error()
+        if [sink for sink in self._sinks if sink._queue is not None]:
+            case = _snapshot(case)
+        for sink in self._sinks:
+            sink.put(case)
+
+    def _check_error(self):
+        for sink in self._sinks:
+            sink.check_error()
+
+    def flush(self):
+        """Wait until all queued Cases are recorded, and flush the
+        recorders.
+        """
+        for sink in self._sinks:
+            sink.flush()
+        self._check_error()
+
+    def close(self):
+        """Record all queued Cases and close the recorders."""
+        for sink in self._sinks:
+            sink.close()
+        self._check_error()
+
+    def get_stats(self):
+        """Return a list with a dict of statistics for each recorder:
+
+        recorder
+            The recorder.
+        recorded
+            Number of Cases recorded.
+        queued
+            Number of Cases currently waiting to be recorded.
+        max_queued
+            Largest number of Cases that have been waiting.
+        blocked
+            Number of times :meth:`record` had to wait for room in the queue.
+        blocked_time
+            Total time spent waiting, in seconds.
+        dropped
+            Number of Cases dropped because the queue was full.
+        errors
+            Number of errors from the recorder.
+        """
+        return [sink.get_stats() for sink in self._sinks]
+
+    def get_iterator(self):
+        """Return the iterator of the first recorder that has one, after
+        flushing.
+        """
+        self.flush()
+        for recorder in self.recorders:
+            if hasattr(recorder, 'get_iterator'):
+                return recorder.get_iterator()
+        return None
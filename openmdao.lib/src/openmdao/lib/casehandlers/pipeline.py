@@ -0,0 +1,170 @@
+"""
+A CaseIterator that passes the Cases from another CaseIterator through a
+series of stages, e.g., filtering, projecting onto a subset of variables,
+or computing derived outputs.  Cases are processed one at a time as they're
+iterated over, so a pipeline over a large case database or chunked case
+file needs only as much memory as the Cases currently being handled.
+
+Each stage method returns a new CasePipeline, so stages can be chained::
+
+    pipe = CasePipeline(DBCaseIterator('cases.db'))
+    pipe = pipe.without_errors().project(['comp.x', 'comp.y'])
+    pipe.tee(DBCaseRecorder('subset.db')).record(CaseSet())
+"""
+
+import copy
+from itertools import islice
+
+from openmdao.main.interfaces import implements, ICaseIterator
+from openmdao.main.case import Case
+
+__all__ = ['CasePipeline']
+
+
+def _filter(predicate):
+    def stage(cases):
+        for case in cases:
+            if predicate(case):
+                yield case
+    return stage
+
+def _map(func):
+    def stage(cases):
+        for case in cases:
+            case = func(case)
+            if case is not None:
+                yield case
+    return stage
+
+def _copy(case):
+    """Return a copy of `case` whose inputs and outputs can be changed
+    without changing `case`.  Values aren't copied.
+    """
+    case.uuid  # generate it now, so the copy has the same one
+    new = copy.copy(case)
+    new._inputs = dict(case._inputs)
+    if case._outputs is not None:
+        new._outputs = dict(case._outputs)
+    return new
+
+def _tee(recorders):
+    def stage(cases):
+        for case in cases:
+            for recorder in recorders:
+                recorder.record(case)
+            yield case
+    return stage
+
+
+class CasePipeline(object):
+    """A CaseIterator returning the Cases of `source` (any iterator of
+    Cases) after passing them through `stages`.  A stage is a function that
+    takes an iterator of Cases and returns an iterator of Cases.  Stages are
+    normally added using the methods of this class rather than given
+    directly.
+    """
+
+    implements(ICaseIterator)
+
+    def __init__(self, source, stages=()):
+        self.source = source
+        self._stages = tuple(stages)
+
+    def __iter__(self):
+        cases = iter(self.source)
+        for stage in self._stages:
+            cases = stage(cases)
+        return cases
+
+    def add_stage(self, stage):
+        """Return a new CasePipeline with `stage` added to the end of this
+        one's stages.
+        """
+        return CasePipeline(self.source, self._stages+(stage,))
+
+    def filter(self, predicate):
+        """Keep only the Cases for which `predicate(case)` is True."""
+        return self.add_stage(_filter(predicate))
+
+    def without_errors(self):
+        """Keep only the Cases that didn't report an error."""
+        return self.filter(lambda case: not case.msg)
+
+    def errors(self):
+        """Keep only the Cases that reported an error."""
+        return self.filter(lambda case: case.msg)
+
+    def having(self, names):
+        """Keep only the Cases that contain all of the given names."""
+        names = list(names)
+        return self.filter(lambda case: all([name in case for name in names]))
+
+    def project(self, names, strict=False):
+        """Replace each Case with one containing only the given inputs and
+        outputs.  The label, uuids and status of the Case are kept.  Names
+        missing from a Case are left out unless `strict` is True, in which
+        case the Case is dropped.
+        """
+        names = list(names)
+
+        def project(case):
+            inputs = []
+            outputs = []
+            for name in names:
+                if name in case._inputs:
+                    inputs.append((name, case._inputs[name]))
+                elif case._outputs and name in case._outputs:
+                    outputs.append((name, case._outputs[name]))
+                elif strict:
+                    return None
+            return Case(inputs=inputs, outputs=outputs, label=case.label,
+                        max_retries=case.max_retries, retries=case.retries,
+                        msg=case.msg, case_uuid=case.uuid,
+                        parent_uuid=case.parent_uuid)
+        return self.add_stage(_map(project))
+
+    def map(self, func):
+        """Replace each Case with `func(case)`, dropping it if that returns
+        None.
+        """
+        return self.add_stage(_map(func))
+
+    def derive(self, name, func):
+        """Replace each Case with a copy having an output called `name`,
+        with the value `func(case)`.  Cases of the source aren't changed.
+        """
+        def derive(case):
+            new = _copy(case)
+            new.add_output(name, func(case))
+            return new
+        return self.add_stage(_map(derive))
+
+    def limit(self, count):
+        """Stop after `count` Cases."""
+        return self.add_stage(lambda cases: islice(cases, count))
+
+    def tee(self, *recorders):
+        """Record each Case to the given recorders as it passes through."""
+        return self.add_stage(_tee(recorders))
+
+    def batches(self, size):
+        """Generates lists of up to `size` Cases."""
+        batch = []
+        for case in self:
+            batch.append(case)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def record(self, *recorders):
+        """Run all Cases through the pipeline, recording them to the given
+        recorders.  Returns the number of Cases recorded.
+        """
+        count = 0
+        for case in self:
+            for recorder in recorders:
+                recorder.record(case)
+            count += 1
+        return count
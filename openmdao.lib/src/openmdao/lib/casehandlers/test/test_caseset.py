@@ -1,5 +1,7 @@
 import unittest
 
+from numpy import ndarray, dtype, int64, float64
+
 from openmdao.main.api import Case
 from openmdao.lib.casehandlers.api import CaseSet, CaseArray, ListCaseIterator, \
                                           caseiter_to_caseset
@@ -78,6 +80,80 @@ class CaseArrayTestCase(unittest.TestCase):
         self.assertFalse(None in ca)
         
 
+class ColumnarTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cases = []
+        for i in range(20):
+            inputs = [('comp1.a', i % 10), ('comp1.b', i * 0.5 % 5.),
+                      ('comp1.s', 'str%d' % (i % 10))]
+            self.cases.append(Case(inputs=inputs,
+                                   outputs=[('comp1.c', float(i % 10))]))
+
+    def test_case_array(self):
+        ca = CaseArray(columnar=True)
+        for case in self.cases:
+            ca.record(case)
+        self.assertEqual(len(ca), 20)
+        col = ca['comp1.a']
+        self.assertTrue(isinstance(col, ndarray))
+        self.assertEqual(col.dtype, dtype(int64))
+        self.assertEqual(list(col), range(10) * 2)
+        self.assertEqual(ca['comp1.b'].dtype, dtype(float64))
+        self.assertEqual(ca['comp1.s'].dtype, dtype(object))
+        self.assertEqual(ca[3], self.cases[3])
+        self.assertTrue(self.cases[13] in ca)
+        self.assertFalse(Case(inputs=[('comp1.a', 1), ('comp1.b', 0.),
+                                      ('comp1.s', 'str1')],
+                              outputs=[('comp1.c', 1.)]) in ca)
+
+        ca.remove(self.cases[0])
+        self.assertEqual(len(ca), 19)
+        self.assertTrue(self.cases[0] in ca)  # there's a duplicate
+        ca.remove(self.cases[0])
+        self.assertFalse(self.cases[0] in ca)
+        case = ca.pop()
+        self.assertEqual(case, self.cases[19])
+        self.assertEqual(list(ca['comp1.a']), range(1, 10) + range(1, 9))
+
+        cacopy = ca.copy()
+        ca.pop(0)
+        self.assertEqual(len(cacopy), 17)
+        for c1, c2 in zip(cacopy, self.cases[1:10]):
+            self.assertEqual(c1, c2)
+
+    def test_upcast(self):
+        ca = CaseArray({'x': [1, 2, 3.5], 'y': [1, 'a', None]},
+                       columnar=True)
+        self.assertEqual(ca['x'].dtype, dtype(float64))
+        self.assertEqual(list(ca['x']), [1., 2., 3.5])
+        self.assertEqual(ca['y'].dtype, dtype(object))
+        self.assertTrue(Case(inputs=[('x', 2), ('y', 'a')]) in ca)
+
+    def test_case_set(self):
+        cs = CaseSet(columnar=True)
+        for case in self.cases:
+            cs.record(case)
+        self.assertEqual(len(cs), 10)
+        self.assertEqual(list(cs['comp1.c']), [float(i) for i in range(10)])
+        self.assertTrue(self.cases[15] in cs)
+        cs2 = CaseSet(columnar=True)
+        for case in self.cases[5:15]:
+            cs2.record(case)
+        self.assertEqual(len(cs2), 10)
+        self.assertTrue(cs == cs2)
+        cs2.remove(self.cases[5])
+        diff = cs - cs2
+        self.assertEqual(len(diff), 1)
+        self.assertEqual(diff['comp1.a'].tolist(), [5])
+        self.assertEqual(cs2.pop(0), self.cases[6])
+        self.assertEqual(len(cs | cs2), 10)
+        cscopy = cs.copy()
+        cs.clear()
+        self.assertEqual(len(cscopy), 10)
+        self.assertEqual(len(cs['comp1.a']), 0)
+
+
 class CaseSetTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,150 @@
+"""
+Test for ChunkedCaseRecorder and ChunkedCaseIterator.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from numpy import arange, zeros
+
+from openmdao.main.api import Assembly, Case, set_as_top
+from openmdao.test.execcomp import ExecComp
+from openmdao.lib.casehandlers.api import ChunkedCaseRecorder, \
+                                          ChunkedCaseIterator, ListCaseIterator
+from openmdao.lib.drivers.simplecid import SimpleCaseIterDriver
+
+
+class ChunkedCasesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tdir, 'cases.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tdir)
+
+    def _record(self, recorder, ncases):
+        for i in range(ncases):
+            inputs = [('comp.x', float(i)), ('comp.n', i), ('comp.s', 'str%d' % i)]
+            if i % 3 == 0:
+                inputs.append(('comp.grid', arange(6.).reshape((2, 3)) * i))
+            outputs = [('comp.flow', zeros(100) + i), ('comp.ok', True)]
+            recorder.record(Case(inputs=inputs, outputs=outputs,
+                                 label='case%d' % i))
+
+    def test_roundtrip(self):
+        recorder = ChunkedCaseRecorder(self.filename, chunk_size=4)
+        self._record(recorder, 10)
+        iterator = ChunkedCaseIterator(self.filename)
+        self.assertEqual(len(iterator), 8)  # 2 cases still pending
+        recorder.close()
+        iterator.refresh()
+        self.assertEqual(len(iterator), 10)
+        self.assertEqual(iterator.get_names(),
+                         set(['comp.x', 'comp.n', 'comp.s', 'comp.grid',
+                              'comp.flow', 'comp.ok']))
+
+        for i, case in enumerate(iterator):
+            self.assertEqual(case.label, 'case%d' % i)
+            self.assertEqual(case['comp.x'], float(i))
+            self.assertTrue(isinstance(case['comp.n'], int))
+            self.assertEqual(case['comp.n'], i)
+            self.assertEqual(case['comp.s'], 'str%d' % i)
+            self.assertEqual(case['comp.ok'], True)
+            self.assertEqual(case['comp.flow'][5], i)
+            self.assertTrue(case['comp.flow'].flags.writeable)
+            if i % 3 == 0:
+                self.assertEqual(case['comp.grid'][1, 2], 5. * i)
+            else:
+                self.assertFalse('comp.grid' in case)
+        self.assertEqual(i, 9)
+
+    def test_values(self):
+        recorder = ChunkedCaseRecorder(self.filename, chunk_size=4)
+        self._record(recorder, 10)
+        iterator = recorder.get_iterator()
+
+        flow = iterator.get_values('comp.flow')
+        self.assertEqual(flow.shape, (10, 100))
+        self.assertEqual(list(flow[:, 0]), range(10))
+        self.assertEqual(list(iterator.get_values('comp.n')), range(10))
+        self.assertEqual(iterator.get_values('comp.s')[3], 'str3')
+
+        parts = list(iterator.iter_values('comp.grid'))
+        self.assertEqual([indices for indices, values in parts],
+                         [[0, 3], [6], [9]])
+        self.assertEqual(parts[0][1].shape, (2, 2, 3))
+        self.assertFalse(parts[0][1].flags.writeable)  # mapped from file
+        self.assertEqual(iterator.get_values('comp.grid').shape, (4, 2, 3))
+
+    def test_mixed_values(self):
+        recorder = ChunkedCaseRecorder(self.filename, chunk_size=3)
+        values = [1, 2.5, 3, zeros(2), zeros(3), 4.]
+        for value in values:
+            recorder.record(Case(inputs=[('comp.x', value)]))
+        iterator = recorder.get_iterator()
+
+        # Values are in the order recorded, with their original types.
+        result = iterator.get_values('comp.x')
+        self.assertEqual(result[:3], [1, 2.5, 3])
+        self.assertTrue(isinstance(result[0], int))
+        self.assertEqual([len(value) for value in result[3:5]], [2, 3])
+        self.assertEqual(result[5], 4.)
+        self.assertEqual([case['comp.x'] for case in iterator][:3], [1, 2.5, 3])
+
+    def test_append(self):
+        recorder = ChunkedCaseRecorder(self.filename)
+        self._record(recorder, 3)
+        recorder.close()
+
+        # simulate a run that died while writing a record
+        with open(self.filename, 'ab') as out:
+            out.write('\xff' * 30)
+        self.assertEqual(len(ChunkedCaseIterator(self.filename)), 3)
+
+        recorder = ChunkedCaseRecorder(self.filename, append=True)
+        self._record(recorder, 2)
+        recorder.close()
+        self.assertEqual(list(ChunkedCaseIterator(self.filename).get_values('comp.x')),
+                         [0., 1., 2., 0., 1.])
+
+        try:
+            recorder.record(Case())
+        except RuntimeError as err:
+            self.assertEqual(str(err), 'ChunkedCaseRecorder for %s has been closed'
+                                       % self.filename)
+        else:
+            self.fail('RuntimeError expected')
+
+    def test_bad_file(self):
+        with open(self.filename, 'w') as out:
+            out.write('not a case file')
+        try:
+            ChunkedCaseIterator(self.filename)
+        except IOError as err:
+            self.assertEqual(str(err), "'%s' is not a chunked case file"
+                                       % self.filename)
+        else:
+            self.fail('IOError expected')
+
+    def test_driver(self):
+        top = set_as_top(Assembly())
+        driver = top.add('driver', SimpleCaseIterDriver())
+        top.add('comp1', ExecComp(exprs=['z=x+y']))
+        driver.workflow.add('comp1')
+        cases = [Case(inputs=[('comp1.x', i), ('comp1.y', i*2)],
+                      outputs=['comp1.z']) for i in range(10)]
+        driver.iterator = ListCaseIterator(cases)
+        driver.recorder = ChunkedCaseRecorder(self.filename, chunk_size=3)
+        top.run()
+        driver.recorder.close()
+
+        iterator = ChunkedCaseIterator(self.filename)
+        self.assertEqual(list(iterator.get_values('comp1.z')),
+                         [i*3. for i in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,11 +10,17 @@ import tempfile
 import logging
 import shutil
 import copy
+import sqlite3
+
+from numpy import arange, array, dtype, zeros
 
 from openmdao.main.api import Component, Assembly, Case, set_as_top
 from openmdao.test.execcomp import ExecComp
 from openmdao.lib.casehandlers.api import DBCaseIterator, ListCaseIterator
 from openmdao.lib.casehandlers.api import DBCaseRecorder, DumpCaseRecorder, case_db_to_dict 
+from openmdao.lib.casehandlers.api import case_db_to_arrays, case_db_chunks, \
+                                          case_db_array_query, migrate_db
+from openmdao.lib.casehandlers.db import _get_lines
 from openmdao.lib.drivers.simplecid import SimpleCaseIterDriver
 from openmdao.main.uncertain_distributions import NormalDistribution
 
@@ -106,6 +112,227 @@ class DBCaseRecorderTestCase(unittest.TestCase):
                 self.assertTrue(value >= 0 and value<3)
         self.assertEqual(count, 3)
 
+    def _count_cases(self, recorder):
+        cur = recorder._connection.execute("SELECT count(*) FROM cases")
+        return cur.fetchone()[0]
+
+    def test_batched(self):
+        recorder = DBCaseRecorder(batch_size=4)
+        for i in range(10):
+            recorder.record(Case(inputs=[('comp1.x', i)],
+                                 outputs=[('comp1.z', [i, i])]))
+        self.assertEqual(self._count_cases(recorder), 8)
+        recorder.flush()
+        self.assertEqual(self._count_cases(recorder), 10)
+        for i,case in enumerate(recorder.get_iterator()):
+            self.assertEqual(case['comp1.x'], i)
+            self.assertEqual(case['comp1.z'], [i, i])
+        self.assertEqual(i, 9)
+        recorder.close()
+        try:
+            recorder.record(Case())
+        except RuntimeError as err:
+            self.assertEqual(str(err),
+                             'DBCaseRecorder for :memory: has been closed')
+        else:
+            self.fail('RuntimeError expected')
+
+    def test_background(self):
+        recorder = DBCaseRecorder(batch_size=1000, background=True)
+        for i in range(10):
+            recorder.record(Case(inputs=[('comp1.x', i)]))
+        recorder.flush()
+        self.assertEqual(self._count_cases(recorder), 10)
+        self.assertEqual([case['comp1.x'] for case in recorder.get_iterator()],
+                         range(10))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            dbname = os.path.join(tmpdir, 'junk.db')
+            recorder = DBCaseRecorder(dbname, batch_size=3, background=True)
+            self.top.driver.recorder = recorder
+            self.top.run()
+            recorder.close()
+            self.assertFalse(recorder._writer.is_alive())
+            self.assertEqual(len(list(DBCaseIterator(dbname))), 10)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_write_error(self):
+        for background in (False, True):
+            recorder = DBCaseRecorder(batch_size=2, background=background)
+            write = recorder._write
+            def fail(batch):
+                recorder._write = write
+                raise IOError('disk I/O error')
+            recorder._write = fail
+            try:
+                for i in range(2):
+                    recorder.record(Case(inputs=[('comp1.x', i)]))
+                recorder.flush()
+            except RuntimeError as err:
+                self.assertEqual(str(err), 'DBCaseRecorder for :memory:'
+                                 ' failed to write 2 Cases: disk I/O error')
+            else:
+                self.fail('RuntimeError expected')
+            # Later Cases are still written.
+            for i in range(2, 5):
+                recorder.record(Case(inputs=[('comp1.x', i)]))
+            recorder.flush()
+            self.assertEqual([case['comp1.x']
+                              for case in recorder.get_iterator()],
+                             range(2, 5))
+            recorder.close()
+
+    def test_wide(self):
+        recorder = DBCaseRecorder(wide=True)
+        for i in range(10):
+            inputs = [('comp1.x', i), ('comp1.y', i*2.)]
+            outputs = [('comp1.z', i*1.5), ('comp2.normal', NormalDistribution(float(i),0.5))]
+            recorder.record(Case(inputs=inputs, outputs=outputs, label='case%s'%i))
+        cur = recorder._connection.execute("SELECT * FROM casedata")
+        self.assertEqual(len(cur.fetchall()), 10)
+        cur = recorder._connection.execute("SELECT count(*) FROM casevalues")
+        self.assertEqual(cur.fetchone()[0], 10)  # just comp2.normal
+        for i,case in enumerate(recorder.get_iterator()):
+            self.assertEqual(case['comp2.normal'].mu, float(i))
+            self.assertTrue(isinstance(case['comp1.x'], int))
+            self.assertEqual(case['comp1.x'], i)
+            self.assertEqual(case['comp1.z'], i*1.5)
+        iterator = recorder.get_iterator()
+        iterator.selectors = ["value>=0","value<3"]
+        self.assertEqual(len(list(iterator)), 3)
+
+    def test_migrate(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            dbname = os.path.join(tmpdir, 'old.db')
+            # create a DB with the original layout
+            connection = sqlite3.connect(dbname)
+            connection.execute("""create table cases(id INTEGER PRIMARY KEY,
+                uuid TEXT, parent TEXT, label TEXT, msg TEXT, retries INTEGER,
+                model_id TEXT, timeEnter TEXT)""")
+            connection.execute("""create table casevars(
+                var_id INTEGER PRIMARY KEY, name TEXT, case_id INTEGER,
+                sense TEXT, value BLOB)""")
+            for i in range(3):
+                connection.execute("insert into cases values (?,?,'','','',0,'','')",
+                                   (i+1, 'uuid%d' % i))
+                connection.execute("insert into casevars values (NULL,'comp1.x',?,'i',?)",
+                                   (i+1, i))
+                connection.execute("insert into casevars values (NULL,'comp1.z',?,'o',?)",
+                                   (i+1, i*1.5))
+            connection.commit()
+            connection.close()
+
+            migrate_db(dbname)
+            recorder = DBCaseRecorder(dbname, append=True)
+            recorder.record(Case(inputs=[('comp1.x', 3)],
+                                 outputs=[('comp1.z', 4.5)]))
+            recorder.close()
+            varinfo = case_db_to_dict(dbname, ['comp1.x', 'comp1.z'])
+            self.assertEqual(varinfo['comp1.x'], [0, 1, 2, 3])
+            self.assertEqual(varinfo['comp1.z'], [0., 1.5, 3., 4.5])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_db_to_arrays(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for wide in (False, True):
+                dfile = os.path.join(tmpdir, 'junk%s.db' % wide)
+                recorder = DBCaseRecorder(dfile, wide=wide, batch_size=100)
+                for i in range(25):
+                    if i % 5:
+                        inputs = [('comp1.x', i), ('comp1.y', i*2.)]
+                    else:
+                        inputs = [('comp1.x', i)]
+                    outputs = [('comp1.z', [i, i+1])]
+                    recorder.record(Case(inputs=inputs, outputs=outputs,
+                                         msg='error' if i == 3 else ''))
+                recorder.close()
+
+                arrays = case_db_to_arrays(dfile, ['comp1.x', 'comp1.y'])
+                expected = [i for i in range(25) if i % 5 and i != 3]
+                self.assertEqual(list(arrays['comp1.x']), expected)
+                self.assertEqual(list(arrays['comp1.y']),
+                                 [i*2. for i in expected])
+
+                arrays = case_db_to_arrays(dfile, ['comp1.z'],
+                                           case_sql='id <= 2')
+                self.assertEqual(arrays['comp1.z'].shape, (2, 2))
+                self.assertEqual(list(arrays['comp1.z'][1]), [1, 2])
+
+                sizes = [len(chunk['comp1.x'])
+                         for chunk in case_db_chunks(dfile, ['comp1.x'],
+                                                     chunk_size=10,
+                                                     include_errors=True)]
+                self.assertEqual(sizes, [10, 10, 5])
+
+                lines = _get_lines(dfile, [], ['comp1.y'],
+                                   var_sql='value < 20')
+                self.assertEqual(list(lines[0][0]), range(7))
+                self.assertEqual(list(lines[0][1]),
+                                 [2., 4., 8., 12., 14., 16., 18.])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_array_storage(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for compress in (False, True):
+                dfile = os.path.join(tmpdir, 'junk%s.db' % compress)
+                recorder = DBCaseRecorder(dfile, compress=compress)
+                for i in range(5):
+                    inputs = [('comp1.x', arange(6.).reshape((2, 3)) * i),
+                              ('comp1.s', array(['a', 'b']))]
+                    outputs = [('comp1.z', zeros(1000, 'i') + i),
+                               ('comp1.y', array(7.5))]
+                    recorder.record(Case(inputs=inputs, outputs=outputs))
+                recorder.close()
+
+                case = list(DBCaseIterator(dfile))[2]
+                self.assertEqual(case['comp1.x'].tolist(),
+                                 [[0., 2., 4.], [6., 8., 10.]])
+                self.assertTrue(case['comp1.x'].flags.writeable)
+                self.assertEqual(case['comp1.z'].dtype, dtype('i'))
+                self.assertEqual(case['comp1.y'].shape, ())
+                self.assertEqual(case['comp1.s'].tolist(), ['a', 'b'])
+
+                varinfo = case_db_to_dict(dfile, ['comp1.x'])
+                value = varinfo['comp1.x'][1]
+                value[0, 0] = 99.
+                self.assertEqual(value.tolist(), [[99., 1., 2.], [3., 4., 5.]])
+
+                result = case_db_array_query(dfile, 'comp1.x',
+                                             index=(slice(None), 1))
+                self.assertEqual(result.tolist(),
+                                 [[i, 4.*i] for i in range(5)])
+                result = case_db_array_query(dfile, 'comp1.x',
+                                             reduction='sum')
+                self.assertEqual(result.tolist(), [15.*i for i in range(5)])
+                result = case_db_array_query(dfile, 'comp1.z',
+                                             index=slice(10, 12),
+                                             reduction=max)
+                self.assertEqual(result.tolist(), range(5))
+
+                arrays = case_db_to_arrays(dfile, ['comp1.x'],
+                                           var_sql='array_max(value) > 10')
+                self.assertEqual(arrays['comp1.x'].shape, (2, 2, 3))
+                arrays = case_db_to_arrays(dfile, ['comp1.x'],
+                                           var_sql='array_item(value, 5) = 10')
+                self.assertEqual(arrays['comp1.x'].shape, (1, 2, 3))
+
+            try:
+                case_db_array_query(dfile, 'comp1.x', reduction='foo')
+            except ValueError as err:
+                self.assertEqual(str(err), "unknown reduction 'foo', must be"
+                                 " one of ['max', 'mean', 'min', 'norm', 'sum']")
+            else:
+                self.fail('ValueError expected')
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_tables_already_exist(self):
         dbdir = tempfile.mkdtemp()
         dbname = os.path.join(dbdir,'junk_dbfile')
@@ -0,0 +1,140 @@
+"""
+Test for FanOutCaseRecorder.
+"""
+
+import threading
+import unittest
+from cStringIO import StringIO
+
+from numpy import zeros
+
+from openmdao.main.api import Case
+from openmdao.lib.casehandlers.api import FanOutCaseRecorder, DBCaseRecorder, \
+                                          DumpCaseRecorder, ListCaseRecorder
+
+
+class SlowRecorder(ListCaseRecorder):
+    """Records only when allowed to by its event."""
+
+    def __init__(self):
+        super(SlowRecorder, self).__init__()
+        self.go = threading.Event()
+        self.threads = set()
+        self.flushed = self.closed = False
+
+    def record(self, case):
+        self.go.wait()
+        self.threads.add(threading.current_thread())
+        if case.label == 'bad':
+            raise ValueError('bad case')
+        super(SlowRecorder, self).record(case)
+
+    def flush(self):
+        self.flushed = True
+
+    def close(self):
+        self.closed = True
+
+
+class FanOutTestCase(unittest.TestCase):
+
+    def _cases(self, count):
+        return [Case(inputs=[('comp.x', i), ('comp.y', zeros(3)+i)],
+                     outputs=[('comp.z', i*2.)], label='case%d' % i)
+                for i in range(count)]
+
+    def test_fanout(self):
+        slow = SlowRecorder()
+        fast = ListCaseRecorder()
+        db = DBCaseRecorder()
+        out = StringIO()
+        recorder = FanOutCaseRecorder([fast, db, DumpCaseRecorder(out)])
+        recorder.add_recorder(slow, queue_size=2, overflow='drop')
+
+        cases = self._cases(10)
+        for case in cases:
+            recorder.record(case)
+            case['comp.y'][0] = -1  # changes after recording aren't seen
+
+        # slow recorder's queue filled up, so most cases were dropped
+        stats = recorder.get_stats()
+        self.assertEqual([s['dropped'] for s in stats[:3]], [0, 0, 0])
+        self.assertTrue(stats[3]['dropped'] >= 7)
+        slow.go.set()
+        recorder.flush()
+
+        self.assertEqual([case.label for case in fast.cases],
+                         ['case%d' % i for i in range(10)])
+        self.assertEqual(fast.cases[3]['comp.y'][0], 3)
+        self.assertEqual(fast.cases[3].uuid, cases[3].uuid)
+        self.assertEqual(len(list(db.get_iterator())), 10)
+        self.assertEqual(out.getvalue().count('Case: '), 10)
+        self.assertEqual(recorder.recorders[:2], [fast, db])
+        self.assertTrue(slow.flushed)
+        stats = recorder.get_stats()
+        self.assertEqual(stats[0]['recorded'], 10)
+        stats = stats[3]
+        self.assertEqual(stats['recorded'] + stats['dropped'], 10)
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['max_queued'], 2)
+        labels = [case.label for case in slow.cases]
+        self.assertEqual(labels, sorted(labels, key=lambda l: int(l[4:])))
+        self.assertEqual(len(slow.threads), 1)
+        self.assertNotEqual(slow.threads.pop(), threading.current_thread())
+
+        recorder.close()
+        self.assertTrue(slow.closed)
+        recorder.close()
+
+        # After close, flushing does nothing and recording fails.
+        self.assertEqual(len(list(recorder.get_iterator())), 10)
+        try:
+            recorder.record(cases[0])
+        except RuntimeError as err:
+            self.assertEqual(str(err), 'FanOutCaseRecorder for %s has been '
+                                       'closed' % fast)
+        else:
+            self.fail('RuntimeError expected')
+
+    def test_block(self):
+        slow = SlowRecorder()
+        recorder = FanOutCaseRecorder([slow], queue_size=1)
+        timer = threading.Timer(0.2, slow.go.set)
+        timer.start()
+        for case in self._cases(5):
+            recorder.record(case)
+        recorder.close()
+        stats = recorder.get_stats()[0]
+        self.assertEqual(stats['recorded'], 5)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertTrue(stats['blocked'] >= 1)
+        self.assertTrue(stats['blocked_time'] > 0.)
+
+    def test_errors(self):
+        slow = SlowRecorder()
+        slow.go.set()
+        recorder = FanOutCaseRecorder([slow], queue_size=0)
+        recorder.record(Case(label='bad'))
+        try:
+            recorder.record(Case())
+        except RuntimeError as err:
+            self.assertTrue(str(err).startswith('FanOutCaseRecorder failed to '
+                                                'record to'))
+            self.assertTrue(str(err).endswith(': bad case'))
+        else:
+            self.fail('RuntimeError expected')
+        self.assertEqual(recorder.get_stats()[0]['errors'], 1)
+        self.assertEqual(len(slow.threads), 1)
+        self.assertEqual(slow.threads.pop(), threading.current_thread())
+
+        try:
+            FanOutCaseRecorder([slow], overflow='wait')
+        except ValueError as err:
+            self.assertEqual(str(err), "overflow must be 'block' or 'drop', "
+                                       "not 'wait'")
+        else:
+            self.fail('ValueError expected')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Test for CasePipeline.
+"""
+
+import unittest
+
+from openmdao.main.api import Case
+from openmdao.lib.casehandlers.api import CasePipeline, CaseSet, \
+                                          ListCaseIterator, ListCaseRecorder
+
+
+def _cases(count):
+    """Generates cases, so only those being used exist at any time."""
+    for i in range(count):
+        msg = 'failed' if i % 5 == 4 else None
+        yield Case(inputs=[('comp.x', i), ('comp.y', i*2)],
+                   outputs=[('comp.z', i*3)], label='case%d' % i, msg=msg)
+
+
+class CasePipelineTestCase(unittest.TestCase):
+
+    def test_stages(self):
+        source = ListCaseIterator(_cases(20))
+        pipe = CasePipeline(source).without_errors()
+        self.assertEqual(len(list(pipe)), 16)
+        self.assertEqual(len(list(CasePipeline(source).errors())), 4)
+        self.assertEqual(len(list(pipe)), 16)  # can iterate again
+
+        pipe = pipe.filter(lambda case: case['comp.x'] % 2) \
+                   .project(['comp.x', 'comp.z']) \
+                   .derive('comp.w', lambda case: case['comp.z'] + 1)
+        cases = list(pipe)
+        self.assertEqual([case['comp.x'] for case in cases],
+                         [1, 3, 5, 7, 11, 13, 15, 17])
+        self.assertEqual(cases[0].label, 'case1')
+        self.assertEqual(cases[1].uuid, source[3].uuid)
+        self.assertEqual(cases[0].keys(iotype='in'), ['comp.x'])
+        self.assertEqual(sorted(cases[0].keys(iotype='out')),
+                         ['comp.w', 'comp.z'])
+        self.assertEqual(cases[2]['comp.w'], 16)
+        self.assertEqual(len(list(pipe.limit(3))), 3)
+
+        # derive() doesn't change the source's Cases.
+        pipe = CasePipeline(source).derive('comp.v', lambda case: 1)
+        self.assertEqual([case.uuid for case in pipe],
+                         [case.uuid for case in source])
+        self.assertFalse('comp.v' in source[0])
+
+        pipe = CasePipeline(source).project(['comp.x', 'comp.q'], strict=True)
+        self.assertEqual(list(pipe), [])
+        pipe = CasePipeline(source).having(['comp.x', 'comp.q'])
+        self.assertEqual(list(pipe), [])
+        pipe = CasePipeline(source).map(lambda case: case if case.msg else None)
+        self.assertEqual([case.label for case in pipe],
+                         ['case4', 'case9', 'case14', 'case19'])
+
+    def test_streaming(self):
+        # a generator source is only read once, as cases are needed
+        seen = []
+        def source():
+            for case in _cases(10):
+                seen.append(case.label)
+                yield case
+        pipe = CasePipeline(source()).without_errors()
+        first = iter(pipe).next()
+        self.assertEqual(first.label, 'case0')
+        self.assertEqual(seen, ['case0'])
+
+    def test_batches_and_tee(self):
+        recorder = ListCaseRecorder()
+        pipe = CasePipeline(_cases(10)).tee(recorder).without_errors()
+        batches = list(pipe.batches(3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 2])
+        self.assertEqual(len(recorder), 10)
+
+        caseset = CaseSet()
+        recorder = ListCaseRecorder()
+        count = CasePipeline(_cases(10)).errors().record(caseset, recorder)
+        self.assertEqual(count, 2)
+        self.assertEqual(len(caseset), 2)
+        self.assertEqual(len(recorder), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
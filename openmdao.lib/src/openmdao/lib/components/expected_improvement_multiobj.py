@@ -46,14 +46,14 @@ class MultiObjExpectedImprovement(Component):
         #y_star is a 2D list of pareto points
 
         
-        y_star = zip(*[self.best_cases[crit] for crit in self.criteria])
+        y_star = array([self.best_cases[crit] for crit in self.criteria]).T
 
-        if not y_star: #empty y_star set means no cases met the criteria!
+        if not len(y_star): #empty y_star set means no cases met the criteria!
             self.raise_exception('no cases in the provided case_set had output '
                  'matching the provided criteria, %s'%self.criteria, ValueError)
         
         #sort list on first objective
-        y_star = array(y_star)[array([i[0] for i in y_star]).argsort()]
+        y_star = y_star[y_star[:,0].argsort()]
         return y_star
         
     def _multiPI(self,mu,sigma):
@@ -14,7 +14,7 @@ from openmdao.main.api import ComponentWithDerivatives
 from openmdao.main.exceptions import RunInterrupted, RunStopped
 from openmdao.main.rbac import AccessController, RoleError, rbac, remote_access
 from openmdao.main.resource import ResourceAllocationManager as RAM
-from openmdao.util.filexfer import filexfer, pack_zipfile, unpack_zipfile
+from openmdao.util.filexfer import filexfer, send_file, unpack_zipfile
 from openmdao.util.shellproc import ShellProc
 
 
@@ -194,22 +194,35 @@ class ExternalCode(ComponentWithDerivatives):
         return (return_code, error_msg)
 
     def _send_inputs(self, patterns):
-        """ Sends input files matching `patterns`. """
+        """
+        Sends input files matching `patterns`.  Only the parts of each file
+        the server doesn't already have are sent, compressed.
+        """
         self._logger.info('sending inputs...')
         start_time = time.time()
 
-        filename = 'inputs.zip'
-        pfiles, pbytes = pack_zipfile(patterns, filename, self._logger)
-        try:
-            filexfer(None, filename, self._server, filename, 'b')
-            ufiles, ubytes = self._server.unpack_zipfile(filename)
-        finally:
-            os.remove(filename)
+        pfiles = pbytes = 0
+        ubytes = 0
+        nsent = 0
+        for pattern in patterns:
+            for path in glob.glob(pattern):
+                size = os.path.getsize(path)
+                pfiles += 1
+                pbytes += size
+                # Same relative path on the server as with a zip file.
+                dst_path = os.path.splitdrive(path)[1].lstrip(os.sep)
+                nbytes, sent = send_file(path, self._server, dst_path,
+                                         compress=True)
+                self._logger.debug("sent '%s' (%d of %d)", path, sent, size)
+                ubytes += nbytes
+                nsent += sent
+        self._logger.debug('sent %d bytes for %d files (%d bytes)',
+                           nsent, pfiles, pbytes)
 
         # Difficult to force file transfer error.
-        if ufiles != pfiles or ubytes != pbytes:  #pragma no cover
+        if ubytes != pbytes:  #pragma no cover
             msg = 'Inputs xfer error: %d:%d vs. %d:%d' \
-                  % (ufiles, ubytes, pfiles, pbytes)
+                  % (pfiles, ubytes, pfiles, pbytes)
             self.raise_exception(msg, RuntimeError)
 
         et = time.time() - start_time
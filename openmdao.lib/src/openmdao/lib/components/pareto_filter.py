@@ -1,6 +1,8 @@
 """ Pareto Filter -- finds non-dominated cases. """
 
 # pylint: disable-msg=E0611,F0401
+from numpy import array
+
 from openmdao.lib.datatypes.api import Slot, List, ListStr
 from openmdao.lib.casehandlers.api import CaseSet, caseiter_to_caseset
 
@@ -58,34 +60,27 @@ class ParetoFilter(Component):
             else: 
                 case_sets.append(ci)
         
-        y_list = []
         if len(case_sets) > 1: 
             case_set = case_sets[0].union(*case_sets[1:])
         else: 
             case_set = case_sets[0]
-        criteria_count = len(self.criteria)
         
         try: 
-            # need to transpose the list of outputs
-            y_list = zip(*[case_set[crit] for crit in self.criteria]) 
+            # one row per case, one column per criterion
+            y = array([case_set[crit] for crit in self.criteria]).T
         except KeyError: 
             self.raise_exception('no cases provided had all of the outputs '
                  'matching the provided criteria, %s'%self.criteria, ValueError)
-            
-        y_temp = list(y_list)
         
         self.dominated_set = CaseSet()
         self.pareto_set = CaseSet() #TODO: need a way to copy casesets
 
-        for point1, case in zip(y_list, iter(case_set)):
-            dominated = False
-            for point2 in y_temp:
-                if self._is_dominated(point1, point2):
-                    self.dominated_set.record(case)
-                    y_temp.remove(point1)
-                    dominated = True
-                    break
-            if not dominated: 
+        for point, case in zip(y, iter(case_set)):
+            # dominated if some other point is no worse in every criterion
+            # and different in at least one
+            if ((y <= point).all(axis=1) & (y != point).any(axis=1)).any():
+                self.dominated_set.record(case)
+            else: 
                 self.pareto_set.record(case)
      
 if __name__ == "__main__": # pragma: no cover  
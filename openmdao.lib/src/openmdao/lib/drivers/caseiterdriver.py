@@ -1,19 +1,27 @@
+import hashlib
+import heapq
+import multiprocessing
 import os.path
 import Queue
 import sys
 import thread
 import threading
+import time
 
-from openmdao.lib.datatypes.api import Bool, Enum
+from numpy import ndarray, array_equal
 
-from openmdao.main.api import Driver
+from openmdao.lib.datatypes.api import Bool, Enum, Float
+
+from openmdao.main.api import Case, Component, Container, Driver
 from openmdao.main.exceptions import RunStopped
 from openmdao.main.interfaces import ICaseIterator, ICaseRecorder
+from openmdao.main.mp_support import is_instance
+from openmdao.main.procworker import ProcessWorker, pickle_model
 from openmdao.main.rbac import get_credentials, set_credentials
 from openmdao.main.resource import ResourceAllocationManager as RAM
 from openmdao.main.resource import LocalAllocator
 from openmdao.lib.datatypes.int import Int
-from openmdao.util.filexfer import filexfer
+from openmdao.util.filexfer import send_file
 from openmdao.main.slot import Slot
 
 from openmdao.util.decorators import add_delegate
@@ -28,12 +36,125 @@ class _ServerError(Exception):
     pass
 
 
+def _release(server):
+    """ Release a server or stop a worker process. """
+    if isinstance(server, ProcessWorker):
+        server.close()
+    else:
+        RAM.release(server)
+
+
+def _same(old, new):
+    """ Return True if input value `new` is the same as `old`. """
+    try:
+        if isinstance(old, ndarray) or isinstance(new, ndarray):
+            return array_equal(old, new)
+        return bool(old == new)
+    except Exception:
+        return False
+
+
+class _RunningMedian(object):
+    """
+    Median of the values added so far, kept in two heaps so adding a value
+    is O(log n) and the median is O(1).
+    """
+
+    def __init__(self):
+        self._low = []   # Max-heap (negated) of the smaller half.
+        self._high = []  # Min-heap of the larger half.
+
+    def __len__(self):
+        return len(self._low) + len(self._high)
+
+    def add(self, value):
+        """ Add `value`. """
+        if self._low and value > -self._low[0]:
+            heapq.heappush(self._high, value)
+        else:
+            heapq.heappush(self._low, -value)
+        # Keep len(_low) == len(_high) or len(_high) + 1.
+        if len(self._low) > len(self._high) + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+        elif len(self._high) > len(self._low):
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+
+    @property
+    def median(self):
+        """ Median of the values added, None if there are none. """
+        if not self._low:
+            return None
+        if len(self._low) > len(self._high):
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2.
+
+
+class _ServerPool(object):
+    """
+    Servers kept between runs, with the model they have loaded.  The model
+    is identified by `key`.  Servers idle for `timeout` seconds are released.
+    """
+
+    def __init__(self, key, timeout):
+        self.key = key
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = []  # (time put, server, server_info, top_level)
+        self._timer = None
+
+    def get(self):
+        """ Return (server, server_info, top_level), or None if none idle. """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()[1:]
+        return None
+
+    def put(self, server, server_info, top_level):
+        """ Keep `server` until it's used again or times out. """
+        with self._lock:
+            self._idle.append((time.time(), server, server_info, top_level))
+            self._schedule()
+
+    def _schedule(self):
+        """ Set timer for the oldest idle server. Called with lock held. """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._idle:
+            delay = self._idle[0][0] + self.timeout - time.time()
+            self._timer = threading.Timer(max(delay, 0.), self._reap)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _reap(self):
+        """ Release servers which have been idle too long. """
+        with self._lock:
+            self._timer = None
+            limit = time.time() - self.timeout
+            expired = [entry for entry in self._idle if entry[0] <= limit]
+            self._idle = [entry for entry in self._idle if entry[0] > limit]
+            self._schedule()
+        for entry in expired:
+            _release(entry[1])
+
+    def release_all(self):
+        """ Release all idle servers. """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            _release(entry[1])
+
+
 class CaseIterDriverBase(Driver):
     """
     A base class for Drivers that run sets of cases in a manner similar
     to the ROSE framework. Concurrent evaluation is supported, with the various
     evaluations executed across servers obtained from the
-    :class:`ResourceAllocationManager`.
+    :class:`ResourceAllocationManager`, or across worker processes on the
+    local host (see `concurrency`).
     """
 
     sequential = Bool(True, iotype='in',
@@ -48,6 +169,47 @@ class CaseIterDriverBase(Driver):
     max_retries = Int(1, low=0, iotype='in',
                       desc='Maximum number of times to retry a failed case.')
 
+    cases_in_flight = Int(1, low=1, iotype='in',
+                          desc='Number of cases sent to a server at a time'
+                               ' during concurrent evaluation. More than one'
+                               ' overlaps communication with computation.'
+                               ' Only one is used if reload_model is True.')
+
+    concurrency = Enum('servers', values=('servers', 'processes'),
+                       iotype='in',
+                       desc="How cases are evaluated concurrently. 'servers'"
+                            " uses servers from the ResourceAllocationManager."
+                            " 'processes' uses worker processes on this host,"
+                            " each holding a pickled copy of the model.")
+
+    n_processes = Int(0, low=0, iotype='in',
+                      desc='Number of worker processes if concurrency is'
+                           ' "processes". Zero means one per CPU.')
+
+    keep_servers = Bool(False, iotype='in',
+                        desc='If True, servers (or worker processes) and the'
+                             ' model loaded in them are kept after a'
+                             ' concurrent run and reused by the next run of'
+                             ' the same model. Only inputs changed since are'
+                             ' sent to them. Inputs which are Containers'
+                             ' aren\'t supported. See release_servers().')
+
+    idle_timeout = Float(300., low=0., iotype='in',
+                         desc='Seconds a server kept by keep_servers may be'
+                              ' idle before it is released.')
+
+    load_balancing = Bool(False, iotype='in',
+                          desc='If True, during concurrent evaluation a slow'
+                               ' server is sent only one case at a time, and'
+                               ' a straggler case is also started on a server'
+                               ' with nothing else to do, using whichever'
+                               ' result comes first.')
+
+    straggler_factor = Float(3., low=1., iotype='in',
+                             desc='With load_balancing, a case running this'
+                                  ' many times longer than the median case'
+                                  ' time is a straggler.')
+
     def __init__(self, *args, **kwargs):
         super(CaseIterDriverBase, self).__init__(*args, **kwargs)
         self.extra_reqs = {}  # Extra resource requirements (unusual)
@@ -59,6 +221,13 @@ class CaseIterDriverBase(Driver):
         self._egg_file = None
         self._egg_required_distributions = None
         self._egg_orphan_modules = None
+        self._model_data = None  # Pickled model for worker processes.
+
+        self._pool = None  # Servers kept between runs.
+        self._saved_inputs = None  # Input values of the kept model.
+        self._sent_inputs = set()  # Names of inputs ever sent to the pool.
+        self._changed_inputs = []  # Inputs changed since the model was kept.
+        self._warm = set()  # Servers from the pool for this run.
 
         self._reply_q = None  # Replies from server threads.
         self._server_lock = None  # Lock for server data.
@@ -73,6 +242,16 @@ class CaseIterDriverBase(Driver):
         self._server_cases = {}
         self._exceptions = {}
         self._load_failures = {}
+        self._in_flight = {}  # Number of cases sent to a server.
+        self._finished = {}   # (case, exception, time) finished by a server.
+        self._stats = {}      # Cases run, busy time, etc.
+
+        # Load balancing data.
+        self._case_times = _RunningMedian()  # Times of successful cases.
+        self._running = {}     # [case, start, servers, duplicate server].
+        self._resolved = set() # Cases recorded while a duplicate runs.
+        self._abandoned = set()  # Servers only running a duplicate.
+        self._server_stats = []  # Report from last concurrent run.
  
         self._todo = []   # Cases grabbed during server startup.
         self._rerun = []  # Cases that failed and should be retried.
@@ -114,7 +293,8 @@ class CaseIterDriverBase(Driver):
                 self._logger.info('Start concurrent evaluation.')
                 self._start()
         finally:
-            self._cleanup(remove_egg)
+            # Kept servers may need the egg to reload the model.
+            self._cleanup(remove_egg and self._pool is None)
 
         if self._stop:
             if self._abort_exc is None:
@@ -153,11 +333,36 @@ class CaseIterDriverBase(Driver):
 
         replicate: bool
              If True, then replicate the model and save to an egg file
-             first (for concurrent evaluation).
+             first (for concurrent evaluation).  If `keep_servers` is True
+             and the servers kept from the last run have the same model,
+             it isn't replicated; inputs changed since are sent with each
+             case instead.
         """
+        key = None
+        if self.keep_servers and not self.sequential:
+            key = self._model_key()
+            if self._pool is not None and self._pool.key == key:
+                self._cleanup(remove_egg=False)
+                self._pool.timeout = self.idle_timeout
+                self._changed_inputs = self._get_changed_inputs()
+                self._iter = self.get_case_iterator()
+                return
+            inputs = self._get_inputs(copy=True)  # May fail, so do it first.
+
+        self.release_servers()
         self._cleanup(remove_egg=replicate)
 
-        if not self.sequential:
+        if not self.sequential and self.concurrency == 'processes':
+            if replicate or self._model_data is None:
+                driver = self.parent.driver
+                self.parent.add('driver', Driver())
+                self.parent.driver.workflow = self.workflow
+                try:
+                    self._model_data = pickle_model(self.parent)
+                finally:
+                    self.parent.driver = driver
+
+        elif not self.sequential:
             if replicate or self._egg_file is None:
                 # Save model to egg.
                 # Must do this before creating any locks or queues.
@@ -188,7 +393,125 @@ class CaseIterDriverBase(Driver):
                 self._egg_required_distributions = egg_info[1]
                 self._egg_orphan_modules = [name for name, path in egg_info[2]]
 
+        if key is not None:
+            self._pool = _ServerPool(key, self.idle_timeout)
+            self._saved_inputs = inputs
+            self._sent_inputs = set()
+
         self._iter = self.get_case_iterator()
+
+    def release_servers(self):
+        """
+        Release any servers kept by `keep_servers` and remove the egg file
+        their model was loaded from.
+        """
+        if self._pool is not None:
+            self._pool.release_all()
+            self._pool = None
+            self._saved_inputs = None
+            self._sent_inputs = set()
+            self._model_data = None
+            if self._egg_file and os.path.exists(self._egg_file):
+                os.remove(self._egg_file)
+            self._egg_file = None
+
+    def pre_delete(self):
+        """ Release any kept servers. """
+        self.release_servers()
+        super(CaseIterDriverBase, self).pre_delete()
+
+    def __getstate__(self):
+        """ Return dict representing this driver's state. """
+        state = super(CaseIterDriverBase, self).__getstate__()
+        state['_pool'] = None  # Servers aren't saved.
+        state['_saved_inputs'] = None
+        # Otherwise each pickled model would contain the previous one.
+        state['_model_data'] = None
+        return state
+
+    def _model_key(self):
+        """
+        Return a hash of the structure of the model (the class of each
+        component, connections and workflows) and of how it's evaluated.
+        Kept servers are only reused for a model with the same key.  Input
+        values aren't part of the key, since they're sent with each case.
+        """
+        sig = [self.concurrency, sorted(self.extra_reqs.items()),
+               self.workflow.get_names()]
+
+        def walk(obj, prefix):
+            if hasattr(obj, 'list_connections'):
+                sig.append(sorted(obj.list_connections()))
+            for name in sorted(obj.list_containers()):
+                child = getattr(obj, name)
+                if child is self or (obj is self.parent and name == 'driver'):
+                    continue  # Not part of the replicated model.
+                cls = type(child)
+                sig.append((prefix+name, cls.__module__, cls.__name__))
+                if is_instance(child, Driver):
+                    sig.append(child.workflow.get_names())
+                walk(child, prefix+name+'.')
+
+        walk(self.parent, '')
+        return hashlib.sha1(repr(sig)).hexdigest()
+
+    def _get_inputs(self, copy=False):
+        """
+        Return dict of the values of the model's inputs that running our
+        workflow doesn't set: unconnected inputs, the inputs of our parent
+        (which may be connected outside of the model), and inputs connected
+        to sources outside of our workflow (which servers don't run).
+        Raises RuntimeError if one is a Container, since those can't be
+        compared or sent with a case.
+        """
+        inputs = {}
+
+        def add(name, value):
+            if is_instance(value, Container):
+                self.raise_exception("keep_servers can't be used with input"
+                                     " %r, which is a Container" % name,
+                                     RuntimeError)
+            if copy and isinstance(value, ndarray):
+                value = value.copy()
+            inputs[name] = value
+
+        def walk(comp, prefix):
+            for name in comp.list_inputs(connected=False):
+                add(prefix+name, getattr(comp, name))
+            for name in comp.list_containers():
+                child = getattr(comp, name)
+                if child is self or (comp is self.parent and name == 'driver'):
+                    continue  # Not part of the replicated model.
+                if is_instance(child, Component):
+                    walk(child, prefix+name+'.')
+
+        parent = self.parent
+        walk(parent, '')
+        for name in parent.list_inputs(connected=True):
+            add(name, getattr(parent, name))
+        members = set([comp.name for comp in self.iteration_set()])
+        for src, dst in parent.list_connections():
+            if '.' in src and '.' in dst and \
+               dst.split('.', 1)[0] in members and \
+               src.split('.', 1)[0] not in members:
+                add(dst, parent.get(dst))
+        return inputs
+
+    def _get_changed_inputs(self):
+        """
+        Return (name, value) of inputs changed since the model was kept.
+        Inputs sent in an earlier run are always included, since kept
+        servers still have the value sent then.
+        """
+        saved = self._saved_inputs
+        sent = self._sent_inputs
+        changed = []
+        for name, value in sorted(self._get_inputs().items()):
+            if name in sent or name not in saved or \
+               not _same(saved[name], value):
+                changed.append((name, value))
+        sent.update([name for name, value in changed])
+        return changed
         
     def get_case_iterator(self):
         """Returns a new iterator over the Case set."""
@@ -200,13 +523,17 @@ class CaseIterDriverBase(Driver):
         credentials = get_credentials()
 
         # Determine maximum number of servers available.
-        resources = {
-            'required_distributions':self._egg_required_distributions,
-            'orphan_modules':self._egg_orphan_modules,
-            'python_version':sys.version[:3]}
-        if self.extra_reqs:
-            resources.update(self.extra_reqs)
-        max_servers = RAM.max_servers(resources)
+        if self.concurrency == 'processes':
+            resources = None
+            max_servers = self.n_processes or multiprocessing.cpu_count()
+        else:
+            resources = {
+                'required_distributions':self._egg_required_distributions,
+                'orphan_modules':self._egg_orphan_modules,
+                'python_version':sys.version[:3]}
+            if self.extra_reqs:
+                resources.update(self.extra_reqs)
+            max_servers = RAM.max_servers(resources)
         self._logger.debug('max_servers %d', max_servers)
         if max_servers <= 0:
             msg = 'No servers supporting required resources %s' % resources
@@ -217,6 +544,7 @@ class CaseIterDriverBase(Driver):
         self._reply_q = Queue.Queue()
         self._generation += 1
         n_servers = 0
+        deferred = []  # Servers waiting for worker processes.
         while n_servers < max_servers:
             if not self._more_to_go():
                 break
@@ -238,33 +566,28 @@ class CaseIterDriverBase(Driver):
             self._server_cases[name] = None
             self._server_states[name] = _EMPTY
             self._load_failures[name] = 0
-            server_thread = threading.Thread(target=self._service_loop,
-                                             args=(name, resources,
-                                                   credentials, self._reply_q))
-            server_thread.daemon = True
-            try:
-                server_thread.start()
-            except thread.error:
-                self._logger.warning('worker thread startup failed for %r',
-                                     name)
-                self._in_use[name] = False
+            self._in_flight[name] = 0
+            self._finished[name] = []
+            self._stats[name] = dict(start=time.time(), cases=0, busy=0.,
+                                     duplicates=0, wins=0, last_end=0.)
+            if resources is None:
+                deferred.append(name)
+            elif not self._start_server(name, resources, credentials):
                 break
 
-            if sys.platform != 'win32':
-                # Process any pending events.
-                while self._busy():
-                    try:
-                        name, result, exc = self._reply_q.get(True, 0.01)
-                    except Queue.Empty:
-                        break  # Timeout.
-                    else:
-                        # Difficult to force startup failure.
-                        if self._servers[name] is None:  #pragma nocover
-                            self._logger.debug('server startup failed for %r',
-                                               name)
-                            self._in_use[name] = False
-                        else:
-                            self._in_use[name] = self._server_ready(name)
+        if deferred:
+            # Fork all worker processes before starting any server threads,
+            # so no thread of this run can hold a lock in a new worker.
+            allocated = [self._allocate_worker(name) for name in deferred]
+            for i, name in enumerate(deferred):
+                if not self._start_server(name, None, credentials,
+                                          allocated[i]):
+                    for name in deferred[i+1:]:
+                        self._in_use[name] = False
+                    for entry in allocated[i:]:
+                        if entry[0] is not None:
+                            _release(entry[0])
+                    break
 
         if sys.platform == 'win32':  #pragma no cover
             # Don't start server processing until all servers are started,
@@ -310,16 +633,21 @@ class CaseIterDriverBase(Driver):
             else:
                 self._in_use[name] = self._server_ready(name)
 
+        self._report_stats()
+
         # Shut-down (started) servers.
         self._logger.debug('Shut-down (started) servers')
         for queue in self._queues.values():
             queue.put(None)
-        for i in range(len(self._queues)):
+        for name in self._abandoned:
+            # Still running a duplicate case, don't wait for it.
+            self._queues.pop(name, None)
+        while self._queues:
             try:
                 name, status, exc = self._reply_q.get(True, 60)
             # Hard to force worker to hang, which is handled here.
             except Queue.Empty:  #pragma no cover
-                pass
+                break
             else:
                 if name in self._queues:  # 'Stale' worker can reply *late*.
                     del self._queues[name]
@@ -327,6 +655,84 @@ class CaseIterDriverBase(Driver):
         for name in self._queues.keys():  #pragma no cover
             self._logger.warning('Timeout waiting for %r to shut-down.', name)
 
+    def _start_server(self, name, resources, credentials, allocated=None):
+        """
+        Start the thread for server `name`, using `allocated` if it isn't
+        None (see :meth:`_service_loop`). Returns False if it failed.
+        """
+        server_thread = threading.Thread(target=self._service_loop,
+                                         args=(name, resources, credentials,
+                                               self._reply_q, allocated))
+        server_thread.daemon = True
+        try:
+            server_thread.start()
+        except thread.error:
+            self._logger.warning('worker thread startup failed for %r',
+                                 name)
+            self._in_use[name] = False
+            return False
+
+        if sys.platform != 'win32':
+            # Process any pending events.
+            while self._busy():
+                try:
+                    name, result, exc = self._reply_q.get(True, 0.01)
+                except Queue.Empty:
+                    break  # Timeout.
+                else:
+                    # Difficult to force startup failure.
+                    if self._servers[name] is None:  #pragma nocover
+                        self._logger.debug('server startup failed for %r',
+                                           name)
+                        self._in_use[name] = False
+                    else:
+                        self._in_use[name] = self._server_ready(name)
+        return True
+
+    def get_server_stats(self):
+        """
+        Return a list with a dict of statistics for each server used by the
+        last concurrent run:
+
+        name
+            Name of the server's worker.
+        host
+            Host the server ran on.
+        cases
+            Number of cases run, including duplicates.
+        busy_time
+            Total time the server spent running cases, in seconds.
+        mean_time
+            Mean time of a case, or None if no cases were run.
+        utilization
+            Busy time divided by the time since the server was requested.
+        duplicates
+            Number of straggler cases duplicated on the server.
+        wins
+            Number of duplicated cases where the server's result was used.
+        """
+        return self._server_stats
+
+    def _report_stats(self):
+        """ Save and log per-server statistics of a concurrent run. """
+        now = time.time()
+        self._server_stats = []
+        for name in sorted(self._stats.keys()):
+            stats = self._stats[name]
+            elapsed = now - stats['start']
+            cases = stats['cases']
+            report = dict(name=name,
+                          host=self._server_info.get(name, {}).get('host'),
+                          cases=cases, busy_time=stats['busy'],
+                          mean_time=stats['busy'] / cases if cases else None,
+                          utilization=stats['busy'] / elapsed if elapsed else 0.,
+                          duplicates=stats['duplicates'], wins=stats['wins'])
+            self._logger.info('%s on %s: %d cases, utilization %.2f, %d'
+                              ' duplicates, %d wins', name, report['host'],
+                              cases, report['utilization'],
+                              report['duplicates'], report['wins'])
+            self._server_stats.append(report)
+
     def _busy(self):
         """ Return True while at least one server is in use. """
         return any(self._in_use.values())
@@ -349,6 +755,15 @@ class CaseIterDriverBase(Driver):
         self._server_cases = {}
         self._exceptions = {}
         self._load_failures = {}
+        self._in_flight = {}
+        self._finished = {}
+        self._stats = {}
+        self._case_times = _RunningMedian()
+        self._running = {}
+        self._resolved = set()
+        self._abandoned = set()
+        self._changed_inputs = []
+        self._warm = set()
 
         self._todo = []
         self._rerun = []
@@ -402,6 +817,9 @@ class CaseIterDriverBase(Driver):
                         self._server_states[server] = _EMPTY
                         in_use = False
 
+        elif state == _EXECUTING and server is not None:
+            in_use = self._remote_case_done(server)
+
         elif state == _EXECUTING:
             case = self._server_cases[server]
             self._server_cases[server] = None
@@ -477,6 +895,35 @@ class CaseIterDriverBase(Driver):
         return in_use
 
     def _start_next_case(self, server, stepping=False):
+        """
+        Look for the next case and start it.  A remote server is sent
+        cases until it has :meth:`_pipeline_depth` in progress.
+        """
+        in_use = self._start_one_case(server, stepping)
+        if server is not None:
+            while in_use and self._more_to_go(stepping) and \
+                  self._in_flight[server] < self._pipeline_depth(server):
+                in_use = self._start_one_case(server, stepping)
+            in_use = in_use or self._in_flight[server] > 0
+        return in_use
+
+    def _pipeline_depth(self, server=None):
+        """
+        Return the number of cases to have in progress per server.
+        With load balancing, a server whose mean case time is more than
+        twice the median gets one, so it doesn't hold on to cases faster
+        servers could run.
+        """
+        if self.reload_model:
+            return 1
+        if self.load_balancing and server is not None and self._case_times:
+            stats = self._stats[server]
+            if stats['cases'] and \
+               stats['busy'] / stats['cases'] > 2 * self._case_times.median:
+                return 1
+        return self.cases_in_flight
+
+    def _start_one_case(self, server, stepping=False):
         """ Look for the next case and start it. """
         if self._todo:
             self._logger.debug('    run startup case')
@@ -510,6 +957,14 @@ class CaseIterDriverBase(Driver):
         case.msg = None
         case.parent_uuid = self._case_id
 
+        if server is not None:
+            # The whole case is run by the server in one request.
+            self._running[case.uuid] = [case, time.time(), [server], None]
+            self._in_flight[server] += 1
+            self._server_states[server] = _EXECUTING
+            self._queues[server].put((self._remote_run_case, (server, case)))
+            return True
+
         try:
             for event in self.get_events(): 
                 try: 
@@ -535,6 +990,146 @@ class CaseIterDriverBase(Driver):
         else:
             return True
 
+    def _remote_run_case(self, args):
+        """ Run a case in a remote server. """
+        server, case = args
+        # The run may be abandoned and finish after cleanup.
+        finished = self._finished[server]
+        stats = self._stats[server]
+        info = self._server_info[server]
+        exc = None
+        names = case.keys(iotype='out')
+        start = time.time()
+        try:
+            values = self._top_levels[server].run_case(case.items(iotype='in'),
+                                                       names,
+                                                       self.get_events(),
+                                                       case.uuid,
+                                                       self._changed_inputs)
+        except Exception as exc:
+            self._logger.error('Caught exception from server %r, PID %d on %s: %r',
+                               info['name'], info['pid'], info['host'], exc)
+        else:
+            for name, value in zip(names, values):
+                case[name] = value
+        # The server runs one case at a time, so with several in flight this
+        # case only started when the previous one finished.  Case times
+        # don't include waiting for that.
+        end = time.time()
+        elapsed = end - max(start, stats['last_end'])
+        stats['last_end'] = end
+        finished.append((case, exc, elapsed))
+
+    def _remote_case_done(self, server):
+        """
+        Record a case finished by :meth:`_remote_run_case` and start more.
+        Returns True if this server is still in use.
+        """
+        if not self._finished[server]:
+            return True  # Reply to reloading before a duplicate case.
+
+        case, exc, elapsed = self._finished[server].pop(0)
+        self._in_flight[server] -= 1
+        self._abandoned.discard(server)
+        stats = self._stats[server]
+        stats['cases'] += 1
+        stats['busy'] += elapsed
+        if exc is None:
+            self._case_times.add(elapsed)
+
+        if self._case_finished(server, case, exc):
+            if exc is not None:
+                self._logger.debug('    exception while executing: %r', exc)
+                case.msg = str(exc)
+                if self.error_policy == 'ABORT':
+                    if self._abort_exc is None:
+                        self._abort_exc = exc
+                    self._stop = True
+            self._record_case(case)
+
+        if self._in_flight[server]:
+            if self._more_to_go():
+                self._start_next_case(server)
+            return True
+        if not self._more_to_go() and self._duplicate_straggler(server):
+            return True
+        return self._start_processing(server, stepping=False, reload=True)
+
+    def _case_finished(self, server, case, exc):
+        """
+        Update running case data for `case` finished by `server`.
+        Returns False if the result should be ignored, because it's from
+        a duplicate of a case already recorded, or it's a failure while a
+        duplicate is still running.
+        """
+        uuid = case.uuid
+        entry = self._running.get(uuid)
+        if entry is None:  # Just being defensive, should never happen.
+            return True  #pragma no cover
+        servers = entry[2]
+        servers.remove(server)
+        if not servers:
+            del self._running[uuid]
+        if uuid in self._resolved:
+            if not servers:
+                self._resolved.discard(uuid)
+            return False
+        if servers and exc is not None:
+            return False
+        if entry[3] is not None and entry[3] == server:
+            self._stats[server]['wins'] += 1
+        if servers:
+            self._resolved.add(uuid)
+            if not self._more_to_go():
+                # Don't wait for servers only running the other copy.
+                for other in servers:
+                    if self._in_flight[other] == 1:
+                        self._logger.debug('    not waiting for %r', other)
+                        self._abandoned.add(other)
+                        self._in_use[other] = False
+        return True
+
+    def _duplicate_straggler(self, server):
+        """
+        If load balancing, start a copy of the longest running case on
+        `server` if that case is a straggler (see `straggler_factor`).
+        Returns True if a case was started.
+        """
+        if not self.load_balancing or self._stop or \
+           len(self._case_times) < 3:
+            return False
+        now = time.time()
+        limit = self.straggler_factor * self._case_times.median
+        stragglers = []
+        for uuid, entry in self._running.items():
+            if entry[3] is None and server not in entry[2]:
+                # Time since the case could have started running.
+                start = max(entry[1], self._stats[entry[2][0]]['last_end'])
+                if now - start > limit:
+                    # Cases queued behind it look as old, prefer the first.
+                    stragglers.append((now - start, -entry[1], uuid))
+        if not stragglers:
+            return False
+
+        uuid = max(stragglers)[2]
+        entry = self._running[uuid]
+        case = entry[0]
+        self._logger.debug('    duplicate straggler %s', uuid)
+        copy = Case(inputs=case.items(iotype='in'),
+                    outputs=case.keys(iotype='out'),
+                    max_retries=case.max_retries, retries=case.retries,
+                    label=case.label, case_uuid=uuid,
+                    parent_uuid=case.parent_uuid)
+        entry[2].append(server)
+        entry[3] = server
+        self._stats[server]['duplicates'] += 1
+        self._in_flight[server] += 1
+        self._server_states[server] = _EXECUTING
+        if self.reload_model:
+            self._load_model(server)
+        self._queues[server].put((self._remote_run_case, (server, copy)))
+        return True
+
     def _record_case(self, case):
         """ If successful, record the case. Otherwise possibly retry. """
         if case.msg and case.retries < case.max_retries:
@@ -545,20 +1140,39 @@ class CaseIterDriverBase(Driver):
             if self.recorder is not None:
                 self.recorder.record(case)
 
-    def _service_loop(self, name, resource_desc, credentials, reply_q):
-        """ Each server has an associated thread executing this. """
+    def _service_loop(self, name, resource_desc, credentials, reply_q,
+                      allocated=None):
+        """
+        Each server has an associated thread executing this.
+        If `allocated` isn't None, it's the (server, server_info, top_level)
+        to use, otherwise a kept server is used or one is allocated.
+        `top_level` is None unless the server already has the model loaded.
+        """
         set_credentials(credentials)
 
-        server, server_info = RAM.allocate(resource_desc)
-        # Just being defensive, this should never happen.
-        if server is None:  #pragma no cover
-            self._logger.error('Server allocation for %r failed :-(', name)
-            reply_q.put((name, False, None))
-            return
+        pool = self._pool
+        if allocated is None and pool is not None:
+            allocated = pool.get()
+        if allocated is not None and allocated[2] is not None:
+            # Already has the model loaded.
+            server, server_info, top_level = allocated
+            self._top_levels[name] = top_level
+            self._warm.add(name)
+            self._logger.debug('%r reusing %r', name, server_info['name'])
         else:
-            # Clear egg re-use indicator.
-            server_info['egg_file'] = None
-            self._logger.debug('%r using %r', name, server_info['name'])
+            if allocated is not None:
+                server, server_info = allocated[:2]
+            else:
+                server, server_info = RAM.allocate(resource_desc)
+            # Just being defensive, this should never happen.
+            if server is None:  #pragma no cover
+                self._logger.error('Server allocation for %r failed :-(', name)
+                reply_q.put((name, False, None))
+                return
+            else:
+                # Clear egg re-use indicator.
+                server_info['egg_file'] = None
+                self._logger.debug('%r using %r', name, server_info['name'])
 
         request_q = Queue.Queue()
 
@@ -570,29 +1184,75 @@ class CaseIterDriverBase(Driver):
 
             reply_q.put((name, True, None))  # ACK startup.
 
-            while True:
-                request = request_q.get()
-                if request is None:
-                    break
-                try:
-                    result = request[0](request[1])
-                except Exception as req_exc:
-                    self._logger.error('%r: %s caused %r', name,
-                                       request[0], req_exc)
-                    result = None
-                else:
-                    req_exc = None
-                reply_q.put((name, result, req_exc))
+            # Extra threads so several cases can be in progress.
+            helpers = []
+            for i in range(self._pipeline_depth() - 1):
+                helper = threading.Thread(target=self._request_loop,
+                                          args=(name, request_q, reply_q,
+                                                credentials))
+                helper.daemon = True
+                helper.start()
+                helpers.append(helper)
+
+            self._request_loop(name, request_q, reply_q)
+            for helper in helpers:
+                helper.join()
         except Exception as exc:  # pragma no cover
             # This can easily happen if we take a long time to allocate and
             # we get 'cleaned-up' before we get started.
             if self._server_lock is not None:
                 self._logger.error('%r: %r', name, exc)
         finally:
-            self._logger.debug('%r releasing server', name)
-            RAM.release(server)
+            top_level = self._top_levels.get(name)
+            if pool is not None and pool is self._pool and \
+               top_level is not None:
+                self._logger.debug('%r keeping server', name)
+                pool.put(server, server_info, top_level)
+            else:
+                self._logger.debug('%r releasing server', name)
+                _release(server)
             reply_q.put((name, True, None))  # ACK shutdown.
 
+    def _request_loop(self, name, request_q, reply_q, credentials=None):
+        """ Process requests for server `name` until a None request. """
+        if credentials is not None:
+            set_credentials(credentials)
+        while True:
+            request = request_q.get()
+            if request is None:
+                request_q.put(None)  # Stop any other threads too.
+                break
+            try:
+                result = request[0](request[1])
+            except Exception as req_exc:
+                self._logger.error('%r: %s caused %r', name,
+                                   request[0], req_exc)
+                result = None
+            else:
+                req_exc = None
+            reply_q.put((name, result, req_exc))
+
+    def _allocate_worker(self, name):
+        """
+        Return (server, server_info, top_level) for server `name`, either a
+        kept worker process or a new one (with `top_level` None).
+        """
+        if self._pool is not None:
+            kept = self._pool.get()
+            if kept is not None:
+                return kept
+        return self._start_worker(name) + (None,)
+
+    def _start_worker(self, name):
+        """ Start a local worker process, returning (worker, info). """
+        try:
+            worker = ProcessWorker(self._model_data, name)
+        except Exception as exc:
+            self._logger.error('worker process startup for %r failed: %r',
+                               name, exc)
+            return (None, None)
+        return (worker, dict(name=name, pid=worker.pid, host='localhost'))
+
     def _load_model(self, server):
         """ Load a model into a server. """
         self._exceptions[server] = None
@@ -601,15 +1261,36 @@ class CaseIterDriverBase(Driver):
 
     def _remote_load_model(self, server):
         """ Load model into remote server. """
+        if server in self._warm:
+            # Kept from a previous run, the model is already loaded.
+            self._warm.discard(server)
+            return
+
+        server_obj = self._servers[server]
+        if isinstance(server_obj, ProcessWorker):
+            # No transfer needed, the worker has the pickled model.
+            try:
+                server_obj.load()
+            except Exception as exc:
+                self._logger.error('%r reload failed: %r', server, exc)
+                self._top_levels[server] = None
+                self._exceptions[server] = exc
+            else:
+                self._top_levels[server] = server_obj
+            return
+
         egg_file = self._server_info[server].get('egg_file', None)
         if egg_file is None or egg_file is not self._egg_file:
-            # Only transfer if changed.
+            # Only transfer if changed, and then only the parts of the egg
+            # the server doesn't have (eggs are already compressed).
             try:
-                filexfer(None, self._egg_file,
-                         self._servers[server], self._egg_file, 'b')
+                nbytes, nsent = send_file(self._egg_file, self._servers[server],
+                                          self._egg_file)
+                self._logger.debug('server %r sent %d of %d bytes of %r',
+                                   server, nsent, nbytes, self._egg_file)
             # Difficult to force model file transfer error.
             except Exception as exc:  #pragma nocover
-                self._logger.error('server %r filexfer of %r failed: %r',
+                self._logger.error('server %r send_file of %r failed: %r',
                                    server, self._egg_file, exc)
                 self._top_levels[server] = None
                 self._exceptions[server] = exc
@@ -642,27 +1323,13 @@ class CaseIterDriverBase(Driver):
             return self._top_levels[server].get(name, index)
 
     def _model_execute(self, server):
-        """ Execute model in server. """
+        """ Execute model locally. """
         self._exceptions[server] = None
-        if server is None:
-            try:
-                self.workflow.run()
-            except Exception as exc:
-                self._exceptions[server] = exc
-                self._logger.critical('Caught exception: %r' % exc)
-        else:
-            self._queues[server].put((self._remote_model_execute, server))
-
-    def _remote_model_execute(self, server):
-        """ Execute model in remote server. """
         try:
-            self._top_levels[server].run()
+            self.workflow.run()
         except Exception as exc:
             self._exceptions[server] = exc
-            self._logger.error('Caught exception from server %r, PID %d on %s: %r',
-                               self._server_info[server]['name'],
-                               self._server_info[server]['pid'],
-                               self._server_info[server]['host'], exc)
+            self._logger.critical('Caught exception: %r' % exc)
 
     def _model_status(self, server):
         """ Return execute status from model. """
@@ -6,7 +6,7 @@
 # pylint: disable-msg=E0611,F0401
 from openmdao.lib.datatypes.api import ListStr, Slot
 
-from openmdao.main.case import Case
+from openmdao.main.case import CaseBlock
 from openmdao.main.interfaces import IDOEgenerator
 from openmdao.lib.drivers.caseiterdriver import CaseIterDriverBase
 from openmdao.util.decorators import add_delegate
@@ -32,12 +32,20 @@ class DOEdriver(CaseIterDriverBase):
         params = self.get_parameters().values()
         self.DOEgenerator.num_parameters = len(params)
         
+        # The names are the same for every case, so all cases come from one
+        # CaseBlock rather than being built up name by name.
+        inputs = []
+        counts = []
+        for param in params:
+            inputs.extend(param.targets)
+            counts.append(len(param.targets))
+        events = list(self.get_events())
+        inputs.extend(events)
+        block = CaseBlock(inputs, outputs=self.case_outputs)
+        
         for row in self.DOEgenerator:
-            vals = [p.low+(p.high-p.low)*val for p,val in zip(params,row)]
-            case = self.set_parameters(vals,Case())
-            # now add events
-            for varname in self.get_events(): 
-                case.add_input(varname,True)
-            case.add_outputs(self.case_outputs)    
-            
-            yield case
+            vals = []
+            for p,val,count in zip(params,row,counts):
+                vals.extend([p.low+(p.high-p.low)*val]*count)
+            vals.extend([True]*len(events))
+            yield block.make_case(vals)
@@ -67,6 +67,16 @@ class DrivenComponent(Component):
         if self.stop_exec:
             self.parent.driver.stop()  # Only valid if sequential!
 
+class Upstream(Component):
+    """ Run before the case driver, feeding its workflow. """
+
+    x = Float(0., iotype='in')
+    y = Float(0., iotype='out')
+
+    def execute(self):
+        self.y = self.x
+
+
 def _get_driver():
     return CaseIteratorDriver()
     #return SimpleCaseIterDriver()
@@ -183,6 +193,154 @@ class TestCase(unittest.TestCase):
         self.run_cases(sequential=False, forced_errors=True, retry=False)
         self.run_cases(sequential=False, forced_errors=True, retry=True)
 
+    def test_concurrent_pipelined(self):
+        logging.debug('')
+        logging.debug('test_concurrent_pipelined')
+        init_cluster(encrypted=True, allow_shell=True)
+        self.model.driver.reload_model = False
+        self.model.driver.cases_in_flight = 3
+        self.run_cases(sequential=False)
+        self.generate_cases(force_errors=True)
+        self.run_cases(sequential=False, forced_errors=True, retry=True)
+
+    def test_processes(self):
+        logging.debug('')
+        logging.debug('test_processes')
+        self.model.driver.concurrency = 'processes'
+        self.model.driver.n_processes = 2
+        self.run_cases(sequential=False)
+        # The pickled model doesn't include the previous one.
+        size = len(self.model.driver._model_data)
+        self.run_cases(sequential=False)
+        self.assertTrue(len(self.model.driver._model_data) < size * 1.5)
+        self.generate_cases(force_errors=True)
+        self.run_cases(sequential=False, forced_errors=True, retry=False)
+        self.model.driver.reload_model = False
+        self.run_cases(sequential=False, forced_errors=True, retry=True)
+
+    def test_keep_servers(self):
+        logging.debug('')
+        logging.debug('test_keep_servers')
+        driver = self.model.driver
+        driver.concurrency = 'processes'
+        driver.n_processes = 2
+        driver.keep_servers = True
+        for case in self.cases:
+            case.add_output('driven.sleep')
+        self.run_cases(sequential=False)
+        pool = driver._pool
+        pids = sorted([entry[1].pid for entry in pool._idle])
+        self.assertEqual(len(pids), 2)
+
+        # Same workers are used, and the changed input is sent to them.
+        self.model.driven.sleep = 0.1
+        driver.recorder = ListCaseRecorder()
+        self.model.run()
+        self.verify_results()
+        for case in driver.recorder.cases:
+            self.assertEqual(case['driven.sleep'], 0.1)
+        self.assertTrue(driver._pool is pool)
+        self.assertEqual(sorted([entry[1].pid for entry in pool._idle]), pids)
+
+        # Changing the model's structure replaces the workers.
+        self.model.add('extra', DrivenComponent())
+        self.model.run()
+        self.assertFalse(driver._pool is pool)
+        self.assertEqual(pool._idle, [])
+        pool = driver._pool
+        self.assertEqual(len(pool._idle), 2)
+
+        # Idle workers are released.
+        driver.idle_timeout = 0.5
+        self.model.run()
+        time.sleep(2)
+        self.assertEqual(pool._idle, [])
+
+        driver.release_servers()
+        self.assertEqual(driver._pool, None)
+
+    def test_keep_servers_upstream(self):
+        logging.debug('')
+        logging.debug('test_keep_servers_upstream')
+        # An outer driver runs 'pre', which feeds the case driver's workflow.
+        top = set_as_top(Assembly())
+        top.add('pre', Upstream())
+        top.add('cid', CaseIteratorDriver())
+        top.add('driven', DrivenComponent())
+        top.cid.workflow.add('driven')
+        top.driver.workflow.add(['pre', 'cid'])
+        top.connect('pre.y', 'driven.sleep')
+        driver = top.cid
+        driver.concurrency = 'processes'
+        driver.n_processes = 2
+        driver.keep_servers = True
+        driver.reload_model = False
+        for case in self.cases:
+            case.add_output('driven.sleep')
+        driver.iterator = ListCaseIterator(self.cases)
+        try:
+            # The last value is the one the model was kept with.
+            for sleep in (0.01, 0.02, 0.01):
+                top.pre.x = sleep
+                driver.recorder = ListCaseRecorder()
+                top.run()
+                self.assertEqual(len(driver.recorder.cases), len(self.cases))
+                for case in driver.recorder.cases:
+                    self.assertEqual(case['driven.sleep'], sleep)
+                self.assertEqual(len(driver._pool._idle), 2)
+        finally:
+            top.pre_delete()
+
+    def test_load_balancing(self):
+        logging.debug('')
+        logging.debug('test_load_balancing')
+        driver = self.model.driver
+        driver.sequential = False
+        driver.concurrency = 'processes'
+        driver.n_processes = 2
+        driver.reload_model = False
+        driver.load_balancing = True
+        driver.straggler_factor = 2.
+        for i, case in enumerate(self.cases):
+            case.add_input('driven.sleep', 1. if i == 0 else 0.05)
+        driver.iterator = ListCaseIterator(self.cases)
+        driver.recorder = ListCaseRecorder()
+        self.model.run()
+
+        # The slow case is duplicated, but only recorded once.
+        self.assertEqual(sorted([int(case.label)
+                                 for case in driver.recorder.cases]),
+                         range(len(self.cases)))
+        self.verify_results()
+        stats = driver.get_server_stats()
+        self.assertEqual(len(stats), 2)
+        self.assertEqual(sum([entry['duplicates'] for entry in stats]), 1)
+        for entry in stats:
+            self.assertEqual(entry['host'], 'localhost')
+            self.assertTrue(entry['utilization'] > 0.)
+
+    def test_case_times(self):
+        logging.debug('')
+        logging.debug('test_case_times')
+        driver = self.model.driver
+        driver.sequential = False
+        driver.concurrency = 'processes'
+        driver.n_processes = 1
+        driver.reload_model = False
+        driver.cases_in_flight = 3
+        for case in self.cases:
+            case.add_input('driven.sleep', 0.1)
+        driver.iterator = ListCaseIterator(self.cases)
+        driver.recorder = ListCaseRecorder()
+        self.model.run()
+        self.verify_results()
+
+        # Time waiting behind other cases in flight isn't counted.
+        stats = driver.get_server_stats()[0]
+        self.assertEqual(stats['cases'], len(self.cases))
+        self.assertTrue(stats['mean_time'] < 0.2)
+        self.assertTrue(stats['utilization'] <= 1.)
+
     def test_unencrypted(self):
         logging.debug('')
         logging.debug('test_unencrypted')
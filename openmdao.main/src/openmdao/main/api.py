@@ -18,6 +18,7 @@ from openmdao.main.assembly import Assembly, dump_iteration_tree
 from openmdao.main.driver import Driver
 from openmdao.main.workflow import Workflow
 from openmdao.main.dataflow import Dataflow
+from openmdao.main.paralleldataflow import ParallelDataflow
 from openmdao.main.seqentialflow import SequentialWorkflow
 from openmdao.main.variable import Variable
 from openmdao.main.slot import Slot
@@ -26,7 +27,7 @@ from openmdao.main.exceptions import ConstraintError
 
 from openmdao.main.filevar import FileMetadata, FileRef
 
-from openmdao.main.case import Case
+from openmdao.main.case import Case, CaseBlock
 
 from openmdao.main.arch import Architecture
 
@@ -5,9 +5,15 @@
 __all__ = ['Assembly']
 
 import cStringIO
+import threading
+import time
+import weakref
 
 # pylint: disable-msg=E0611,F0401
+from numpy import ndarray
+
 from enthought.traits.api import Missing
+from openmdao.units import get_conversion_tuple
 
 from openmdao.main.interfaces import implements, IDriver
 from openmdao.main.container import find_trait_and_value
@@ -18,9 +24,35 @@ from openmdao.main.driver import Driver
 from openmdao.main.attrwrapper import AttrWrapper
 from openmdao.main.rbac import rbac
 from openmdao.main.mp_support import is_instance
+from openmdao.main.case import Case
+from openmdao.main import profiler
 
 _iodict = { 'out': 'output', 'in': 'input' }
 
+# Locks serializing Assembly.run_case calls, keyed by Assembly. They aren't
+# kept in the Assembly because locks can't be pickled.
+_run_case_locks = weakref.WeakKeyDictionary()
+_run_case_locks_lock = threading.Lock()
+
+
+def _convert(srcval, conversion):
+    """Return a wrapper for the value of the AttrWrapper *srcval* converted
+    to the destination's units using a conversion tuple precomputed by
+    :meth:`Assembly.connect`.  Anything we can't convert with simple 
+    arithmetic is returned unchanged so that the destination trait's 
+    validation can deal with it.
+    """
+    if isinstance(srcval, AttrWrapper):
+        value = srcval.value
+        if isinstance(value, (float, int, long, ndarray)):
+            factor, offset, units = conversion
+            if offset:
+                value = (value + offset) * factor
+            else:
+                value = value * factor
+            return AttrWrapper(value, units=units)
+    return srcval
+
 
 class PassthroughTrait(Variable):
     """A trait that can use another trait for validation, but otherwise is
@@ -192,6 +224,21 @@ class Assembly (Component):
             if srccomp is not self and destcomp is not self:
                 self.config_changed(update_parent=False)
 
+            # source and destination units can't change, so figure out
+            # any conversion now rather than on every transfer
+            if isinstance(srcval, AttrWrapper):
+                srcunits = srcval.metadata.get('units')
+                destunits = desttrait.units
+                if srcunits and destunits and srcunits != destunits:
+                    try:
+                        factor, offset = get_conversion_tuple(srcunits, 
+                                                              destunits)
+                    except Exception:
+                        pass  # leave it to the destination's validation
+                    else:
+                        self._depgraph.set_conversion(srcpath, destpath,
+                                                 (factor, offset, destunits))
+
             outs = destcomp.invalidate_deps(varnames=set([destvarname]), force=True)
             if (outs is None) or outs:
                 bouts = self.child_invalidated(destcompname, outs, force=True)
@@ -231,11 +278,14 @@ class Assembly (Component):
         
         # now update boundary outputs
         valids = self._valid_dict
-        for srccompname,link in self._depgraph.in_links('@bout'):
+        for srccompname,srcs,dests,destset,scopesrcs,convs in self._depgraph.in_plan('@bout'):
             srccomp = getattr(self, srccompname)
-            for dest,src in link._dests.items():
+            for i,dest in enumerate(dests):
                 if valids[dest] is False:
-                    setattr(self, dest, srccomp.get_wrapped_attr(src))
+                    srcval = srccomp.get_wrapped_attr(srcs[i])
+                    if convs and convs[i]:
+                        srcval = _convert(srcval, convs[i])
+                    setattr(self, dest, srcval)
     
     def step(self):
         """Execute a single child component and return."""
@@ -245,25 +295,56 @@ class Assembly (Component):
         """Stop the calculation."""
         self.driver.stop()
     
+    @rbac(('owner', 'user'))
+    def run_case(self, inputs, outputs, events=(), case_id='', forced=()):
+        """Set `events` and `inputs`, run, and return a list of the values
+        of `outputs`.  This runs a whole Case in a remote Assembly with a
+        single round trip.  Calls are run one at a time, so a client may
+        send the next Case while the current one is running.
+        
+        inputs: list of (name, value)
+            Inputs of the Case.
+            
+        outputs: list of str
+            Names or expressions of the outputs of the Case.
+            
+        events: list of str (optional)
+            Names of events to set before the inputs.
+            
+        case_id: str (optional)
+            Identifier of the Case, passed to :meth:`run`.
+            
+        forced: list of (name, value) (optional)
+            Values set before `inputs`, even for inputs that are connected.
+            Connected inputs set this way are marked valid, so they aren't
+            replaced by the value of their source.  Used to send values set
+            by sources that aren't run here.
+        """
+        with _run_case_locks_lock:
+            lock = _run_case_locks.get(self)
+            if lock is None:
+                lock = _run_case_locks[self] = threading.Lock()
+        with lock:
+            for event in events:
+                self.set(event, True)
+            if forced:
+                self.multiset([name for name, value in forced],
+                              [value for name, value in forced], force=True)
+                for name, value in forced:
+                    compname, _, varname = name.rpartition('.')
+                    comp = self.get(compname) if compname else self
+                    comp.set_valid([varname], True)
+            case = Case(inputs=inputs, outputs=outputs)
+            case.apply_inputs(self)
+            self.run(case_id=case_id)
+            case.update_outputs(self)
+            return [case[name] for name in outputs]
+    
     def list_connections(self, show_passthrough=True):
         """Return a list of tuples of the form (outvarname, invarname).
         """
         return self._depgraph.list_connections(show_passthrough)
 
-    def _cvt_input_srcs(self, sources):
-        link = self._depgraph.get_link('@xin', '@bin')
-        if link is None:
-            return sources
-        else:
-            newsrcs = []
-            dests = link._dests
-            for s in sources:
-                if '.' in s:
-                    newsrcs.append(dests[s])
-                else:
-                    newsrcs.append(s)
-            return newsrcs
-        
     @rbac(('owner', 'user'))
     def update_inputs(self, compname, varnames):
         """Transfer input data to input variables on the specified component.
@@ -276,49 +357,72 @@ class Assembly (Component):
             destcomp = self
         else:
             destcomp = getattr(self, compname)
-        for srccompname,srcs,dests in self._depgraph.in_map(compname, vset):
+        valids = self._valid_dict
+        for srccompname,srcs,dests,scopesrcs,convs in self._depgraph.in_transfers(compname, vset):
             if srccompname == '@bin':   # boundary inputs
-                invalid_srcs = [s for s in srcs if not self._valid_dict[s]]
+                invalid_srcs = [s for s in srcs if not valids[s]]
                 if len(invalid_srcs) > 0:
                     if parent:
                         parent.update_inputs(self.name, invalid_srcs)
                     # invalid inputs have been updated, so mark them as valid
                     for name in invalid_srcs:
-                        self._valid_dict[name] = True
+                        valids[name] = True
                 srccompname = ''
                 srccomp = self
-                srcs = self._cvt_input_srcs(srcs)
+                srcs = scopesrcs
             else:
                 srccomp = getattr(self, srccompname)
                 if not srccomp.is_valid():
                     srccomp.update_outputs(srcs)
             
-            # TODO: add multiget/multiset stuff here...
-            for src,dest in zip(srcs, dests):
-                try:
-                    srcval = srccomp.get_wrapped_attr(src)
-                except Exception, err:
-                    self.raise_exception(
-                        "error retrieving value for %s from '%s'" %
-                        (src,srccompname), type(err))
-                try:
-                    if srccomp is self:
-                        srcname = src
-                    else:
-                        srcname = '.'.join([srccompname, src])
-                    if destcomp is self:
-                        setattr(destcomp, dest, srcval)
-                    else:
-                        #destcomp.set(dest, srcval, src='parent.'+srcname)
-                        # don't need to do source checking here unless we've messed up our bookkeeping
-                        destcomp.set(dest, srcval, force=True)
-                except Exception, exc:
-                    if compname[0] == '@':
-                        dname = dest
-                    else:
-                        dname = '.'.join([compname, dest])
-                    msg = "cannot set '%s' from '%s': %s" % (dname, srcname, exc)
-                    self.raise_exception(msg, type(exc))
+            # move all of the values on this link as a group (one round
+            # trip each way if either component is remote). If anything
+            # goes wrong, redo it one variable at a time to find the culprit.
+            try:
+                srcvals = srccomp.get_wrapped_attrs(srcs)
+                if convs is not None:
+                    srcvals = [_convert(srcval, conv) if conv else srcval
+                                   for srcval,conv in zip(srcvals, convs)]
+                prof = profiler.current
+                if prof is not None:
+                    prof.received(destcomp, srcvals)
+                if destcomp is self:
+                    for dest,srcval in zip(dests, srcvals):
+                        setattr(self, dest, srcval)
+                else:
+                    # don't need to do source checking here unless we've messed up our bookkeeping
+                    destcomp.multiset(dests, srcvals, force=True)
+            except Exception:
+                self._transfer(compname, destcomp, srccompname, srccomp,
+                               srcs, dests)
+                
+    def _transfer(self, compname, destcomp, srccompname, srccomp, srcs, dests):
+        """Transfer values from srccomp to destcomp one at a time."""
+        for src,dest in zip(srcs, dests):
+            try:
+                srcval = srccomp.get_wrapped_attr(src)
+            except Exception, err:
+                self.raise_exception(
+                    "error retrieving value for %s from '%s'" %
+                    (src,srccompname), type(err))
+            try:
+                if srccomp is self:
+                    srcname = src
+                else:
+                    srcname = '.'.join([srccompname, src])
+                if destcomp is self:
+                    setattr(destcomp, dest, srcval)
+                else:
+                    #destcomp.set(dest, srcval, src='parent.'+srcname)
+                    # don't need to do source checking here unless we've messed up our bookkeeping
+                    destcomp.set(dest, srcval, force=True)
+            except Exception, exc:
+                if compname[0] == '@':
+                    dname = dest
+                else:
+                    dname = '.'.join([compname, dest])
+                msg = "cannot set '%s' from '%s': %s" % (dname, srcname, exc)
+                self.raise_exception(msg, type(exc))
             
     def update_outputs(self, outnames):
         """Execute any necessary internal or predecessor components in order
@@ -356,17 +460,33 @@ class Assembly (Component):
 
     def _input_updated(self, name):
         if self._valid_dict[name]:  # if var is not already invalid
+            prof = profiler.current
+            if prof is not None:
+                start = time.time()
             outs = self.invalidate_deps(varnames=set([name]))
             if ((outs is None) or outs) and self.parent:
                 self.parent.child_invalidated(self.name, outs)
+            if prof is not None:
+                prof.invalidated(self, time.time()-start)
             
     def child_invalidated(self, childname, outs=None, force=False):
         """Invalidate all variables that depend on the outputs provided
         by the child that has been invalidated.
         """
         bouts = self._depgraph.invalidate_deps(self, [childname], [outs], force)
-        if bouts and self.parent:
-            self.parent.child_invalidated(self.name, bouts, force)
+        
+        # rather than recursing up through our parents, loop up through any
+        # that are Assemblies while boundary outputs keep changing
+        asm = self
+        outs = bouts
+        while outs and asm.parent:
+            parent = asm.parent
+            if not isinstance(parent, Assembly):
+                parent.child_invalidated(asm.name, outs, force)
+                break
+            outs = parent._depgraph.invalidate_deps(parent, [asm.name], 
+                                                    [outs], force)
+            asm = parent
         return bouts
                     
     def invalidate_deps(self, varnames=None, force=False):
@@ -381,7 +501,8 @@ class Assembly (Component):
             boundary even if all outputs were already invalid.
         """
         valids = self._valid_dict
-        conn_ins = set(self.list_inputs(connected=True))
+        self.list_inputs()  # make sure our connected input set is current
+        conn_ins = self._connected_input_set
         
         # If varnames is None, we're being called from a parent Assembly
         # as part of a higher level invalidation, so we only need to look
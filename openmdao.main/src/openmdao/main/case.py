@@ -1,9 +1,15 @@
 
 from uuid import uuid1
+import ast
 import re
+import weakref
+from multiprocessing.managers import BaseProxy
 from StringIO import StringIO
 
+import numpy
+
 from openmdao.main.expreval import ExprEvaluator
+from openmdao.main.interfaces import implements, ICaseIterator
 
 class _Missing(object):
     pass
@@ -25,6 +31,10 @@ class Case(object):
     identifier. 
 
     """
+    # Cases are often created by the thousands, so they don't get a __dict__.
+    __slots__ = ('_outputs', '_inputs', 'max_retries', 'retries',
+                 'msg', 'label', '_uuid', 'parent_uuid')
+
     def __init__(self, inputs=None, outputs=None, max_retries=None,
                  retries=None, label='', case_uuid=None, parent_uuid='', 
                  msg=None):
@@ -34,7 +44,6 @@ class Case(object):
         an interator that returns strings containing names or expressions.
         
         """
-        self._exprs = None
         self._outputs = None
         self._inputs = {}
 
@@ -44,9 +53,9 @@ class Case(object):
                                         # Implies outputs are invalid. 
         self.label = label   # optional label
         if case_uuid:
-            self.uuid = str(case_uuid)
+            self._uuid = str(case_uuid)
         else:
-            self.uuid = str(uuid1())  # unique identifier
+            self._uuid = None  # generated when first needed
         self.parent_uuid = str(parent_uuid)  # identifier of parent case, if any
 
         if inputs: 
@@ -54,6 +63,27 @@ class Case(object):
         if outputs:
             self.add_outputs(outputs)
 
+    @property
+    def uuid(self):
+        """Unique identifier of this Case."""
+        if self._uuid is None:
+            self._uuid = str(uuid1())
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, value):
+        self._uuid = value
+
+    def __getstate__(self):
+        """Return dict representing this Case's state."""
+        return dict([(name, getattr(self, name)) for name in self.__slots__])
+
+    def __setstate__(self, state):
+        """Restore this Case's state."""
+        state.pop('_exprs', None)  # saved by older versions
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self):
         if self._outputs:
             outs = self._outputs.items()
@@ -173,7 +203,7 @@ class Case(object):
         yet.
         """
         self.parent_uuid = ''
-        self.uuid = str(uuid1())
+        self._uuid = None
         self.retries = None
         for key in self._outputs.keys():
             self._outputs[key] = _Missing
@@ -182,32 +212,17 @@ class Case(object):
         """Take the values of all of the inputs in this case and apply them
         to the specified scope.
         """
-        if self._exprs:
-            for name,value in self._inputs.items():
-                expr = self._exprs.get(name)
-                if expr:
-                    expr.set(value, scope)
-                else:
-                    scope.set(name, value)
-        else:
-            for name,value in self._inputs.items():
-                scope.set(name, value)
+        names = tuple(self._inputs.keys())
+        _get_plan(scope, names).set(scope, self._inputs.values())
 
     def update_outputs(self, scope, msg=None):
         """Update the value of all outputs in this Case, using the given scope.
         """
         self.msg = msg
         if self._outputs is not None:
-            if self._exprs:
-                for name in self._outputs.keys():
-                    expr = self._exprs.get(name)
-                    if expr:
-                        self._outputs[name] = expr.evaluate(scope)
-                    else:
-                        self._outputs[name] = scope.get(name)
-            else:
-                for name in self._outputs.keys():
-                    self._outputs[name] = scope.get(name)
+            names = tuple(self._outputs.keys())
+            values = _get_plan(scope, names).get(scope)
+            self._outputs.update(zip(names, values))
 
     def add_input(self, name, value):
         """Adds an input and its value to this case.
@@ -219,7 +234,6 @@ class Case(object):
         value: 
             Value that the input will be assigned to.
         """
-        self._register_expr(name)
         self._inputs[name] = value
         
     def add_inputs(self, inp_iter):
@@ -237,7 +251,6 @@ class Case(object):
         name: str
             name of output to be added
         """
-        self._register_expr(name)
         if self._outputs is None:
             self._outputs = { name: value }
         else:
@@ -272,15 +285,254 @@ class Case(object):
         return Case(inputs=ins, outputs=outs, parent_uuid=self.parent_uuid,
                     max_retries=self.max_retries)
 
-        
-    def _register_expr(self, s):
-        """If the given string contains an expression, create an ExprEvaluator and
-        store it in self._exprs
+
+def _index_of(name):
+    """If `name` is a path followed only by constant indices, e.g.,
+    ``comp.x[2]['a']``, return the path and a list of the indices in the
+    form taken by :meth:`Container.set`, otherwise return None.
+    """
+    try:
+        node = ast.parse(name, mode='eval').body
+    except SyntaxError:
+        return None
+    index = []
+    while isinstance(node, ast.Subscript):
+        if not isinstance(node.slice, ast.Index):
+            return None
+        try:
+            idx = ast.literal_eval(node.slice.value)
+        except ValueError:
+            return None
+        if isinstance(idx, tuple):
+            idx = (0, idx)  # INDEX, so it isn't taken as an operation
+        index.append(idx)
+        node = node.value
+    if not index:
+        return None
+    path = name[:name.index('[')]
+    match = _namecheck_rgx.match(path)
+    if match is None or match.group() != path:
+        return None
+    index.reverse()
+    return path, index
+
+
+class _CasePlan(object):
+    """The steps for setting or getting the values of a given list of names
+    in a given scope, worked out once and reused for every Case having those
+    names.  Names of variables are grouped by the Container that owns them,
+    so each owner is found once per Case rather than once per name. Names
+    with constant indices have their index lists built here, and other
+    expressions are compiled here for the scope.  If the scope is remote,
+    the simple names are all set with one call.
+    """
+
+    def __init__(self, names, scope):
+        self.size = len(names)
+        remote = isinstance(scope, BaseProxy)
+        groups = {}
+        self._groups = []  # (owner path, [(position, name, index)])
+        self._exprs = []   # (position, ExprEvaluator)
+        for i, name in enumerate(names):
+            match = _namecheck_rgx.match(name)
+            if match is not None and match.group() == name:
+                path, index = name, None
+            else:
+                found = _index_of(name)
+                if found is None:
+                    self._exprs.append((i, ExprEvaluator(name, scope)))
+                    continue
+                path, index = found
+            if remote:
+                owner, leaf = '', path
+            else:
+                owner, _, leaf = path.rpartition('.')
+            try:
+                group = groups[owner]
+            except KeyError:
+                group = groups[owner] = []
+                self._groups.append((owner, group))
+            group.append((i, leaf, index))
+
+    def set(self, scope, values):
+        """Set the given values, in the order of our names."""
+        for owner, group in self._groups:
+            obj = scope.get(owner) if owner else scope
+            plain = [(i, leaf) for i, leaf, index in group if index is None]
+            if len(plain) > 1:
+                obj.multiset([leaf for i, leaf in plain],
+                             [values[i] for i, leaf in plain])
+            for i, leaf, index in group:
+                if index is not None or len(plain) == 1:
+                    obj.set(leaf, values[i], index)
+        for i, expr in self._exprs:
+            expr.set(values[i], scope)
+
+    def get(self, scope):
+        """Return the values, in the order of our names."""
+        values = [None] * self.size
+        for owner, group in self._groups:
+            obj = scope.get(owner) if owner else scope
+            for i, leaf, index in group:
+                values[i] = obj.get(leaf, index)
+        for i, expr in self._exprs:
+            values[i] = expr.evaluate(scope)
+        return values
+
+
+# Plans keyed by scope, then by tuple of names.
+_plans = weakref.WeakKeyDictionary()
+
+def _get_plan(scope, names):
+    """Return the _CasePlan for `names` in `scope`."""
+    try:
+        plans = _plans[scope]
+    except KeyError:
+        plans = {}
+        try:
+            _plans[scope] = plans
+        except TypeError:  # can't weakref scope, so don't keep the plan
+            pass
+    except TypeError:
+        plans = {}
+    try:
+        return plans[names]
+    except KeyError:
+        plan = plans[names] = _CasePlan(names, scope)
+        return plan
+
+
+def _block_array(values):
+    """Return `values` as an array for a :class:`CaseBlock`.  Values that
+    numpy would convert to strings are kept as objects instead.
+    """
+    if isinstance(values, numpy.ndarray):
+        return values
+    array = numpy.array(values)
+    if array.dtype.kind in 'SU':
+        array = numpy.array(values, dtype=object)
+    return array
+
+
+class CaseBlock(object):
+    """A block of Cases that all have the same inputs and outputs.  The
+    names are kept once for the whole block and the values are kept as
+    rows of a 2D numpy array, which is much smaller and faster to fill than
+    a Case per row.  A Case for a row is only created when it is needed,
+    e.g., when the block is iterated over by a driver or recorded by a
+    recorder.
+
+    Numeric values are promoted to a common type (e.g., ints to floats).
+    If any value isn't numeric, the array holds objects, so the values are
+    kept as given rather than all being converted to strings.
+    """
+
+    implements(ICaseIterator)
+
+    def __init__(self, inputs, values=None, outputs=(), parent_uuid='',
+                 max_retries=None):
+        """
+        inputs: iter of str
+            Names of the inputs in each Case.
+
+        values: 2D array or iter of sequences (optional)
+            Rows of values, one per Case.  A row contains the input values
+            in the order of `inputs`, optionally followed by the output
+            values in the order of `outputs`.
+
+        outputs: iter of str (optional)
+            Names or expressions of the outputs in each Case.
+
+        parent_uuid: str (optional)
+            Identifier of the parent of the Cases, if any.
+
+        max_retries: int (optional)
+            Maximum retries for each Case.
+        """
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.parent_uuid = parent_uuid
+        self.max_retries = max_retries
+        self._split_idx = len(self.inputs)
+        self._size = 0
+        if values is None:
+            self._values = None
+        else:
+            self._values = _block_array(values)
+            self._size = len(self._values)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return self._next_case()
+
+    def _next_case(self):
+        for i in range(self._size):
+            yield self.make_case(self._values[i].tolist())
+
+    def __getitem__(self, idx):
+        """Return the Case for row `idx`, or if `idx` is a string, the
+        column of values for that name.
         """
-        match = _namecheck_rgx.match(s)
-        if match is None or match.group() != s:
-            expr =  ExprEvaluator(s)
-            if self._exprs is None:
-                self._exprs = {}
-            self._exprs[s] = expr
+        if isinstance(idx, basestring):
+            try:
+                col = (self.inputs+self.outputs).index(idx)
+            except ValueError:
+                raise KeyError("'%s' not found" % idx)
+            return self.get_values()[:, col]
+        if idx < 0:
+            idx += self._size
+        if idx < 0 or idx >= self._size:
+            raise IndexError('CaseBlock index out of range')
+        return self.make_case(self._values[idx].tolist())
+
+    def get_values(self):
+        """Return the 2D array of values, one row per Case."""
+        if self._values is None:
+            return numpy.zeros((0, self._split_idx))
+        return self._values[:self._size]
+
+    def append(self, row):
+        """Add a row of values."""
+        row = _block_array(row)
+        if self._values is None:
+            self._values = numpy.empty((16, len(row)), row.dtype)
+        elif self._size == len(self._values) or \
+             numpy.result_type(self._values, row) != self._values.dtype:
+            values = numpy.empty((max(self._size*2, 16), len(row)),
+                                 numpy.result_type(self._values, row))
+            values[:self._size] = self._values[:self._size]
+            self._values = values
+        self._values[self._size] = row
+        self._size += 1
+
+    def extend(self, rows):
+        """Add rows of values."""
+        for row in rows:
+            self.append(row)
+
+    def make_case(self, values):
+        """Return a new Case having our inputs and outputs, with the given
+        values (inputs, optionally followed by outputs).  Outputs without
+        values are empty, waiting to be filled in when the Case is run.
+        """
+        case = Case.__new__(Case)
+        split = self._split_idx
+        case._inputs = dict(zip(self.inputs, values[:split]))
+        if self.outputs:
+            outvals = values[split:]
+            if len(outvals):
+                case._outputs = dict(zip(self.outputs, outvals))
+            else:
+                case._outputs = dict.fromkeys(self.outputs, _Missing)
+        else:
+            case._outputs = None
+        case.max_retries = self.max_retries
+        case.retries = None
+        case.msg = None
+        case.label = ''
+        case._uuid = None
+        case.parent_uuid = str(self.parent_uuid)
+        return case
 
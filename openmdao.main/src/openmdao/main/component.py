@@ -11,6 +11,7 @@ import os.path
 from os.path import isabs, isdir, dirname, exists, join, normpath, relpath
 import pkg_resources
 import sys
+import time
 import weakref
 
 # pylint: disable-msg=E0611,F0401
@@ -23,6 +24,7 @@ from openmdao.main.filevar import FileMetadata, FileRef
 from openmdao.util.eggsaver import SAVE_CPICKLE
 from openmdao.util.eggobserver import EggObserver
 from openmdao.main.depgraph import DependencyGraph
+from openmdao.main import profiler
 from openmdao.main.rbac import rbac
 from openmdao.main.mp_support import is_instance
 from openmdao.main.slot import Slot
@@ -85,6 +87,69 @@ class DirectoryContext(object):
         self.__dict__.update(state)
         self.component = weakref.ref(self.component)
 
+
+
+class _ValidFlags(object):
+    """Validity flags for the io variables of a Component.  This acts like
+    a dict mapping variable names to bools, but it also keeps the set of
+    names that are currently invalid, so finding out whether anything (or
+    what) is invalid doesn't require looking at every variable.
+    """
+    
+    __slots__ = ('_flags', 'invalid')
+    
+    def __init__(self, flags=None):
+        self._flags = {}
+        self.invalid = set()
+        if flags:
+            for name, valid in flags.items():
+                self[name] = valid
+            
+    def __getstate__(self):
+        return self._flags
+    
+    def __setstate__(self, state):
+        self._flags = state
+        self.invalid = set([name for name, valid in state.items() 
+                                 if not valid])
+        
+    def __repr__(self):
+        return repr(self._flags)
+        
+    def __getitem__(self, name):
+        return self._flags[name]
+    
+    def __setitem__(self, name, valid):
+        self._flags[name] = valid
+        if valid:
+            self.invalid.discard(name)
+        else:
+            self.invalid.add(name)
+            
+    def __delitem__(self, name):
+        del self._flags[name]
+        self.invalid.discard(name)
+        
+    def __contains__(self, name):
+        return name in self._flags
+    
+    def __iter__(self):
+        return iter(self._flags)
+    
+    def __len__(self):
+        return len(self._flags)
+    
+    def get(self, name, default=None):
+        return self._flags.get(name, default)
+    
+    def keys(self):
+        return self._flags.keys()
+    
+    def values(self):
+        return self._flags.values()
+    
+    def items(self):
+        return self._flags.items()
         
         
 _iodict = { 'out': 'output', 'in': 'input' }
@@ -118,7 +183,9 @@ class Component (Container):
         
         # contains validity flag for each io Trait (inputs are valid since they're not connected yet,
         # and outputs are invalid)
-        self._valid_dict = dict([(name,t.iotype=='in') for name,t in self.class_traits().items() if t.iotype])
+        self._valid_dict = _ValidFlags(dict([(name,t.iotype=='in') 
+                                              for name,t in self.class_traits().items() 
+                                                  if t.iotype]))
         
         # dependency graph between us and our boundaries (bookkeeps connections between our
         # variables and external ones).  This replaces self._depgraph from Container.
@@ -143,6 +210,9 @@ class Component (Container):
         self._expr_sources = None
         self._connected_inputs = None
         self._connected_outputs = None
+        self._input_set = None
+        self._output_set = None
+        self._connected_input_set = None
         
         self.exec_count = 0
         self.create_instance_dir = False
@@ -164,10 +234,15 @@ class Component (Container):
 
     def _input_updated(self, name):
         if self._valid_dict[name]:  # if var is not already invalid
+            prof = profiler.current
+            if prof is not None:
+                start = time.time()
             outs = self.invalidate_deps(varnames=[name])
             if (outs is None) or outs:
                 if self.parent:
                     self.parent.child_invalidated(self.name, outs)
+            if prof is not None:
+                prof.invalidated(self, time.time()-start)
 
     def __getstate__(self):
         """Return dict representing this container's state."""
@@ -178,9 +253,18 @@ class Component (Container):
         state['_expr_sources'] = None
         state['_connected_inputs'] = None
         state['_connected_outputs'] = None
+        state['_input_set'] = None
+        state['_output_set'] = None
+        state['_connected_input_set'] = None
         
         return state
 
+    def __setstate__(self, state):
+        """Restore this component's state."""
+        if isinstance(state.get('_valid_dict'), dict): # saved as a plain dict
+            state['_valid_dict'] = _ValidFlags(state['_valid_dict'])
+        super(Component, self).__setstate__(state)
+
     def check_config (self):
         """Verify that this component is fully configured to execute.
         This function is called once prior to the first execution of this
@@ -253,10 +337,15 @@ class Component (Container):
         if self._call_tree_rooted:
             self.tree_rooted()
             
+        prof = profiler.current
         if force:
+            if prof is not None:
+                start = time.time()
             outs = self.invalidate_deps()
             if (outs is None) or outs:
                 if self.parent: self.parent.child_invalidated(self.name, outs)
+            if prof is not None:
+                prof.invalidated(self, time.time()-start)
         else:
             if not self.is_valid():
                 self._call_execute = True
@@ -272,15 +361,18 @@ class Component (Container):
                                 # so Variable validity doesn't apply. Just execute.
             self._call_execute = True
             valids = self._valid_dict
-            for name in self.list_inputs():
+            for name in self.list_inputs(valid=False):
                 valids[name] = True
         else:
             valids = self._valid_dict
-            invalid_ins = [inp for inp in self.list_inputs(connected=True) 
-                                    if valids.get(inp) is False]
+            invalid_ins = self.list_inputs(valid=False, connected=True)
             if invalid_ins:
                 self._call_execute = True
+                if prof is not None:
+                    start = time.time()
                 self.parent.update_inputs(self.name, invalid_ins)
+                if prof is not None:
+                    prof.transferred(self, time.time()-start)
                 for name in invalid_ins:
                     valids[name] = True
             elif self._call_execute == False and len(self.list_outputs(valid=False)):
@@ -382,10 +474,17 @@ class Component (Container):
         self._stop = False
         self.ffd_order = ffd_order
         self._case_id = case_id
+        prof = profiler.current
+        if prof is not None:
+            prof.run_started(self)
+        skipped = True
         try:
             self._pre_execute(force)
             if self._call_execute or force:
                 #print 'execute: %s' % self.get_pathname()
+                skipped = False
+                if prof is not None:
+                    start = time.time()
                 
                 if ffd_order == 1 and \
                    hasattr(self, 'calculate_first_derivatives'):
@@ -403,10 +502,14 @@ class Component (Container):
                     # Component executes as normal
                     self.execute()
                     
+                if prof is not None:
+                    prof.executed(self, time.time()-start)
                 self._post_execute()
             #else:
                 #print 'skipping: %s' % self.get_pathname()
         finally:
+            if prof is not None:
+                prof.run_finished(self, skipped)
             if self.directory:
                 self.pop_dir()
  
@@ -467,8 +570,8 @@ class Component (Container):
         """Return False if any of our variables is invalid."""
         if self._call_execute:
             return False
-        if False in self._valid_dict.values():
-            self.call_execute = True
+        if self._valid_dict.invalid:
+            self._call_execute = True
             return False
         if self.parent is not None:
             srccomps = [n for n,v in self.get_expr_sources()]
@@ -515,6 +618,8 @@ class Component (Container):
             self._connected_inputs = self._depgraph.get_connected_inputs()
             nset.update(self._connected_inputs)
             self._input_names = list(nset)
+            self._input_set = nset
+            self._connected_input_set = set(self._connected_inputs)
     
         if valid is None:
             if connected is None:
@@ -522,16 +627,24 @@ class Component (Container):
             elif connected is True:
                 return self._connected_inputs
             else: # connected is False
-                return [n for n in self._input_names if n not in self._connected_inputs]
+                conn = self._connected_input_set
+                return [n for n in self._input_names if n not in conn]
         
-        valids = self._valid_dict
-        ret = self._input_names
-        ret = [n for n in ret if valids[n] == valid]
+        invalid = self._valid_dict.invalid
+        if valid:
+            ret = [n for n in self._input_names if n not in invalid]
+        elif invalid:
+            names = self._input_set
+            ret = [n for n in invalid if n in names]
+        else:
+            return []
             
         if connected is True:
-            return [n for n in ret if n in self._connected_inputs]
+            conn = self._connected_input_set
+            return [n for n in ret if n in conn]
         elif connected is False:
-            return [n for n in ret if n not in self._connected_inputs]
+            conn = self._connected_input_set
+            return [n for n in ret if n not in conn]
 
         return ret # connected is None, valid is not None
         
@@ -551,6 +664,7 @@ class Component (Container):
             self._connected_outputs = self._depgraph.get_connected_outputs()
             nset.update(self._connected_outputs)
             self._output_names = list(nset)
+            self._output_set = nset
             
         if valid is None:
             if connected is None:
@@ -560,9 +674,14 @@ class Component (Container):
             else: # connected is False
                 return [n for n in self._output_names if n not in self._connected_outputs]
         
-        valids = self._valid_dict
-        ret = self._output_names
-        ret = [n for n in ret if valids[n] == valid]
+        invalid = self._valid_dict.invalid
+        if valid:
+            ret = [n for n in self._output_names if n not in invalid]
+        elif invalid:
+            names = self._output_set
+            ret = [n for n in invalid if n in names]
+        else:
+            return []
             
         if connected is True:
             return [n for n in ret if n in self._connected_outputs]
@@ -1217,7 +1336,8 @@ class Component (Container):
             for var in self.list_inputs(connected=True):
                 valids[var] = False
         else:
-            conn = self.list_inputs(connected=True)
+            self.list_inputs()  # make sure our connected input set is current
+            conn = self._connected_input_set
             for var in varnames:
                 if var in conn:
                     valids[var] = False
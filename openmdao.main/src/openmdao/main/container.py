@@ -487,6 +487,15 @@ class Container(HasTraits):
         
         return val
         
+    @rbac(('owner', 'user'))
+    def get_wrapped_attrs(self, names):
+        """Return a list containing the result of :meth:`get_wrapped_attr`
+        for each of the given names.  Retrieving a group of values from a 
+        remote Container this way requires only one round trip.
+        """
+        get_wrapped_attr = self.get_wrapped_attr
+        return [get_wrapped_attr(name) for name in names]
+        
     def add(self, name, obj):
         """Add an object to this Container.
         Returns the added object.
@@ -878,6 +887,44 @@ class Container(HasTraits):
             else:
                 return self._set_failed(path, value, index, src, force)
 
+    @rbac(('owner', 'user'))
+    def multiset(self, paths, values, force=False):
+        """Set the values of a group of Variables, equivalent to calling
+        :meth:`set` for each path and value.  Setting a group of values
+        in a remote Container this way requires only one round trip.
+        When *force* is True, source checking of the inputs is bypassed 
+        once for the whole group.
+        
+        paths: list of str
+            Pathnames of the Variables to set.
+            
+        values: list
+            The corresponding values.
+            
+        force: bool (optional)
+            If True, don't check whether the inputs are connected to a
+            different source.
+        """
+        if not force:
+            for path, value in zip(paths, values):
+                self.set(path, value)
+            return
+        
+        chk = self._input_check
+        self._input_check = self._input_nocheck
+        try:
+            for path, value in zip(paths, values):
+                trait = None if '.' in path else self.get_trait(path)
+                if trait is not None and trait.iotype == 'in':
+                    setattr(self, path, value)
+                    # see set() for why we check _call_execute here
+                    if getattr(self, '_call_execute', False):
+                        self._input_updated(path)
+                else:
+                    self.set(path, value, force=True)
+        finally:
+            self._input_check = chk
+
     def _process_index_entry(self, obj, idx):
         """Return a new object based on a starting object and some operation
         indicated by idx that can be either an index into a container, an 
@@ -15,9 +15,19 @@ class Dataflow(SequentialWorkflow):
     """
     def __init__(self, parent=None, scope=None, members=None):
         """ Create an empty flow. """
+        self._collapsed_graph = None
+        self._topsort = None
+        self._graph_key = None
         super(Dataflow, self).__init__(parent, scope, members)
         self.config_changed()
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._collapsed_graph = None
+        self._topsort = None
+        self._graph_key = None
+        self.config_changed()
+
     def __iter__(self):
         """Iterate through the nodes in dataflow order."""
         # resolve all of the components up front so if there's a problem it'll fail early
@@ -37,14 +47,14 @@ class Dataflow(SequentialWorkflow):
 
     def config_changed(self):
         """Notifies the Workflow that its configuration (dependencies, etc.)
-        has changed.
+        has changed.  The collapsed graph and the execution order are only
+        rebuilt later if the change actually affects them.
         """
-        self._collapsed_graph = None
-        self._topsort = None
+        self._config_dirty = True
 
     def _get_topsort(self):
+        graph = self._get_collapsed_graph()
         if self._topsort is None:
-            graph = self._get_collapsed_graph()
             try:
                 self._topsort = nx.topological_sort(graph)
             except nx.NetworkXUnfeasible:
@@ -59,19 +69,37 @@ class Dataflow(SequentialWorkflow):
         in it, with additional edges added to it from sub-workflows
         of any Driver components in our workflow, and from any ExprEvaluators
         in any components in our workflow.
+        
+        The graph is only rebuilt if the component level structure of the
+        scope's dependency graph, our membership, or the dependencies and
+        iteration sets of our members have changed since it was last built.
         """
-        if self._collapsed_graph:
+        if self._collapsed_graph is not None and not self._config_dirty:
             return self._collapsed_graph
         
-        to_add = []
         scope = self.scope
-        graph = scope._depgraph.copy_graph()
-        
+        depgraph = scope._depgraph
         contents = self.get_components()
         
-        # add any dependencies due to ExprEvaluators
+        expr_depends = []
+        itersets = {}
         for comp in contents:
-            graph.add_edges_from([tup for tup in comp.get_expr_depends()])
+            expr_depends.extend(comp.get_expr_depends())
+            if has_interface(comp, IDriver):
+                itersets[comp.name] = sorted([c.name for c in comp.iteration_set()])
+                
+        key = (depgraph, depgraph.version, tuple(self._names), 
+               expr_depends, itersets)
+        self._config_dirty = False
+        if self._collapsed_graph is not None and key == self._graph_key:
+            return self._collapsed_graph
+        
+        self._graph_key = key
+        self._topsort = None
+        graph = depgraph.copy_graph()
+        
+        # add any dependencies due to ExprEvaluators
+        graph.add_edges_from(expr_depends)
             
         collapsed_graph = graph.copy()
 
@@ -80,19 +108,14 @@ class Dataflow(SequentialWorkflow):
         # in our collapsed graph
         cnames = set(self._names)
         removes = set()
-        itersets = {}
-        for comp in contents:
-            cname = comp.name
-            if has_interface(comp, IDriver):
-                iterset = [c.name for c in comp.iteration_set()]
-                itersets[cname] = iterset
-                removes.update(iterset)
-                for u,v in graph.edges_iter(nbunch=iterset): # outgoing edges
-                    if v != cname and v not in iterset:
-                        collapsed_graph.add_edge(cname, v)
-                for u,v in graph.in_edges_iter(nbunch=iterset): # incoming edges
-                    if u != cname and u not in iterset:
-                        collapsed_graph.add_edge(u, cname)
+        for cname, iterset in itersets.items():
+            removes.update(iterset)
+            for u,v in graph.edges_iter(nbunch=iterset): # outgoing edges
+                if v != cname and v not in iterset:
+                    collapsed_graph.add_edge(cname, v)
+            for u,v in graph.in_edges_iter(nbunch=iterset): # incoming edges
+                if u != cname and u not in iterset:
+                    collapsed_graph.add_edge(u, cname)
         # connect all of the edges from each driver's iterset members to itself
         to_add = []
         for drv,iterset in itersets.items():
@@ -105,10 +128,17 @@ class Dataflow(SequentialWorkflow):
                         to_add.append((u, drv))
         collapsed_graph.add_edges_from(to_add)
         
-        # now add some fake dependencies for degree 0 nodes in an attempt to
-        # mimic a SequentialWorkflow in cases where nodes aren't connected.
-        # Edges are added from each degree 0 node to all nodes after it in
-        # sequence order.
+        self._add_isolated_edges(collapsed_graph)
+        
+        self._collapsed_graph = collapsed_graph.subgraph(cnames-removes)
+        return self._collapsed_graph
+
+    def _add_isolated_edges(self, collapsed_graph):
+        """Add some fake dependencies for degree 0 nodes in an attempt to
+        mimic a SequentialWorkflow in cases where nodes aren't connected.
+        Edges are added from each degree 0 node to all nodes after it in
+        sequence order.
+        """
         last = len(self._names)-1
         if last > 0:
             to_add = []
@@ -121,6 +151,3 @@ class Dataflow(SequentialWorkflow):
                         for n in self._names[0:i]:
                             to_add.append((n, cname))
             collapsed_graph.add_edges_from(to_add)
-        
-        self._collapsed_graph = collapsed_graph.subgraph(cnames-removes)
-        return self._collapsed_graph
@@ -4,7 +4,6 @@ import sys
 import StringIO
 
 import networkx as nx
-from networkx.algorithms.dag import topological_sort_recursive,is_directed_acyclic_graph
 from networkx.algorithms.components import strongly_connected_components
 
 
@@ -39,9 +38,24 @@ def _cvt_names_to_graph(srcpath, destpath):
         
     return (srccompname, srcvarname, destcompname, destvarname)
 
+def _merge_vars(vars1, vars2):
+    """Combine two collections of variable names, where None means all
+    variables.
+    """
+    if vars1 is None or vars2 is None:
+        return None
+    merged = set(vars1)
+    merged.update(vars2)
+    return merged
+
 #fake nodes for boundary  and passthrough connections
 _fakes = ['@xin', '@xout', '@bin', '@bout']
 
+# fixed positions of the fake nodes in our topological order. Inputs come
+# before, and outputs after, any possible component.
+_fake_order = { '@xin': -sys.maxint-1, '@bin': -sys.maxint, 
+                '@bout': sys.maxint-1, '@xout': sys.maxint }
+
 class DependencyGraph(object):
     """
     A dependency graph for Components.  Each edge contains a _Link object, which 
@@ -56,16 +70,56 @@ class DependencyGraph(object):
     @bout is our output boundary
 
     @xout is external to our output boundary
+    
+    A topological order of the nodes is maintained incrementally as edges
+    are added, so checking a new connection for cycles only has to look at
+    the part of the graph between the two nodes being connected rather than
+    the whole graph.
     """
 
     def __init__(self):
         self._graph = nx.DiGraph()
         self._graph.add_nodes_from(_fakes) 
+        self._order = _fake_order.copy()  # maps node to its position
+        self._next_order = 0
+        self._version = 0
+        self._in_plans = {}  # compiled transfer plans, keyed by dest node
+        self._reach = {}     # downstream nodes in order, keyed by node
+        self._reach_version = 0
+        
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._in_plans = {}
+        self._reach = {}
+        self._reach_version = -1
+        if '_order' not in state:  # saved before order was kept
+            self._version = 0
+            self._order = _fake_order.copy()
+            self._next_order = 0
+            for node in nx.topological_sort(self._graph):
+                self._add_order(node)
         
     def __contains__(self, compname):
         """Return True if this graph contains the given component."""
         return compname in self._graph
     
+    @property
+    def version(self):
+        """A number that changes whenever a node or an edge is added to or
+        removed from the graph. Adding connections between two nodes that
+        are already connected doesn't change it.
+        """
+        return self._version
+    
+    def topological_sort(self, nbunch=None):
+        """Return a list of nodes (all of them, or those in nbunch) in
+        topological order.  This uses the order we've already got, so it
+        doesn't require a graph traversal.
+        """
+        if nbunch is None:
+            nbunch = self._graph.nodes()
+        return sorted(nbunch, key=self._order.__getitem__)
+    
     def copy_graph(self):
         graph = self._graph.copy()
         graph.remove_nodes_from(_fakes)
@@ -98,12 +152,95 @@ class DependencyGraph(object):
     def add(self, name):
         """Add the name of a Component to the graph."""
         self._graph.add_node(name)
+        self._add_order(name)
+        self._version += 1
+        self._in_plans = {}
 
     def remove(self, name):
         """Remove the name of a Component from the graph. It is not
         an error if the component is not found in the graph.
         """
         self._graph.remove_node(name)
+        if name not in _fake_order:
+            self._order.pop(name, None)
+        self._version += 1
+        self._in_plans = {}
+        
+    def _add_order(self, name):
+        """Put a new node at the end of our topological order."""
+        if name not in self._order:
+            self._order[name] = self._next_order
+            self._next_order += 1
+            
+    def _add_edge(self, u, v, link):
+        """Add an edge from u to v, updating our topological order. If the
+        edge would create a cycle, it isn't added and False is returned.
+        """
+        self._add_order(u)
+        self._add_order(v)
+        if not self._reorder(u, v):
+            return False
+        self._graph.add_edge(u, v, link=link)
+        self._version += 1
+        return True
+    
+    def _remove_edge(self, u, v):
+        """Remove the edge from u to v. Our topological order is still
+        valid afterward.
+        """
+        self._graph.remove_edge(u, v)
+        self._version += 1
+        
+    def _reorder(self, u, v):
+        """Update the topological order to allow for a new edge from u to v,
+        using the algorithm of Pearce and Kelly.  Only nodes positioned
+        between v and u are visited. Returns False, leaving the order
+        unchanged, if v already leads to u.
+        """
+        order = self._order
+        lower = order[v]
+        upper = order[u]
+        if lower > upper:
+            return True  # order is already consistent with the new edge
+        if u == v:
+            return False
+        
+        # find everything reachable from v that is currently before u
+        graph = self._graph
+        forward = []
+        visited = set([v])
+        stack = [v]
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for succ in graph.successors_iter(node):
+                if succ == u:
+                    return False  # cycle
+                if succ not in visited and order[succ] < upper:
+                    visited.add(succ)
+                    stack.append(succ)
+        
+        # find everything leading to u that is currently after v
+        backward = []
+        visited = set([u])
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for pred in graph.predecessors_iter(node):
+                if pred not in visited and order[pred] > lower:
+                    visited.add(pred)
+                    stack.append(pred)
+                    
+        # reuse the positions of the affected nodes, putting the backward
+        # set before the forward set
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        nodes = backward + forward
+        positions = sorted([order[n] for n in nodes])
+        for node, pos in zip(nodes, positions):
+            order[node] = pos
+        return True
                                     
     def invalidate_deps(self, scope, cnames, varsets, force=False):
         """Walk through all dependent nodes in the graph, invalidating all
@@ -122,27 +259,69 @@ class DependencyGraph(object):
             If True, force invalidation to continue even if a component in
             the dependency chain was already invalid.
         """
-        graph = self._graph
-        stack = zip(cnames, varsets)
         outset = set()  # set of changed boundary outputs
-        while(stack):
-            src, varset = stack.pop()
-            for dest,link in self.out_links(src):
-                if varset is None:
-                    srcvars = set(link._srcs.keys())
-                else:
-                    srcvars = varset
+        outvars = {}    # starting nodes and their invalidated outputs
+        for cname, varset in zip(cnames, varsets):
+            outvars[cname] = _merge_vars(outvars.get(cname, []), varset)
+        if len(cnames) == 1:
+            nodes = self.downstream(cnames[0])
+        else:
+            nodes = set()
+            for cname in cnames:
+                nodes.update(self.downstream(cname))
+            order = self._order
+            nodes = sorted(nodes, key=order.get)
+            
+        # visit each affected node once, in dataflow order, after all of
+        # the inputs it'll lose have been collected
+        ins = {}  # newly invalidated inputs for each node
+        for node in nodes:
+            if node in ins:
+                comp = getattr(scope, node)
+                outs = comp.invalidate_deps(varnames=ins.pop(node), force=force)
+                if node in outvars:
+                    outs = _merge_vars(outs, outvars[node])
+                elif not ((outs is None) or outs):
+                    continue
+            elif node in outvars:
+                outs = outvars[node]
+            else:
+                continue
+            for dest,link in self.out_links(node):
+                dests = link.get_dests(outs)
                 if dest == '@bout':
-                    outset.update(link.get_dests(varset))
-                else:
-                    dests = link.get_dests(varset)
-                    if dests:
-                        comp = getattr(scope, dest)
-                        outs = comp.invalidate_deps(varnames=dests, force=force)
-                        if (outs is None) or outs:
-                            stack.append((dest, outs))
+                    outset.update(dests)
+                elif dests:
+                    if dest in ins:
+                        ins[dest].extend(dests)
+                    else:
+                        ins[dest] = dests
         return outset
 
+    def downstream(self, cname):
+        """Return a list containing the given node and all nodes reachable
+        from it, in topological order. Results are cached until the 
+        structure of the graph changes.
+        """
+        if self._reach_version != self._version:
+            self._reach = {}
+            self._reach_version = self._version
+        try:
+            return self._reach[cname]
+        except KeyError:
+            pass
+        graph = self._graph
+        visited = set([cname])
+        stack = [cname]
+        while stack:
+            for succ in graph.successors_iter(stack.pop()):
+                if succ not in visited:
+                    visited.add(succ)
+                    stack.append(succ)
+        nodes = sorted(visited, key=self._order.get)
+        self._reach[cname] = nodes
+        return nodes
+
     def list_connections(self, show_passthrough=True):
         """Return a list of tuples of the form (outvarname, invarname).
         """
@@ -168,18 +347,65 @@ class DependencyGraph(object):
         where all dests in destlist are found in varset.  If no dests are found in varset,
         a tuple will not be returned at all for that link.
         """
-        for u,v,data in self._graph.in_edges(cname, data=True):
-            srcs = []
-            dests = []
-            link = data['link']
-            matchset = varset.intersection(link._dests.keys())
-            for dest in matchset:
-                dests.append(dest)
-                srcs.append(link._dests[dest])
-            if not dests or not srcs:
-                continue
+        for u, srcs, dests, scopesrcs, convs in self.in_transfers(cname, varset):
             yield (u, srcs, dests)
             
+    def in_transfers(self, cname, varset):
+        """Yield a tuple of the form (srccompname, srclist, destlist,
+        scopesrclist, convlist) for each incoming link to the given node,
+        where all dests in destlist are found in varset. For links from our
+        input boundary, scopesrclist contains the names of the sources as 
+        they should be retrieved from the scoping Assembly; otherwise it's 
+        the same as srclist. convlist is None if no connection on the link
+        needs a unit conversion, otherwise it holds the conversion for each
+        dest (see :meth:`set_conversion`) or None.  If no dests are found in
+        varset, a tuple will not be returned at all for that link.  
+        
+        The lists come from a precompiled transfer plan and should not be 
+        modified.
+        """
+        for u, srcs, dests, destset, scopesrcs, convs in self.in_plan(cname):
+            if destset.issubset(varset):
+                yield (u, srcs, dests, scopesrcs, convs)
+            else:
+                idxs = [i for i,dest in enumerate(dests) if dest in varset]
+                if idxs:
+                    if convs is not None:
+                        convs = [convs[i] for i in idxs]
+                    yield (u, [srcs[i] for i in idxs], [dests[i] for i in idxs],
+                           [scopesrcs[i] for i in idxs], convs)
+            
+    def in_plan(self, cname):
+        """Return the transfer plan for all of the incoming links to the
+        given node.  This is a list of tuples of the form (srccompname,
+        srclist, destlist, destset, scopesrclist, convlist), with entries
+        in the lists matching up one to one. The plan is compiled the first
+        time it's requested and kept until connections change.
+        """
+        try:
+            return self._in_plans[cname]
+        except KeyError:
+            pass
+        plan = []
+        for u, link in self.in_links(cname):
+            dests = link._dests.keys()
+            srcs = [link._dests[dest] for dest in dests]
+            scopesrcs = srcs
+            if u == '@bin':
+                xlink = self.get_link('@xin', '@bin')
+                if xlink is not None:
+                    # auto-passthrough inputs are retrieved from outside
+                    scopesrcs = [xlink._dests[src] if '.' in src else src
+                                     for src in srcs]
+            convs = link._convs
+            if convs:
+                convs = [convs.get(dest) for dest in dests]
+            else:
+                convs = None
+            plan.append((u, srcs, dests, frozenset(dests), scopesrcs, convs))
+        self._in_plans[cname] = plan
+        return plan
+            
     def get_link(self, srcname, destname):
         """Return the link between the two specified nodes.  If there is no 
         connection then None is returned.
@@ -229,6 +455,22 @@ class DependencyGraph(object):
                                      for dest,src in data['link']._dests.items()])
         return edges
     
+    def set_conversion(self, srcpath, destpath, conversion):
+        """Store the unit conversion to be applied to values transferred
+        across the given existing connection. conversion is a tuple of the
+        form (factor, offset, units), where (value+offset)*factor is the 
+        value in the destination's units, or None if no conversion is 
+        needed.
+        """
+        srccompname, srcvarname, destcompname, destvarname = \
+                           _cvt_names_to_graph(srcpath, destpath)
+        link = self._graph[srccompname][destcompname]['link']
+        if conversion is None:
+            link._convs.pop(destvarname, None)
+        else:
+            link._convs[destvarname] = conversion
+        self._in_plans = {}
+    
     def get_connected_inputs(self):
         try:
             return self._graph['@xin']['@bin']['link']._dests.keys()
@@ -248,6 +490,7 @@ class DependencyGraph(object):
         graph = self._graph
         srccompname, srcvarname, destcompname, destvarname = \
                            _cvt_names_to_graph(srcpath, destpath)
+        self._in_plans = {}
         
         oldsrc = self.get_source('.'.join([destcompname,destvarname]))
         if oldsrc:
@@ -258,13 +501,13 @@ class DependencyGraph(object):
             # this is an auto-passthrough input so we need 2 links
             if '@bin' not in graph['@xin']:
                 link = _Link('@xin', '@bin')
-                graph.add_edge('@xin', '@bin', link=link)
+                self._add_edge('@xin', '@bin', link)
             else:
                 link = graph['@xin']['@bin']['link']
             link.connect(srcvarname, '.'.join([destcompname,destvarname]))
             if destcompname not in graph['@bin']:
                 link = _Link('@bin', destcompname)
-                graph.add_edge('@bin', destcompname, link=link)
+                self._add_edge('@bin', destcompname, link)
             else:
                 link = graph['@bin'][destcompname]['link']
             link.connect('.'.join([destcompname,destvarname]), destvarname)
@@ -272,13 +515,13 @@ class DependencyGraph(object):
             # this is an auto-passthrough output so we need 2 links
             if '@xout' not in graph['@bout']:
                 link = _Link('@bout', '@xout')
-                graph.add_edge('@bout', '@xout', link=link)
+                self._add_edge('@bout', '@xout', link)
             else:
                 link = graph['@bout']['@xout']['link']
             link.connect('.'.join([srccompname,srcvarname]), destvarname)
             if srccompname not in graph or '@bout' not in graph[srccompname]:
                 link = _Link(srccompname, '@bout')
-                graph.add_edge(srccompname, '@bout', link=link)
+                self._add_edge(srccompname, '@bout', link)
             else:
                 link = graph[srccompname]['@bout']['link']
             link.connect(srcvarname,'.'.join([srccompname,srcvarname]))
@@ -287,22 +530,20 @@ class DependencyGraph(object):
                 link = graph[srccompname][destcompname]['link']
             except KeyError:
                 link=_Link(srccompname, destcompname)
-                graph.add_edge(srccompname, destcompname, link=link)
-            
-            if is_directed_acyclic_graph(graph):
-                link.connect(srcvarname, destvarname)
-            else:   # cycle found
-                # do a little extra work here to give more info to the user in the error message
-                strongly_connected = strongly_connected_components(graph)
-                if len(link) == 0:
+                if not self._add_edge(srccompname, destcompname, link):
+                    # cycle found. Do a little extra work here to give
+                    # more info to the user in the error message
+                    graph.add_edge(srccompname, destcompname, link=link)
+                    strongly_connected = strongly_connected_components(graph)
                     graph.remove_edge(srccompname, destcompname)
-                for strcon in strongly_connected:
-                    if len(strcon) > 1:
-                        raise RuntimeError(
-                            'circular dependency (%s) would be created by connecting %s to %s' %
-                                     (str(strcon), 
-                                      '.'.join([srccompname,srcvarname]), 
-                                      '.'.join([destcompname,destvarname])))
+                    for strcon in strongly_connected:
+                        if len(strcon) > 1:
+                            raise RuntimeError(
+                                'circular dependency (%s) would be created by connecting %s to %s' %
+                                         (str(strcon), 
+                                          '.'.join([srccompname,srcvarname]), 
+                                          '.'.join([destcompname,destvarname])))
+            link.connect(srcvarname, destvarname)
 
     def _comp_connections(self, cname):
         """Returns a list of tuples of the form (srcpath, destpath) for all
@@ -355,6 +596,7 @@ class DependencyGraph(object):
         graph = self._graph
         srccompname, srcvarname, destcompname, destvarname = \
                            _cvt_names_to_graph(srcpath, destpath)
+        self._in_plans = {}
         
         if srccompname == '@xin' and destcompname != '@bin':
             # this is an auto-passthrough input, so there are two connections
@@ -362,28 +604,28 @@ class DependencyGraph(object):
             link = graph['@xin']['@bin']['link']
             link.disconnect(srcvarname, '.'.join([destcompname,destvarname]))
             if len(link) == 0:
-                self._graph.remove_edge('@xin', '@bin')
+                self._remove_edge('@xin', '@bin')
             link = graph['@bin'][destcompname]['link']
             link.disconnect('.'.join([destcompname,destvarname]), destvarname)
             if len(link) == 0:
-                self._graph.remove_edge('@bin', destcompname)
+                self._remove_edge('@bin', destcompname)
         elif destcompname == '@xout' and srccompname != '@bout':
             # this is an auto-passthrough output, so there are two connections
             # that must be removed (@bout to @xout and some internal component to @bout)
             link = graph['@bout']['@xout']['link']
             link.disconnect('.'.join([srccompname,srcvarname]), destvarname)
             if len(link) == 0:
-                self._graph.remove_edge('@bout', '@xout')
+                self._remove_edge('@bout', '@xout')
             link = graph[srccompname]['@bout']['link']
             link.disconnect(srcvarname,'.'.join([srccompname,srcvarname]))
             if len(link) == 0:
-                self._graph.remove_edge(srccompname, '@bout')
+                self._remove_edge(srccompname, '@bout')
         else:
             link = self.get_link(srccompname, destcompname)
             if link:
                 link.disconnect(srcvarname, destvarname)
                 if len(link) == 0:
-                    self._graph.remove_edge(srccompname, destcompname)
+                    self._remove_edge(srccompname, destcompname)
 
     def dump(self, stream=sys.stdout):
         """Prints out a simple text representation of the graph."""
@@ -425,9 +667,15 @@ class _Link(object):
     def __init__(self, srccomp, destcomp):
         self._srcs = {}
         self._dests = {}
+        self._convs = {}  # unit conversions, keyed by dest
         self._srccomp = srccomp
         self._destcomp = destcomp
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if '_convs' not in state:  # saved before conversions were kept
+            self._convs = {}
+
     def __len__(self):
         return len(self._srcs)
 
@@ -440,6 +688,7 @@ class _Link(object):
     def disconnect(self, src, dest):
         if dest in self._dests:
             del self._dests[dest]
+            self._convs.pop(dest, None)
             dests = self._srcs[src]
             dests.remove(dest)
             if len(dests) == 0:
@@ -4,6 +4,7 @@ which support various operations such as creating objects, loading models via
 egg files, remote execution, and remote file access.
 """
 
+import hashlib
 import logging
 import optparse
 import os.path
@@ -28,6 +29,7 @@ from openmdao.main.mp_util import keytype, read_allowed_hosts, \
 from openmdao.main.rbac import get_credentials, set_credentials, \
                                rbac, rbac_decorate, RoleError
 
+from openmdao.util.blobstore import BlobStore
 from openmdao.util.filexfer import pack_zipfile, unpack_zipfile
 from openmdao.util.publickey import make_private, read_authorized_keys, \
                                     write_authorized_keys, HAVE_PYWIN32
@@ -58,6 +60,10 @@ class ObjServerFactory(Factory):
         a pipe (default).  Created :class:`ObjServer` servers will use the
         same form of address.
 
+    Servers created for the same user share a :class:`BlobStore` of file
+    chunks, so files sent to one server needn't be sent again in full to
+    the next.
+
     The environment variable ``OPENMDAO_KEEPDIRS`` can be used to avoid
     having server directory trees removed when servers are shut-down.
     """
@@ -76,6 +82,7 @@ class ObjServerFactory(Factory):
         self._allow_shell = allow_shell or ObjServerFactory._allow_shell
         self._allowed_types = allowed_types or ObjServerFactory._allowed_types
         self._managers = {}
+        self._blob_root = os.path.abspath('blobs_%d' % os.getpid())
         self._logger = logging.getLogger(name)
         self._logger.info('PID: %d, %r, allow_shell %s', os.getpid(),
                           keytype(self._authkey), allow_shell)
@@ -151,6 +158,9 @@ class ObjServerFactory(Factory):
             finally:
                 set_credentials(cleanup_creds)
         self._managers = {}
+        keep_dirs = int(os.environ.get('OPENMDAO_KEEPDIRS', '0'))
+        if not keep_dirs and os.path.exists(self._blob_root):
+            shutil.rmtree(self._blob_root)
 
     @rbac('*')
     def get_available_types(self, groups=None):
@@ -249,9 +259,13 @@ class ObjServerFactory(Factory):
             self._logger.info('new server %r for %s', name, owner)
             self._logger.info('    in dir %s', root_dir)
             self._logger.info('    listening on %s', manager.address)
+            # Chunks are only shared between servers of the same user.
+            blob_dir = os.path.join(self._blob_root,
+                                    hashlib.sha1(owner.user).hexdigest())
             server = manager.openmdao_main_objserverfactory_ObjServer(name=name,
                                                   allow_shell=self._allow_shell,
-                                              allowed_types=self._allowed_types)
+                                              allowed_types=self._allowed_types,
+                                                  blob_dir=blob_dir)
             self._managers[server] = (manager, root_dir, owner)
 
         if typname:
@@ -347,9 +361,15 @@ class ObjServer(object):
         Names of types which may be created. If None, then allow types listed
         by :meth:`factorymanager.get_available_types`. If empty, no types are
         allowed.
+
+    blob_dir: string
+        Directory of the :class:`BlobStore` used by :meth:`missing_chunks`,
+        :meth:`put_chunks` and :meth:`assemble_file`.  If None, then
+        ``.blobs`` in the current directory is used.
     """
 
-    def __init__(self, name='', allow_shell=False, allowed_types=None):
+    def __init__(self, name='', allow_shell=False, allowed_types=None,
+                 blob_dir=None):
         self._allow_shell = allow_shell
         if allowed_types is None:
             allowed_types = [typname for typname, version
@@ -370,6 +390,8 @@ class ObjServer(object):
 
         SimulationRoot.chroot(self._root_dir)
         self.tlo = None
+        self._blobs = BlobStore(blob_dir or
+                                os.path.join(self._root_dir, '.blobs'))
 
     # We only reset logging on the remote side.
     def _reset_logging(self, filename='server.out'):  #pragma no cover
@@ -574,6 +596,52 @@ class ObjServer(object):
                                path, os.getcwd(), exc)
             raise
 
+    @rbac('owner')
+    def missing_chunks(self, keys):
+        """
+        Returns the keys of file chunks which aren't in our
+        :class:`BlobStore`.
+
+        keys: list(string)
+            Keys (SHA-1 digests) of chunks.
+        """
+        return self._blobs.missing_chunks(keys)
+
+    @rbac('owner')
+    def put_chunks(self, chunks):
+        """
+        Add file chunks to our :class:`BlobStore`.
+
+        chunks: list
+            List of ``(key, data, compressed)``.
+        """
+        self._logger.debug('put_chunks %d', len(chunks))
+        return self._blobs.put_chunks(chunks)
+
+    @rbac('owner')
+    def assemble_file(self, path, keys, mode=None):
+        """
+        Write `path`, if legal, from the chunks for `keys`.
+        Returns the size of the file.
+
+        path: string
+            Path to file to write.
+
+        keys: list(string)
+            Keys of the file's chunks.
+
+        mode: int
+            Mode bits (permissions) for the file.
+        """
+        self._logger.debug('assemble_file %r', path)
+        self._check_path(path, 'assemble_file')
+        try:
+            return self._blobs.assemble_file(path, keys, mode)
+        except Exception as exc:
+            self._logger.error('assemble_file %r in %s failed %s',
+                               path, os.getcwd(), exc)
+            raise
+
     def _check_path(self, path, operation):
         """ Check if path is allowed to be used. """
         abspath = os.path.abspath(path)
@@ -0,0 +1,178 @@
+""" A Dataflow that runs independent branches concurrently. """
+
+import multiprocessing
+import Queue
+import sys
+import traceback
+
+from openmdao.main.dataflow import Dataflow
+from openmdao.main.component import Component
+from openmdao.main.exceptions import RunStopped
+from openmdao.main.interfaces import IDriver
+from openmdao.main.mp_support import is_instance, has_interface
+from openmdao.util.wrkpool import WorkerPool
+
+__all__ = ['ParallelDataflow']
+
+
+class ParallelDataflow(Dataflow):
+    """
+    A Dataflow that starts each Component as soon as all of the Components it
+    depends on have finished, running them on a pool of worker threads.
+    Branches of the workflow having no data dependency between them are
+    executed concurrently.  This is most useful for Components that spend
+    their time outside of the Python interpreter, for example an
+    :class:`ExternalCode` waiting on its command.
+
+    Unlike a Dataflow, Components that aren't connected to anything are
+    not forced into sequence order.
+
+    Transfers of input data into a Component (and any invalidation they
+    cause) are done on the thread that called :meth:`run`, before the
+    Component is handed to a worker.  Some Components must be run on that
+    thread, after all other running Components have finished, and nothing
+    else is started until they're done:
+
+    - Drivers, and Components with `force_execute` set or with input
+      CaseIterators, since running them invalidates other Components and
+      transfers data in the parent Assembly.
+    - Components having a `directory`, or containing or driving one that
+      does, since the current directory is shared by all threads.
+    """
+
+    def __init__(self, parent=None, scope=None, members=None, max_workers=None):
+        """ Create an empty flow.
+
+        max_workers: int (optional)
+            Maximum number of Components to run at once. The default is
+            the number of CPUs on this host.
+        """
+        self.max_workers = max_workers
+        super(ParallelDataflow, self).__init__(parent, scope, members)
+
+    def _add_isolated_edges(self, collapsed_graph):
+        """Unconnected Components may run at any time, so don't add any
+        fake dependencies for them.
+        """
+        pass
+
+    def run(self, ffd_order=0, case_id=''):
+        """ Run the Components in this Workflow, starting each one as soon
+        as its predecessors have finished.
+        """
+        max_workers = self.max_workers or multiprocessing.cpu_count()
+        order = self._get_topsort()
+        if max_workers < 2 or len(order) < 2:
+            return super(ParallelDataflow, self).run(ffd_order, case_id)
+
+        self._stop = False
+        scope = self.scope
+        graph = self._get_collapsed_graph()
+        position = dict([(name, i) for i, name in enumerate(order)])
+        waiting = dict([(name, graph.in_degree(name)) for name in order])
+        ready = [name for name in order if waiting[name] == 0]
+        exclusive = {}
+        running = {}  # Maps worker queue to component name.
+        reply_q = Queue.Queue()
+        exc_info = None
+        kwargs = { 'ffd_order': ffd_order, 'case_id': case_id }
+
+        while ready or running:
+            if ready and len(running) < max_workers and \
+               not (self._stop or exc_info):
+                comp = getattr(scope, ready[0])
+                name = comp.name
+                if name not in exclusive:
+                    exclusive[name] = _is_exclusive(comp)
+                if not (running and exclusive[name]):
+                    ready.pop(0)
+                    try:
+                        self._update_inputs(comp)
+                        if exclusive[name]:
+                            comp.run(**kwargs)
+                            self._release_successors(name, graph, waiting,
+                                                     ready, position)
+                        else:
+                            worker = WorkerPool.get()
+                            running[worker] = name
+                            worker.put((_run, (comp, kwargs), {}, reply_q))
+                    except Exception:
+                        exc_info = sys.exc_info()
+                    continue
+            elif not running:
+                break  # Stopped or failed, and all workers are done.
+
+            worker, retval, exc, trace = reply_q.get()
+            name = running.pop(worker)
+            WorkerPool.release(worker)
+            if exc is None and retval is None:
+                self._release_successors(name, graph, waiting, ready, position)
+            elif exc_info is None:
+                if exc is None:
+                    trace = ''.join(traceback.format_exception(*retval))
+                    exc_info = retval
+                else:
+                    exc_info = (type(exc), exc, None)
+                scope._logger.debug('%s failed:\n%s', name, trace)
+
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        if self._stop:
+            raise RunStopped('Stop requested')
+
+    def _update_inputs(self, comp):
+        """Transfer data to any invalid connected inputs of `comp`, so that
+        it's done here rather than on a worker thread.
+        """
+        invalid_ins = comp.list_inputs(valid=False, connected=True)
+        if invalid_ins:
+            self.scope.update_inputs(comp.name, invalid_ins)
+            comp.set_valid(invalid_ins, True)
+            comp._call_execute = True
+
+    @staticmethod
+    def _release_successors(name, graph, waiting, ready, position):
+        """Move any successors of `name` that aren't waiting on anything
+        else into `ready`, keeping it in dataflow order.
+        """
+        for succ in graph.successors(name):
+            waiting[succ] -= 1
+            if waiting[succ] == 0:
+                ready.append(succ)
+        ready.sort(key=position.get)
+
+
+def _run(comp, kwargs):
+    """Run `comp` on a worker thread.  Returns None, or the exc_info of any
+    exception, so it can be re-raised on the calling thread with the
+    worker's traceback.
+    """
+    try:
+        comp.run(**kwargs)
+    except Exception:
+        return sys.exc_info()
+    return None
+
+
+def _is_exclusive(comp):
+    """Return True if `comp` must run on the calling thread while nothing
+    else is running.
+    """
+    if comp.force_execute or comp._num_input_caseiters > 0 or \
+       has_interface(comp, IDriver):
+        return True
+    return _changes_dir(comp)
+
+
+def _changes_dir(comp):
+    """Return True if running `comp` may change the current directory."""
+    comps = [comp]
+    if has_interface(comp, IDriver):
+        comps.extend(comp.iteration_set())
+    for obj in comps:
+        if obj.directory:
+            return True
+        for name, child in obj.items(recurse=True):
+            if is_instance(child, Component) and child.directory:
+                return True
+    return False
@@ -0,0 +1,142 @@
+"""
+A worker process on the local host holding its own copy of a model, for
+running Cases without the overhead of an :class:`ObjServer`.
+"""
+
+import cStringIO
+import logging
+import threading
+
+from multiprocessing import Pipe, Process
+
+from openmdao.main.container import Container, set_as_top
+
+__all__ = ['ProcessWorker', 'pickle_model']
+
+
+def pickle_model(top):
+    """Return the pickled state of `top` for a :class:`ProcessWorker`."""
+    out = cStringIO.StringIO()
+    top.save(out)
+    return out.getvalue()
+
+
+def _load(model):
+    """Return the top-level object of the pickled `model`."""
+    return set_as_top(Container.load(cStringIO.StringIO(model)))
+
+
+def _serve(conn, model, parent_conn):
+    """Runs in the worker process, handling requests from `conn` until it
+    gets None or the connection is closed.  `parent_conn` is the other end
+    of the pipe, which is closed so we see EOF if the parent dies.
+    """
+    parent_conn.close()
+    top = None
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, IOError):
+            break
+        if request is None:
+            break
+        command, args = request
+        try:
+            if command == 'load' or top is None:
+                top = None
+                top = _load(model)
+            if command == 'load':
+                result = None
+            else:
+                result = top.run_case(*args)
+        except Exception as exc:
+            try:
+                conn.send((None, exc))
+            except Exception:  # Exception can't be pickled.
+                conn.send((None, RuntimeError(str(exc))))
+        else:
+            conn.send((result, None))
+    conn.close()
+
+
+class ProcessWorker(object):
+    """A process on this host holding a copy of the model pickled in
+    `model` (see :func:`pickle_model`).  Cases are sent to the process
+    over a pipe, so no egg, socket or encryption is involved.  The process
+    is started by the constructor and runs until :meth:`close`.
+
+    Requests are handled one at a time, in the order they're received.
+
+    On POSIX hosts the process is forked, so only the thread creating the
+    worker exists in it.  A lock held by another thread at that moment
+    (e.g., by a logging handler) stays locked in the worker, which could
+    hang when it tries to acquire it.  So workers should be created before
+    starting other threads, as :class:`CaseIterDriverBase` does.
+    """
+
+    def __init__(self, model, name='worker'):
+        self.name = name
+        self._logger = logging.getLogger(name)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn, child_conn = Pipe()
+        self._process = Process(target=_serve,
+                                args=(child_conn, model, self._conn),
+                                name=name)
+        self._process.daemon = True
+        self._process.start()
+        child_conn.close()
+        self._logger.debug('started PID %d', self._process.pid)
+
+    @property
+    def pid(self):
+        """Process ID of the worker."""
+        return self._process.pid
+
+    def is_alive(self):
+        """Return True if the worker process is running."""
+        return self._process.is_alive()
+
+    def _request(self, command, args=None):
+        """Send a request and return its result, raising any exception."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('%s has been closed' % self.name)
+            try:
+                self._conn.send((command, args))
+                result, exc = self._conn.recv()
+            except (EOFError, IOError) as err:
+                raise RuntimeError('%s (PID %d) has died: %s'
+                                   % (self.name, self.pid, err))
+        if exc is not None:
+            raise exc
+        return result
+
+    def load(self):
+        """Replace the worker's model with a fresh copy of the original."""
+        self._request('load')
+
+    def run_case(self, inputs, outputs, events=(), case_id='', forced=()):
+        """Run a Case in the worker's model.  Arguments and result are as
+        for :meth:`Assembly.run_case`.
+        """
+        return self._request('run', (inputs, outputs, events, case_id, forced))
+
+    def close(self, timeout=10):
+        """Stop the worker process, terminating it if it doesn't stop
+        within `timeout` seconds.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                self._conn.send(None)
+            except (EOFError, IOError):
+                pass
+            self._conn.close()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._logger.warning('terminating PID %d', self.pid)
+            self._process.terminate()
+            self._process.join()
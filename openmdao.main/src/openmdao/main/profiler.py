@@ -0,0 +1,226 @@
+"""
+Collects timing and data transfer statistics for Component runs.
+
+When a :class:`Profiler` is started, every :meth:`Component.run` in the
+process reports to it.  For each Component (Drivers and Assemblies
+included) it keeps the number of runs, the number of runs that were skipped
+because the Component was already valid, wall time spent in *execute*, time
+spent in *_pre_execute* pulling input data from the parent Assembly, the
+number of bytes moved by those transfers, and time spent propagating
+invalidation when its inputs change.  When no Profiler is running, the cost
+to a Component run is a check of :data:`current`.
+
+::
+
+    from openmdao.main.profiler import Profiler
+
+    prof = Profiler()
+    with prof:
+        top.run()
+    prof.report()
+    prof.write_trace(open('top.folded', 'w'))
+"""
+
+import sys
+import threading
+import time
+
+from numpy import ndarray
+
+from openmdao.main.attrwrapper import AttrWrapper
+
+__all__ = ['Profiler']
+
+# The Profiler that's currently collecting data, or None.
+current = None
+
+
+class _Stats(object):
+    """Statistics for one Component."""
+
+    __slots__ = ('classname', 'runs', 'skipped', 'total', 'execute',
+                 'transfer', 'invalidate', 'nbytes')
+
+    def __init__(self, classname):
+        self.classname = classname
+        self.runs = 0
+        self.skipped = 0
+        self.total = 0.       # time spent in run(), including children
+        self.execute = 0.     # time spent in execute()
+        self.transfer = 0.    # time spent getting input data
+        self.invalidate = 0.  # time spent invalidating dependents
+        self.nbytes = 0       # bytes of input data received
+
+
+class Profiler(object):
+    """Collects execution statistics for all Components run while it's
+    started, keyed by pathname.  It can be used as a context manager,
+    which starts it on entry and stops it on exit.
+
+    Components run concurrently on other threads (for example by a
+    :class:`ParallelDataflow`) are recorded, but appear at the root of the
+    trace written by :meth:`write_trace`.
+    """
+
+    _columns = ('runs', 'skipped', 'total', 'execute', 'transfer',
+                'invalidate', 'nbytes')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.clear()
+
+    def clear(self):
+        """Discard everything recorded so far."""
+        with self._lock:
+            self._stats = {}
+            self._stacks = {}  # self time keyed by tuple of pathnames
+
+    def start(self):
+        """Begin recording. Only one Profiler can be started at a time."""
+        global current
+        if current is not None and current is not self:
+            raise RuntimeError('another Profiler is already running')
+        current = self
+
+    def stop(self):
+        """Stop recording."""
+        global current
+        if current is self:
+            current = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _get(self, comp):
+        """Return the _Stats for the given Component."""
+        path = comp.get_pathname()
+        try:
+            return self._stats[path]
+        except KeyError:
+            with self._lock:
+                return self._stats.setdefault(path,
+                                              _Stats(type(comp).__name__))
+
+    # The following are called by the framework as things happen.
+
+    def run_started(self, comp):
+        """Called when `comp` starts to run."""
+        try:
+            stack = self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+        # [pathname, start time, time used by children]
+        stack.append([comp.get_pathname(), time.time(), 0.])
+
+    def run_finished(self, comp, skipped):
+        """Called when `comp` is done running."""
+        stack = self._local.stack
+        path, start, child_time = stack.pop()
+        elapsed = time.time() - start
+        if stack:
+            stack[-1][2] += elapsed
+        key = tuple([entry[0] for entry in stack]) + (path,)
+        stats = self._get(comp)
+        with self._lock:
+            stats.runs += 1
+            if skipped:
+                stats.skipped += 1
+            stats.total += elapsed
+            self._stacks[key] = self._stacks.get(key, 0.) + elapsed - child_time
+
+    def executed(self, comp, elapsed):
+        """Called after `comp` has executed, taking `elapsed` seconds."""
+        stats = self._get(comp)
+        with self._lock:
+            stats.execute += elapsed
+
+    def transferred(self, comp, elapsed):
+        """Called after input data for `comp` has been transferred from its
+        parent, taking `elapsed` seconds.
+        """
+        stats = self._get(comp)
+        with self._lock:
+            stats.transfer += elapsed
+
+    def received(self, comp, values):
+        """Called when the given input values are set on `comp` by its
+        parent.
+        """
+        nbytes = sum([_sizeof(val) for val in values])
+        stats = self._get(comp)
+        with self._lock:
+            stats.nbytes += nbytes
+
+    def invalidated(self, comp, elapsed):
+        """Called after invalidation resulting from a change to the inputs
+        of `comp`, taking `elapsed` seconds.
+        """
+        stats = self._get(comp)
+        with self._lock:
+            stats.invalidate += elapsed
+
+    # Reporting.
+
+    def stats(self):
+        """Return a dict of dicts of recorded statistics keyed by
+        Component pathname.
+        """
+        with self._lock:
+            result = {}
+            for path, stats in self._stats.items():
+                entry = dict([(name, getattr(stats, name))
+                                  for name in self._columns])
+                entry['class'] = stats.classname
+                result[path] = entry
+            return result
+
+    def report(self, out=sys.stdout, sort='total'):
+        """Write a table of recorded statistics to `out`, sorted in
+        decreasing order of column `sort`. Times are in seconds.
+        """
+        if sort not in self._columns:
+            raise ValueError("can't sort by '%s', must be one of %s"
+                             % (sort, self._columns))
+        stats = self.stats()
+        rows = sorted(stats.items(), key=lambda item: item[1][sort],
+                      reverse=True)
+        width = max([len(path) for path in stats] + [len('component')])
+        out.write('%-*s %8s %8s %10s %10s %10s %10s %12s  %s\n'
+                  % ((width, 'component') + self._columns + ('class',)))
+        for path, entry in rows:
+            out.write('%-*s %8d %8d %10.4f %10.4f %10.4f %10.4f %12d  %s\n'
+                      % (width, path or '<top>', entry['runs'],
+                         entry['skipped'], entry['total'], entry['execute'],
+                         entry['transfer'], entry['invalidate'],
+                         entry['nbytes'], entry['class']))
+
+    def write_trace(self, out):
+        """Write recorded self times in the 'folded stacks' format read by
+        flame graph tools (one line per call stack, of the form
+        ``top;top.driver;top.comp1 <microseconds>``).
+        """
+        with self._lock:
+            items = sorted(self._stacks.items())
+        for stack, elapsed in items:
+            names = [path or '<top>' for path in stack]
+            out.write('%s %d\n' % (';'.join(names), int(elapsed * 1e6)))
+
+
+def _sizeof(value):
+    """Return an estimate of the number of bytes of data in `value`."""
+    if isinstance(value, AttrWrapper):
+        value = value.value
+    if isinstance(value, ndarray):
+        return value.nbytes
+    if isinstance(value, (float, int, long)):
+        return 8
+    if isinstance(value, basestring):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum([_sizeof(val) for val in value])
+    return sys.getsizeof(value)
@@ -0,0 +1,256 @@
+"""
+Benchmarks for the framework core.
+
+Builds synthetic models of various sizes and shapes and times model setup
+(add/connect), per-iteration driver overhead, CaseIteratorDriver
+throughput, DBCaseRecorder inserts, and Container save/load. Results can be
+saved to a file and later runs compared against them to catch regressions::
+
+    python coreperf.py --save before.json
+    ... make changes ...
+    python coreperf.py --compare before.json
+
+Every result is a time in seconds, so smaller is always better.
+"""
+
+import cStringIO
+import gc
+import json
+import sys
+import time
+from optparse import OptionParser
+
+from openmdao.main.api import Assembly, Case, Component, Driver, \
+                              Container, set_as_top, SAVE_CPICKLE
+from openmdao.lib.datatypes.api import Float
+from openmdao.lib.casehandlers.api import DBCaseRecorder, ListCaseIterator, \
+                                          ListCaseRecorder
+from openmdao.lib.drivers.api import CaseIteratorDriver
+
+
+class Adder(Component):
+    """ Cheap component: y = x + 1. """
+
+    x = Float(0., iotype='in')
+    y = Float(0., iotype='out')
+
+    def execute(self):
+        self.y = self.x + 1.
+
+
+class Looper(Driver):
+    """ Runs its workflow `count` times, changing the input of component
+    `first` (if not None) before each iteration.
+    """
+
+    def __init__(self, count, first=None):
+        super(Looper, self).__init__()
+        self.count = count
+        self.first = first
+
+    def execute(self):
+        scope = self.parent
+        for i in range(self.count):
+            if self.first is not None:
+                setattr(getattr(scope, self.first), 'x', float(i))
+            self.run_iteration()
+
+
+def chain(asm, n, prefix='c'):
+    """ Add a chain of `n` Adders to `asm`. Returns their names. """
+    names = ['%s%d' % (prefix, i) for i in range(n)]
+    for name in names:
+        asm.add(name, Adder())
+    for i in range(1, n):
+        asm.connect('%s.y' % names[i-1], '%s.x' % names[i])
+    asm.driver.workflow.add(names)
+    return names
+
+
+def fan(asm, n):
+    """ Add one Adder feeding `n` others. Returns their names. """
+    asm.add('src', Adder())
+    names = ['c%d' % i for i in range(n)]
+    for name in names:
+        asm.add(name, Adder())
+        asm.connect('src.y', '%s.x' % name)
+    asm.driver.workflow.add(['src'] + names)
+    return ['src'] + names
+
+
+def nested(asm, levels, width=2):
+    """ Nest `levels` Assemblies, each having its own driver, a chain of
+    `width` Adders, and passthroughs connecting the chain to the next level.
+    """
+    names = chain(asm, width)
+    if levels > 1:
+        sub = asm.add('sub', Assembly())
+        nested(sub, levels-1, width)
+        sub.create_passthrough('c0.x')
+        sub.create_passthrough('c%d.y' % (width-1))
+        asm.connect('%s.y' % names[-1], 'sub.x')
+        asm.driver.workflow.add('sub')
+    return names
+
+
+def timed(func, *args):
+    """ Return wall time used by `func(*args)`. """
+    gc.collect()
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def bench_setup(results, size):
+    """ Time model construction. """
+    for shape in (chain, fan):
+        results['setup.%s.%d' % (shape.__name__, size)] = \
+            timed(shape, set_as_top(Assembly()), size)
+    levels = max(size / 100, 2)
+    results['setup.nested.%d' % levels] = \
+        timed(nested, set_as_top(Assembly()), levels)
+
+
+def bench_iteration(results, size, iterations):
+    """ Time per iteration of a Driver, with everything changing each
+    iteration and with nothing changing.
+    """
+    for shape in (chain, fan):
+        for change in (True, False):
+            top = set_as_top(Assembly())
+            top.add('driver', Looper(iterations))
+            names = shape(top, size)
+            top.run()
+            top.driver.first = names[0] if change else None
+            key = 'iteration.%s.%d.%s' % (shape.__name__, size,
+                                         'changed' if change else 'valid')
+            results[key] = timed(top.run) / iterations
+
+    levels = max(size / 100, 2)
+    top = set_as_top(Assembly())
+    top.add('driver', Looper(iterations))
+    names = nested(top, levels)
+    top.run()
+    top.driver.first = names[0]
+    results['iteration.nested.%d.changed' % levels] = \
+        timed(top.run) / iterations
+
+
+def bench_caseiter(results, size, ncases):
+    """ Time per case of a sequential CaseIteratorDriver. """
+    top = set_as_top(Assembly())
+    top.add('driver', CaseIteratorDriver())
+    names = chain(top, size)
+    cases = [Case(inputs=[('%s.x' % names[0], float(i))],
+                  outputs=['%s.y' % names[-1]]) for i in range(ncases)]
+    top.driver.iterator = ListCaseIterator(cases)
+    top.driver.recorder = ListCaseRecorder()
+    results['caseiter.chain.%d' % size] = timed(top.run) / ncases
+
+
+def bench_recorder(results, nvars, ncases):
+    """ Time per case recorded by a DBCaseRecorder. """
+    inputs = [('comp.x%d' % i, float(i)) for i in range(nvars)]
+    outputs = ['comp.y%d' % i for i in range(nvars)]
+    cases = []
+    for i in range(ncases):
+        case = Case(inputs=inputs, outputs=outputs)
+        for name in outputs:
+            case[name] = float(i)
+        cases.append(case)
+    recorder = DBCaseRecorder()
+
+    def record():
+        for case in cases:
+            recorder.record(case)
+
+    results['recorder.db.%d' % nvars] = timed(record) / ncases
+
+
+def bench_save_load(results, size):
+    """ Time to save and load a model. """
+    top = set_as_top(Assembly())
+    chain(top, size)
+    top.run()
+    stream = cStringIO.StringIO()
+    results['save.chain.%d' % size] = timed(top.save, stream, SAVE_CPICKLE)
+    stream.seek(0)
+    results['load.chain.%d' % size] = timed(Container.load, stream,
+                                            SAVE_CPICKLE)
+
+
+def run_all(sizes, iterations, ncases):
+    """ Run all benchmarks, returning a dict of times keyed by name. """
+    results = {}
+    for size in sizes:
+        bench_setup(results, size)
+        bench_iteration(results, size, iterations)
+        bench_caseiter(results, size, ncases)
+        bench_save_load(results, size)
+    for nvars in (1, 10, 100):
+        bench_recorder(results, nvars, ncases)
+    return results
+
+
+def compare(results, baseline, tolerance, out=sys.stdout):
+    """ Write a comparison of `results` against `baseline` and return
+    the names of benchmarks that are slower by more than `tolerance`.
+    """
+    regressions = []
+    out.write('%-32s %12s %12s %8s\n' % ('benchmark', 'baseline', 'current',
+                                         'ratio'))
+    for name in sorted(results):
+        current = results[name]
+        if name not in baseline:
+            out.write('%-32s %12s %12.6f\n' % (name, '-', current))
+            continue
+        base = baseline[name]
+        ratio = current / base if base else 1.
+        flag = ''
+        if ratio > 1. + tolerance:
+            flag = '  SLOWER'
+            regressions.append(name)
+        out.write('%-32s %12.6f %12.6f %8.2f%s\n'
+                  % (name, base, current, ratio, flag))
+    return regressions
+
+
+def main():
+    """ Run the benchmarks, optionally saving and comparing results. """
+    parser = OptionParser()
+    parser.add_option('--sizes', default='10,100,400',
+                      help='comma separated list of model sizes')
+    parser.add_option('--iterations', type='int', default=200,
+                      help='number of driver iterations to time')
+    parser.add_option('--cases', type='int', default=500,
+                      help='number of cases to run or record')
+    parser.add_option('--save', metavar='FILE',
+                      help='save results to FILE')
+    parser.add_option('--compare', metavar='FILE',
+                      help='compare results with those saved in FILE')
+    parser.add_option('--tolerance', type='float', default=0.2,
+                      help='fractional slowdown considered a regression')
+    options, args = parser.parse_args()
+
+    sizes = [int(size) for size in options.sizes.split(',')]
+    results = run_all(sizes, options.iterations, options.cases)
+
+    if options.save:
+        with open(options.save, 'w') as out:
+            json.dump(results, out, indent=1, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare, 'r') as inp:
+            baseline = json.load(inp)
+        regressions = compare(results, baseline, options.tolerance)
+        if regressions:
+            print '\n%d regressions' % len(regressions)
+            return 1
+    else:
+        for name in sorted(results):
+            print '%-32s %12.6f' % (name, results[name])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Compare setup time of connecting large DependencyGraphs using the
+incrementally maintained topological order against a full acyclic check
+of the graph on every new edge (what :meth:`DependencyGraph.connect` used
+to do).
+"""
+
+import sys
+import time
+
+from networkx.algorithms.dag import is_directed_acyclic_graph
+
+from openmdao.main.depgraph import DependencyGraph, _Link
+
+
+def chain(n):
+    """ Connections for a chain of `n` components, added in reverse. """
+    return [('c%d.y' % (i-1), 'c%d.x' % i) for i in range(n-1, 0, -1)]
+
+def wide(n):
+    """ Connections from one source to `n` sinks that feed one summer. """
+    conns = []
+    for i in range(n):
+        conns.append(('src.y', 'c%d.x' % i))
+        conns.append(('c%d.y' % i, 'sum.x%d' % i))
+    return conns
+
+def _names(conns):
+    names = set()
+    for src, dest in conns:
+        names.add(src.split('.')[0])
+        names.add(dest.split('.')[0])
+    return sorted(names)
+
+
+def incremental(conns):
+    """ Connect using the incremental topological order. """
+    dep = DependencyGraph()
+    for name in _names(conns):
+        dep.add(name)
+    start = time.time()
+    for src, dest in conns:
+        dep.connect(src, dest)
+    return time.time() - start
+
+def full_check(conns):
+    """ Connect, checking the whole graph for cycles on each new edge. """
+    dep = DependencyGraph()
+    for name in _names(conns):
+        dep.add(name)
+    graph = dep._graph
+    start = time.time()
+    for src, dest in conns:
+        srccomp, srcvar = src.split('.')
+        destcomp, destvar = dest.split('.')
+        try:
+            link = graph[srccomp][destcomp]['link']
+        except KeyError:
+            link = _Link(srccomp, destcomp)
+            graph.add_edge(srccomp, destcomp, link=link)
+            if not is_directed_acyclic_graph(graph):
+                raise RuntimeError('cycle')
+        link.connect(srcvar, destvar)
+    return time.time() - start
+
+
+def main():
+    """ Print setup times for various model shapes and sizes. """
+    sizes = [100, 200, 400, 800, 1600]
+    if len(sys.argv) > 1:
+        sizes = [int(arg) for arg in sys.argv[1:]]
+    print '%-6s %6s %12s %12s' % ('shape', 'size', 'incremental', 'full check')
+    for shape in (chain, wide):
+        for size in sizes:
+            conns = shape(size)
+            print '%-6s %6d %12.4f %12.4f' % (shape.__name__, size,
+                                              incremental(conns),
+                                              full_check(conns))
+
+
+if __name__ == '__main__':
+    main()
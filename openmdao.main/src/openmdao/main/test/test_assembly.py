@@ -2,8 +2,10 @@
 
 import unittest
 
+from numpy import array
+
 from openmdao.main.api import Assembly, Component, Driver, set_as_top
-from openmdao.lib.datatypes.api import Float, Str, Slot, List
+from openmdao.lib.datatypes.api import Float, Str, Slot, List, Array
 from openmdao.util.decorators import add_delegate
 from openmdao.main.hasobjective import HasObjective
 
@@ -78,6 +80,22 @@ class DummyComp(Component):
         # pylint: disable-msg=E1101
         self.dummy.execute()
 
+class UnitsComp(Component):
+    
+    temp = Float(0., iotype='in', units='degC')
+    tempf = Float(32., iotype='in', units='degF')
+    length = Float(0., iotype='in', units='ft')
+    lengths = Array(array([0., 0.]), iotype='in', units='ft')
+    tempout = Float(0., iotype='out', units='degC')
+    lengthout = Float(0., iotype='out', units='inch')
+    lengthsout = Array(array([0., 0.]), iotype='out', units='inch')
+    
+    def execute(self):
+        self.tempout = self.temp
+        self.lengthout = self.length * 12.
+        self.lengthsout = self.lengths * 12.
+
+
 class AssemblyTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -429,6 +447,32 @@ class AssemblyTestCase(unittest.TestCase):
         self.asm.run()
         
             
+    def test_unit_conversion(self):
+        top = set_as_top(Assembly())
+        top.add('comp1', UnitsComp())
+        top.add('comp2', UnitsComp())
+        top.driver.workflow.add(['comp1', 'comp2'])
+        top.connect('comp1.lengthout', 'comp2.length')
+        top.connect('comp1.lengthsout', 'comp2.lengths')
+        top.create_passthrough('comp1.temp')
+        top.connect('comp1.tempout', 'comp2.tempf')
+        conv = top._depgraph.get_link('comp1', 'comp2')._convs['length']
+        self.assertEqual(conv, (1./12., 0., 'ft'))
+        
+        top.comp1.length = 2.
+        top.comp1.lengths = array([1., 3.])
+        top.temp = 100.
+        top.run()
+        self.assertAlmostEqual(top.comp2.length, 2.)
+        self.assertAlmostEqual(top.comp2.lengths[0], 1.)
+        self.assertAlmostEqual(top.comp2.lengths[1], 3.)
+        self.assertEqual(list(top.comp1.lengthsout), [12., 36.])
+        self.assertAlmostEqual(top.comp2.tempf, 212.)
+        
+        top.disconnect('comp1.lengthout', 'comp2.length')
+        self.assertEqual(sorted(top._depgraph.get_link('comp1', 'comp2')._convs),
+                         ['lengths', 'tempf'])
+            
     def test_assembly_connect_init(self):
         class MyComp(Component):
             ModulesInstallPath  = Str('', desc='', iotype='in')
@@ -451,6 +495,36 @@ class AssemblyTestCase(unittest.TestCase):
         self.assertEqual(asm.ModulesInstallPath, 'C:/work/IMOO2/imoo/modules')
         self.assertEqual(asm.propulsion.ModulesInstallPath, 'C:/work/IMOO2/imoo/modules')
 
+    def test_run_case(self):
+        top = set_as_top(Assembly())
+        top.add('comp', Simple())
+        top.driver.workflow.add('comp')
+        self.assertEqual(top.run_case([('comp.a', 2.), ('comp.b', 3.)],
+                                      ['comp.c', 'comp.d', 'comp.c*2']),
+                         [5., -1., 10.])
+        self.assertEqual(top.comp.a, 2.)
+        try:
+            top.run_case([('comp.z', 2.)], ['comp.c'])
+        except AttributeError as err:
+            self.assertEqual(str(err), "comp: object has no attribute 'z'")
+        else:
+            self.fail('AttributeError expected')
+
+    def test_run_case_forced(self):
+        top = set_as_top(Assembly())
+        top.add('comp1', Simple())
+        top.add('comp2', Simple())
+        top.connect('comp1.c', 'comp2.a')
+        top.driver.workflow.add('comp2')
+        top.run()
+        self.assertEqual(top.comp2.a, 9.)
+
+        # comp1 isn't run here, its new output is forced into comp2.
+        top.comp1.a = 100.
+        self.assertEqual(top.run_case([('comp2.b', 1.)], ['comp2.c'],
+                                      forced=[('comp2.a', 10.)]), [11.])
+        self.assertEqual(top.comp1.c, 9.)
+
         
 if __name__ == "__main__":
     unittest.main()
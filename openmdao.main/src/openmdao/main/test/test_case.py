@@ -1,7 +1,8 @@
 import unittest
 import copy
 
-from openmdao.main.api import Component, Assembly, Case, set_as_top
+from openmdao.main.api import Component, Assembly, Case, CaseBlock, set_as_top
+from openmdao.main.case import _get_plan
 from openmdao.lib.datatypes.api import Int, List
 
 class Simple(Component):
@@ -123,6 +124,87 @@ class CaseTestCase(unittest.TestCase):
         for name, val in expected.items():
             self.assertTrue(name in both)
             self.assertEqual(val, both[name])
+
+    def test_uuid(self):
+        case = Case(inputs=self.inputs)
+        uuid = case.uuid
+        self.assertEqual(case.uuid, uuid)
+        self.assertNotEqual(Case(inputs=self.inputs).uuid, uuid)
+        try:
+            case.foo = 1
+        except AttributeError:
+            pass
+        else:
+            self.fail('AttributeError expected')
+        case2 = copy.deepcopy(case)
+        self.assertEqual(case2.uuid, uuid)
+        self.assertEqual(case2, case)
+        
+    def test_case_block(self):
+        block = CaseBlock(['comp1.a', 'comp1.b'], outputs=self.outputs)
+        for i in range(5):
+            block.append([i, i*2])
+        self.assertEqual(len(block), 5)
+        self.assertEqual(list(block['comp1.b']), [0, 2, 4, 6, 8])
+        
+        for i, case in enumerate(block):
+            self.assertEqual(case['comp1.a'], i)
+            self.assertTrue(isinstance(case['comp1.a'], int))
+            case.apply_inputs(self.top)
+            self.top.run()
+            case.update_outputs(self.top)
+            self.assertEqual(case['comp2.c+comp2.d'], 6*i)
+            self.assertEqual(case['comp2.d'], 2*i)
+        self.assertEqual(block[-1]['comp1.b'], 8)
+        self.assertNotEqual(block[0].uuid, block[0].uuid)
+        
+        block = CaseBlock(['x'], [[1., 2.], [3., 4.]], outputs=['y'])
+        case = block[1]
+        self.assertEqual(case.items(), [('x', 3.), ('y', 4.)])
+        try:
+            block[2]
+        except IndexError, err:
+            self.assertEqual(str(err), 'CaseBlock index out of range')
+        else:
+            self.fail('IndexError expected')
+
+        # Mixed values aren't all converted to strings.
+        block = CaseBlock(['name', 'x'], [['a', 1.5]])
+        block.append(['b', 2])
+        self.assertEqual(block[0].items(), [('name', 'a'), ('x', 1.5)])
+        self.assertEqual(block[1]['x'], 2)
+        self.assertEqual(list(block['name']), ['a', 'b'])
+
+    def test_plans(self):
+        inputs = [('comp1.a', 3), ('comp1.b', 1), ('comp1.a_lst[1]', 7)]
+        outputs = ['comp2.c+comp2.d', 'comp2.c_lst[1]', 'comp1.c']
+        cases = [Case(inputs=inputs, outputs=outputs) for i in range(2)]
+        for case in cases:
+            case.apply_inputs(self.top)
+            self.top.run()
+            case.update_outputs(self.top)
+            self.assertEqual(self.top.comp1.a_lst, [4, 7, 6])
+            self.assertEqual(case['comp2.c+comp2.d'], 8)
+            self.assertEqual(case['comp2.c_lst[1]'], 28)
+            self.assertEqual(case['comp1.c'], 4)
+        names = tuple(cases[0].keys(iotype='in'))
+        self.assertTrue(_get_plan(self.top, names) is 
+                        _get_plan(self.top, tuple(cases[1].keys(iotype='in'))))
+        
+        # a connected input can't be set
+        case = Case(inputs=[('comp2.a', 1)])
+        try:
+            case.apply_inputs(self.top)
+        except RuntimeError, err:
+            self.assertTrue('is connected to source' in str(err))
+        else:
+            self.fail('RuntimeError expected')
+        
+        # plans find the current owners, so a replaced component is used
+        self.top.add('comp1', Simple())
+        cases[0].apply_inputs(self.top)
+        self.assertEqual(self.top.comp1.a, 3)
+        self.assertEqual(self.top.comp1.a_lst, [1, 7, 3])
         
 
 if __name__ == "__main__":
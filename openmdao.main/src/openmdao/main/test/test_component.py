@@ -2,6 +2,7 @@
 Test of Component.
 """
 
+import cPickle
 import logging
 import os.path
 import sys
@@ -13,6 +14,7 @@ from nose import SkipTest
 from openmdao.main.api import Component, Container
 from openmdao.lib.datatypes.api import Float
 from openmdao.main.container import _get_entry_group
+from openmdao.main.component import _ValidFlags
 
 
 class MyComponent(Component):
@@ -53,6 +55,35 @@ class TestCase(unittest.TestCase):
         newvalids = comp.get_valid(['x','xout'])
         self.assertEqual(newvalids, [True, True])
 
+    def test_validity_tracking(self):
+        comp = self.comp
+        comp.connect('parent.foo', 'x')
+        self.assertEqual(comp.list_inputs(valid=False), ['x'])
+        self.assertEqual(comp.list_inputs(valid=False, connected=False), [])
+        self.assertEqual(comp.list_outputs(valid=False), ['xout'])
+        self.assertEqual(comp.is_valid(), False)
+        
+        comp.set_valid(['x', 'xout'], True)
+        comp._call_execute = False
+        self.assertEqual(comp.is_valid(), True)
+        self.assertEqual(comp.list_inputs(valid=False), [])
+        self.assertEqual(comp.list_outputs(valid=False), [])
+        self.assertEqual(sorted(comp.list_inputs(valid=True)), 
+                         sorted(comp.list_inputs()))
+        
+        comp.invalidate_deps(['x'])
+        self.assertEqual(comp._valid_dict.invalid, set(['x', 'xout']))
+        
+        for protocol in (0, -1):
+            valids = cPickle.loads(cPickle.dumps(comp._valid_dict, protocol))
+            self.assertEqual(valids.items(), comp._valid_dict.items())
+            self.assertEqual(valids.invalid, set(['x', 'xout']))
+            
+        valids = _ValidFlags({'a': True, 'b': False})
+        del valids['b']
+        self.assertEqual(valids.invalid, set())
+        self.assertEqual(valids.keys(), ['a'])
+
     def test_connect(self):
         comp = self.comp
         
@@ -211,6 +211,28 @@ class ContainerTestCase(unittest.TestCase):
         num = self.root.get('c2.c22.c221.number')
         self.assertEqual(num, 3.14)
 
+    def test_multiget_multiset(self):
+        c221 = self.root.c2.c22.c221
+        c221.add('other', Float(1., iotype='in'))
+        self.assertEqual(c221.get_wrapped_attrs(['number', 'other']),
+                         [3.14, 1.])
+        self.root.c2.multiset(['c22.c221.number', 'c22.c221.other'], [1.5, 2.5])
+        self.assertEqual(c221.number, 1.5)
+        self.assertEqual(c221.other, 2.5)
+        
+        c221.connect('parent.foo', 'other')
+        try:
+            c221.multiset(['number', 'other'], [4., 5.])
+        except RuntimeError as err:
+            self.assertEqual(str(err), "c2.c22.c221: 'other' is connected to "
+                                       "source 'parent.foo' and cannot be set "
+                                       "by source 'None'")
+        else:
+            self.fail('RuntimeError expected')
+        c221.multiset(['number', 'other'], [4., 5.], force=True)
+        self.assertEqual(c221.number, 4.)
+        self.assertEqual(c221.other, 5.)
+
     def test_add_trait_w_subtrait(self):
         obj = Container()
         obj.add('lst', List([1,2,3], iotype='in'))
@@ -7,6 +7,16 @@ _fakes = ['@xin', '@bin', '@bout', '@xout']
 nodes = ['A', 'B', 'C', 'D']
 
 
+class _Invalidatable(object):
+    """Records calls to invalidate_deps."""
+    def __init__(self):
+        self.calls = []
+        
+    def invalidate_deps(self, varnames=None, force=False):
+        self.calls.append(sorted(varnames))
+        return None
+    
+
 class DepGraphTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -203,6 +213,123 @@ class DepGraphTestCase(unittest.TestCase):
         dep.connect('C.d', 'F.a')
         self.assertEqual(dep.find_all_connecting('A','F'), set(['A','B','C','F']))
         
+    def test_topological_order(self):
+        dep = DependencyGraph()
+        for node in ['F','E','D','C','B','A']:
+            dep.add(node)
+        dep.connect('A.c', 'B.a')
+        dep.connect('B.c', 'C.a')
+        dep.connect('C.d', 'D.a')
+        dep.connect('D.d', 'E.a')
+        dep.connect('A.d', 'F.b')
+        dep.connect('parent.X.c', 'A.b')
+        dep.connect('E.d', 'parent.Y.a')
+        order = dep.topological_sort()
+        for u,v in dep._graph.edges():
+            self.assertTrue(order.index(u) < order.index(v))
+        self.assertEqual(dep.topological_sort(['E','A','C']), ['A','C','E'])
+        
+        # disconnecting keeps the order valid, reconnecting the other way
+        # reorders
+        version = dep.version
+        dep.disconnect('B.c', 'C.a')
+        self.assertNotEqual(dep.version, version)
+        dep.connect('C.c', 'B.b')
+        order = dep.topological_sort()
+        for u,v in dep._graph.edges():
+            self.assertTrue(order.index(u) < order.index(v))
+            
+        # adding a var connection to an existing link doesn't change
+        # the version
+        version = dep.version
+        dep.connect('C.x', 'B.y')
+        self.assertEqual(dep.version, version)
+            
+    def test_cycle(self):
+        dep = DependencyGraph()
+        for node in ['A','B','C']:
+            dep.add(node)
+        dep.connect('A.c', 'B.a')
+        dep.connect('B.c', 'C.a')
+        try:
+            dep.connect('C.c', 'A.a')
+        except RuntimeError as err:
+            self.assertTrue(str(err).startswith('circular dependency'))
+            self.assertTrue(str(err).endswith('would be created by connecting C.c to A.a'))
+        else:
+            self.fail('RuntimeError expected')
+        self.assertEqual(dep.get_link('C', 'A'), None)
+        order = dep.topological_sort()
+        self.assertTrue(order.index('A') < order.index('B') < order.index('C'))
+        
+    def test_in_plan(self):
+        plan = self.dep.in_plan('B')
+        self.assertEqual(sorted([(u, srcs, dests, scopesrcs)
+                                 for u,srcs,dests,destset,scopesrcs,convs in plan]),
+                         [('@bin', ['B.b'], ['b'], ['parent.X.d']),
+                          ('A', ['c'], ['a'], ['c'])])
+        self.assertTrue(self.dep.in_plan('B') is plan)
+        self.assertEqual(list(self.dep.in_transfers('B', set(['b']))),
+                         [('@bin', ['B.b'], ['b'], ['parent.X.d'], None)])
+        self.assertEqual(list(self.dep.in_map('B', set(['a', 'x']))),
+                         [('A', ['c'], ['a'])])
+
+        # plan is recompiled when connections change
+        self.dep.connect('C.c', 'B.x')
+        plan = self.dep.in_plan('B')
+        self.assertEqual(sorted([(u, srcs, dests) for u,srcs,dests,ds,ss,cs in plan]),
+                         [('@bin', ['B.b'], ['b']), ('A', ['c'], ['a']),
+                          ('C', ['c'], ['x'])])
+        self.dep.disconnect('A.c', 'B.a')
+        plan = self.dep.in_plan('B')
+        self.assertEqual(sorted([u for u,srcs,dests,ds,ss,cs in plan]), ['@bin', 'C'])
+        self.dep.remove('C')
+        self.assertEqual([u for u,srcs,dests,ds,ss,cs in self.dep.in_plan('B')],
+                         ['@bin'])
+
+        # unit conversions are part of the plan
+        self.dep.connect('D.c', 'B.y')
+        self.dep.connect('D.d', 'B.z')
+        self.dep.set_conversion('D.c', 'B.y', (2., 0., 'ft'))
+        self.assertEqual(list(self.dep.in_transfers('B', set(['y', 'z']))),
+                         [('D', ['c', 'd'], ['y', 'z'], ['c', 'd'], 
+                           [(2., 0., 'ft'), None])])
+        self.assertEqual(list(self.dep.in_transfers('B', set(['z']))),
+                         [('D', ['d'], ['z'], ['d'], [None])])
+        self.dep.disconnect('D.c', 'B.y')
+        self.assertEqual(list(self.dep.in_transfers('B', set(['z']))),
+                         [('D', ['d'], ['z'], ['d'], None)])
+
+    def test_invalidate_deps(self):
+        # diamond: A -> (B, C) -> D -> boundary
+        dep = DependencyGraph()
+        scope = _Invalidatable()
+        for name in ['D', 'C', 'B', 'A']:
+            dep.add(name)
+            setattr(scope, name, _Invalidatable())
+        dep.connect('A.x', 'B.a')
+        dep.connect('A.x', 'C.a')
+        dep.connect('B.y', 'D.b')
+        dep.connect('C.y', 'D.c')
+        dep.connect('D.z', 'out')
+        self.assertEqual(dep.downstream('B'), ['B', 'D', '@bout'])
+        
+        outs = dep.invalidate_deps(scope, ['A'], [['x']])
+        self.assertEqual(outs, set(['out']))
+        self.assertEqual(scope.B.calls, [['a']])
+        self.assertEqual(scope.C.calls, [['a']])
+        # D is only invalidated once, after both of its inputs are known
+        self.assertEqual(scope.D.calls, [['b', 'c']])
+        self.assertEqual(scope.A.calls, [])
+        
+        # reachability is updated when the graph changes
+        dep.disconnect('A.x', 'B.a')
+        self.assertEqual(dep.invalidate_deps(scope, ['A'], [['x']]), 
+                         set(['out']))
+        self.assertEqual(scope.B.calls, [['a']])
+        self.assertEqual(scope.D.calls, [['b', 'c'], ['c']])
+        self.assertEqual(dep.downstream('A'), ['A', 'C', 'D', '@bout'])
+
     def test_dump(self):
         s = StringIO.StringIO()
         self.dep.dump(s)
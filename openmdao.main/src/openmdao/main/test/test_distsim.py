@@ -138,14 +138,13 @@ class BoxDriver(Driver):
                     volume, area = self.eval_objectives()
                     self._logger.debug('    v,a %s, %s', volume, area)
 
-                    case = Case()
-                    case.inputs = [('width', None, width),
-                                   ('height', None, height),
-                                   ('depth', None, depth)]
-                    case.outputs = [('volume', None, volume),
-                                    ('area', None, area),
-                                    ('pid', None, self.parent.box.pid)]
-                                   # Just to show access to remote from driver.
+                    case = Case(inputs=[('width', width),
+                                        ('height', height),
+                                        ('depth', depth)],
+                                outputs=[('volume', volume),
+                                         ('area', area),
+                                         ('pid', self.parent.box.pid)])
+                                # Just to show access to remote from driver.
                     self.recorder.record(case)
 
 
@@ -436,7 +435,7 @@ class TestCase(unittest.TestCase):
             for height in range(1, 3):
                 for depth in range(1, 4):
                     case = model.driver.recorder.cases.pop(0)
-                    self.assertEqual(case.outputs[0][2], width*height*depth)
+                    self.assertEqual(case['volume'], width*height*depth)
 
         self.assertTrue(is_instance(model.box.parent, Assembly))
         self.assertTrue(has_interface(model.box.parent, IComponent))
@@ -530,7 +529,7 @@ class TestCase(unittest.TestCase):
             for height in range(1, 3):
                 for depth in range(1, 4):
                     case = model.driver.recorder.cases.pop(0)
-                    self.assertEqual(case.outputs[0][2], width*height*depth)
+                    self.assertEqual(case['volume'], width*height*depth)
 
         # Check access protections.
         try:
@@ -610,7 +609,7 @@ class TestCase(unittest.TestCase):
                 for height in range(1, 3):
                     for depth in range(1, 4):
                         case = model.driver.recorder.cases.pop(0)
-                        self.assertEqual(case.outputs[0][2], width*height*depth)
+                        self.assertEqual(case['volume'], width*height*depth)
         finally:
             if factory is not None:
                 factory.cleanup()
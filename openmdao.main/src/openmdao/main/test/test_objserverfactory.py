@@ -14,6 +14,7 @@ import nose
 
 from openmdao.main.objserverfactory import ObjServerFactory, ObjServer, \
                                            start_server
+from openmdao.util.filexfer import send_file
 from openmdao.util.testutil import assert_raises
 
 
@@ -166,6 +167,16 @@ class TestCase(unittest.TestCase):
             finally:
                 inp.close()
 
+            # Send a file in chunks, then again (nothing sent).
+            self.assertEqual(send_file('fred', server, 'fred2', compress=True),
+                             (12, 12))
+            self.assertEqual(send_file('fred', server, 'fred3'), (12, 0))
+            with server.open('fred3', 'r') as inp:
+                self.assertEqual(inp.read(), 'Hello fred!\n')
+            assert_raises(self, "send_file('fred', server, '../fred')",
+                          globals(), locals(), RuntimeError,
+                          "Can't assemble_file '../fred', not within root ")
+
             # Try to create a process.
             args = 'dir' if sys.platform == 'win32' else 'ls'
             try:
@@ -0,0 +1,177 @@
+"""
+Test concurrent execution of a ParallelDataflow.
+"""
+
+import os
+import shutil
+import sys
+import time
+import traceback
+import unittest
+
+from openmdao.main.api import Assembly, Component, ParallelDataflow, set_as_top
+from openmdao.main.exceptions import RunStopped
+from openmdao.lib.datatypes.api import Float, Bool
+
+
+class Sleeper(Component):
+    """Sleeps for a while, then outputs its input plus one."""
+
+    x = Float(0., iotype='in')
+    delay = Float(0.2, iotype='in')
+    fail = Bool(False, iotype='in')
+    y = Float(0., iotype='out')
+
+    def __init__(self):
+        super(Sleeper, self).__init__()
+        self.start = None
+        self.end = None
+        self.runcount = 0
+
+    def execute(self):
+        self.start = time.time()
+        time.sleep(self.delay)
+        if self.fail:
+            self.raise_exception('failed on purpose', RuntimeError)
+        self.y = self.x + 1.
+        self.runcount += 1
+        self.end = time.time()
+
+
+class Summer(Component):
+    """Outputs the sum of its inputs."""
+
+    a = Float(0., iotype='in')
+    b = Float(0., iotype='in')
+    c = Float(0., iotype='in')
+    total = Float(0., iotype='out')
+
+    def execute(self):
+        self.total = self.a + self.b + self.c
+
+
+class Stopper(Component):
+    """Stops its parent's driver."""
+
+    x = Float(0., iotype='in')
+    y = Float(0., iotype='out')
+
+    def execute(self):
+        self.y = self.x
+        self.parent.driver.stop()
+
+
+def _build(max_workers=None):
+    """Diamond: src -> (b1, b2, b3) -> sink."""
+    top = set_as_top(Assembly())
+    top.driver.workflow = ParallelDataflow(max_workers=max_workers)
+    top.add('src', Sleeper())
+    top.src.delay = 0.
+    for name in ('b1', 'b2', 'b3'):
+        top.add(name, Sleeper())
+        top.connect('src.y', '%s.x' % name)
+    top.add('sink', Summer())
+    top.connect('b1.y', 'sink.a')
+    top.connect('b2.y', 'sink.b')
+    top.connect('b3.y', 'sink.c')
+    top.driver.workflow.add(['sink', 'b3', 'b2', 'b1', 'src'])
+    return top
+
+
+class ParallelDataflowTestCase(unittest.TestCase):
+
+    def test_concurrent(self):
+        top = _build()
+        top.driver.workflow.max_workers = 3
+        start = time.time()
+        top.run()
+        elapsed = time.time() - start
+        self.assertEqual(top.sink.total, 6.)
+        # Branches overlapped.
+        latest_start = max(top.b1.start, top.b2.start, top.b3.start)
+        earliest_end = min(top.b1.end, top.b2.end, top.b3.end)
+        self.assertTrue(latest_start < earliest_end)
+        self.assertTrue(elapsed < 0.5)
+        # Sink ran after all branches.
+        self.assertEqual(top.get_valid(['sink.total']), [True])
+
+    def test_revalidation(self):
+        top = _build(max_workers=3)
+        top.run()
+        counts = [top.b1.runcount, top.b2.runcount, top.b3.runcount]
+        top.run()  # Nothing invalid, nothing runs.
+        self.assertEqual([top.b1.runcount, top.b2.runcount, top.b3.runcount],
+                         counts)
+        top.src.x = 10.
+        self.assertEqual(top.get_valid(['b2.x', 'sink.total']), [False, False])
+        top.run()
+        self.assertEqual(top.sink.total, 36.)
+        self.assertEqual([top.b1.runcount, top.b2.runcount, top.b3.runcount],
+                         [c+1 for c in counts])
+
+    def test_serial(self):
+        top = _build(max_workers=1)
+        top.run()
+        self.assertEqual(top.sink.total, 6.)
+
+    def test_exception(self):
+        top = _build(max_workers=3)
+        top.b2.fail = True
+        try:
+            top.run()
+        except RuntimeError as err:
+            self.assertEqual(str(err), 'b2: failed on purpose')
+            # Traceback is from the worker thread.
+            funcs = [entry[2] for entry in
+                     traceback.extract_tb(sys.exc_info()[2])]
+            self.assertEqual(funcs[-2:], ['execute', 'raise_exception'])
+        else:
+            self.fail('RuntimeError expected')
+        # Other branches were allowed to finish, sink never ran.
+        self.assertEqual(top.b1.runcount, 1)
+        self.assertEqual(top.b3.runcount, 1)
+        self.assertEqual(top.get_valid(['sink.total']), [False])
+
+    def test_stop(self):
+        top = _build(max_workers=3)
+        top.add('stopper', Stopper())
+        top.connect('src.y', 'stopper.x')
+        top.driver.workflow.add('stopper')
+        try:
+            top.run()
+        except RunStopped as err:
+            self.assertEqual(str(err), 'Stop requested')
+        else:
+            self.fail('RunStopped expected')
+        self.assertEqual(top.get_valid(['sink.total']), [False])
+
+    def test_directory_exclusive(self):
+        top = _build(max_workers=3)
+        os.mkdir('b2_dir')
+        top.b2.directory = 'b2_dir'
+        try:
+            top.run()
+            self.assertEqual(top.sink.total, 6.)
+            # b2 didn't overlap anything else.
+            for other in (top.b1, top.b3):
+                self.assertTrue(other.end <= top.b2.start or
+                                top.b2.end <= other.start)
+        finally:
+            shutil.rmtree('b2_dir', ignore_errors=True)
+
+    def test_force_execute_exclusive(self):
+        top = _build(max_workers=3)
+        top.b2.force_execute = True
+        top.run()
+        self.assertEqual(top.sink.total, 6.)
+        for other in (top.b1, top.b3):
+            self.assertTrue(other.end <= top.b2.start or
+                            top.b2.end <= other.start)
+
+
+if __name__ == '__main__':
+    import nose
+    import sys
+    sys.argv.append('--cover-package=openmdao')
+    sys.argv.append('--cover-erase')
+    nose.runmodule()
@@ -0,0 +1,74 @@
+"""
+Test ProcessWorker.
+"""
+
+import os
+import unittest
+
+from openmdao.main.api import Assembly, Component, set_as_top
+from openmdao.main.procworker import ProcessWorker, pickle_model
+from openmdao.lib.datatypes.api import Float
+
+
+class Adder(Component):
+
+    x = Float(iotype='in')
+    y = Float(iotype='in')
+    z = Float(iotype='out')
+    pid = Float(iotype='out')
+    runs = Float(iotype='out')
+
+    def execute(self):
+        if self.x < 0:
+            self.raise_exception('negative x', ValueError)
+        self.z = self.x + self.y
+        self.pid = os.getpid()
+        self.runs += 1
+
+
+class ProcessWorkerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        top = set_as_top(Assembly())
+        top.add('comp', Adder())
+        top.driver.workflow.add('comp')
+        top.comp.y = 10.
+        self.worker = ProcessWorker(pickle_model(top), 'test_worker')
+
+    def tearDown(self):
+        self.worker.close()
+
+    def test_run_case(self):
+        worker = self.worker
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(worker.run_case([('comp.x', 1.)], ['comp.z']), [11.])
+        z, pid, runs = worker.run_case([('comp.x', 2.)],
+                                       ['comp.z', 'comp.pid', 'comp.runs'])
+        self.assertEqual(z, 12.)
+        self.assertEqual(pid, worker.pid)
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(runs, 2.)
+
+        worker.load()
+        self.assertEqual(worker.run_case([('comp.x', 3.)], ['comp.runs']), [1.])
+
+        try:
+            worker.run_case([('comp.x', -1.)], ['comp.z'])
+        except ValueError as err:
+            self.assertEqual(str(err), 'comp: negative x')
+        else:
+            self.fail('ValueError expected')
+        self.assertEqual(worker.run_case([('comp.x', 4.)], ['comp.z']), [14.])
+
+        worker.close()
+        self.assertFalse(worker.is_alive())
+        try:
+            worker.run_case([('comp.x', 4.)], ['comp.z'])
+        except RuntimeError as err:
+            self.assertEqual(str(err), 'test_worker has been closed')
+        else:
+            self.fail('RuntimeError expected')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Test of the execution Profiler.
+"""
+
+import StringIO
+import unittest
+
+from numpy import zeros
+
+from openmdao.main.api import Assembly, Component, set_as_top
+from openmdao.main import profiler
+from openmdao.main.profiler import Profiler
+from openmdao.lib.datatypes.api import Float, Array
+
+
+class Source(Component):
+    x = Float(1., iotype='in')
+    y = Float(0., iotype='out')
+    arr = Array(zeros(100), iotype='out')
+
+    def execute(self):
+        self.y = self.x * 2.
+        self.arr = zeros(100) + self.x
+
+
+class Sink(Component):
+    y = Float(0., iotype='in')
+    arr = Array(zeros(100), iotype='in')
+    z = Float(0., iotype='out')
+
+    def execute(self):
+        self.z = self.y + self.arr.sum()
+
+
+def _build():
+    top = set_as_top(Assembly())
+    top.add('src', Source())
+    top.add('sink', Sink())
+    top.connect('src.y', 'sink.y')
+    top.connect('src.arr', 'sink.arr')
+    top.driver.workflow.add(['src', 'sink'])
+    return top
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        profiler.current = None
+
+    def test_stats(self):
+        top = _build()
+        prof = Profiler()
+        with prof:
+            self.assertTrue(profiler.current is prof)
+            top.run()
+            top.run()  # nothing invalid, so src and sink are skipped
+            top.src.x = 3.
+            top.run()
+        self.assertEqual(profiler.current, None)
+        self.assertEqual(top.sink.z, 306.)
+
+        stats = prof.stats()
+        self.assertEqual(stats['src']['runs'], 3)
+        self.assertEqual(stats['src']['skipped'], 1)
+        self.assertEqual(stats['src']['class'], 'Source')
+        self.assertEqual(stats['sink']['runs'], 3)
+        self.assertEqual(stats['sink']['skipped'], 1)
+        self.assertEqual(stats['sink']['nbytes'], 2 * (8 + 800))
+        self.assertTrue(stats['src']['invalidate'] > 0.)
+        self.assertTrue(stats['sink']['transfer'] > 0.)
+        self.assertTrue(stats['driver']['total'] >= stats['sink']['total'])
+        self.assertTrue(stats['']['total'] >= stats['driver']['total'])
+
+        out = StringIO.StringIO()
+        prof.report(out, sort='runs')
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split()[:3], ['component', 'runs', 'skipped'])
+        self.assertEqual(len(lines), 5)
+
+        out = StringIO.StringIO()
+        prof.write_trace(out)
+        stacks = [line.split()[0] for line in out.getvalue().splitlines()]
+        self.assertTrue('<top>;driver;sink' in stacks)
+
+        prof.clear()
+        self.assertEqual(prof.stats(), {})
+
+    def test_disabled(self):
+        top = _build()
+        prof = Profiler()
+        top.run()
+        self.assertEqual(prof.stats(), {})
+
+    def test_one_at_a_time(self):
+        prof = Profiler()
+        prof.start()
+        try:
+            Profiler().start()
+        except RuntimeError as err:
+            self.assertEqual(str(err), 'another Profiler is already running')
+        else:
+            self.fail('RuntimeError expected')
+        finally:
+            prof.stop()
+
+    def test_bad_sort(self):
+        try:
+            Profiler().report(StringIO.StringIO(), sort='foo')
+        except ValueError as err:
+            self.assertTrue(str(err).startswith("can't sort by 'foo'"))
+        else:
+            self.fail('ValueError expected')
+
+
+if __name__ == '__main__':
+    import nose
+    import sys
+    sys.argv.append('--cover-package=openmdao')
+    sys.argv.append('--cover-erase')
+    nose.runmodule()
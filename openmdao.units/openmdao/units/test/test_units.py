@@ -471,6 +471,26 @@ class test__PhysicalQuantity(unittest.TestCase):
         x.convert_to_unit('psf')
         self.assertEqual(x,units.PhysicalQuantity('144.0psf'))
         
+    def test_array_values(self):
+        """quantities holding arrays convert and compare elementwise"""
+        
+        x = units.PhysicalQuantity(numpy.array([1., 2., 3.]), 'ft')
+        x.convert_to_unit('inch')
+        self.assertTrue(numpy.allclose(x.value, [12., 24., 36.]))
+        
+        y = units.PhysicalQuantity(numpy.array([0., 100.]), 'degC')
+        self.assertTrue(numpy.allclose(y.in_units_of('degF').value, [32., 212.]))
+        
+        z = units.PhysicalQuantity(numpy.array([1., 2., 3.]), 'ft')
+        self.assertEqual(list(z == units.PhysicalQuantity('2 ft')),
+                         [False, True, False])
+        self.assertEqual(list(z < units.PhysicalQuantity('30 inch')),
+                         [True, True, False])
+        self.assertEqual(list(z >= units.PhysicalQuantity('2 ft')),
+                         [False, True, True])
+        self.assertTrue(numpy.allclose((z + units.PhysicalQuantity('12 inch')).value,
+                                       [2., 3., 4.]))
+
     def test_in_units_of(self):
         """in_units_of should return a new PhysicalQuantity with the requested unit, leaving the old unit as it was"""
 
@@ -703,6 +723,34 @@ class test__PhysicalUnit(unittest.TestCase):
 
 
 class test__moduleFunctions(unittest.TestCase):        
+    def test_convert_units(self):
+        self.assertAlmostEqual(units.convert_units(3., 'ft', 'inch'), 36.)
+        self.assertAlmostEqual(units.convert_units(100., 'degC', 'degF'), 212.)
+        arr = numpy.array([0., 100.])
+        result = units.convert_units(arr, 'degC', 'degF')
+        self.assertTrue(numpy.allclose(result, [32., 212.]))
+        self.assertEqual(list(arr), [0., 100.])
+        try:
+            units.convert_units(1., 'ft', 'kg')
+        except TypeError,err:
+            self.assertEqual(str(err),'Incompatible units')
+        else: 
+            self.fail("TypeError expected")
+            
+    def test_get_conversion_tuple(self):
+        factor, offset = units.get_conversion_tuple('ft', 'inch')
+        self.assertAlmostEqual(factor, 12.)
+        self.assertEqual(offset, 0.)
+        self.assertEqual(units.get_conversion_tuple(u'm/s', 'm/s'), (1., 0.))
+        factor, offset = units.get_conversion_tuple('degC', 'degF')
+        self.assertAlmostEqual((100.+offset)*factor, 212.)
+        self.assertTrue(('ft', 'inch') in units.units._conversion_cache)
+        # Redefining a unit the same way leaves the table unchanged.
+        units.add_unit('ft', units.units._unit_lib.unit_table['ft'])
+        self.assertEqual(units.units._conversion_cache, {})
+        self.assertAlmostEqual(units.convert_units(1., 'ft', 'inch'), 12.)
+        
+
     def test_add_unit(self):
         try:
             units.add_unit('ft','20*m')
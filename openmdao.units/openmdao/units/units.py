@@ -156,6 +156,28 @@ class PhysicalQuantity(object):
     def __cmp__(self, other):
         diff = self._sum(other, 1, -1)
         return cmp(diff.value, 0)
+
+    # The rich comparisons work on the values directly, so a quantity 
+    # holding a numpy array compares elementwise, returning an array 
+    # of bools.
+    
+    def __eq__(self, other):
+        return self._sum(other, 1, -1).value == 0
+  
+    def __ne__(self, other):
+        return self._sum(other, 1, -1).value != 0
+  
+    def __lt__(self, other):
+        return self._sum(other, 1, -1).value < 0
+  
+    def __le__(self, other):
+        return self._sum(other, 1, -1).value <= 0
+  
+    def __gt__(self, other):
+        return self._sum(other, 1, -1).value > 0
+  
+    def __ge__(self, other):
+        return self._sum(other, 1, -1).value >= 0
   
     def __mul__(self, other):
         if not isinstance(other, PhysicalQuantity):
@@ -212,7 +234,9 @@ class PhysicalQuantity(object):
     def convert_value(self, target_unit):
         """Converts the values of the PQ to the target_unit."""
         (factor, offset) = self.unit.conversion_tuple_to(target_unit)
-        return (self.value + offset) * factor
+        if offset:
+            return (self.value + offset) * factor
+        return self.value * factor
 
     def convert_to_unit(self, unit):
         """
@@ -533,11 +557,12 @@ class PhysicalUnit(object):
 
 #Helper Functions
 
-_unit_cache = {}
+_unit_cache = {}        # parsed units, keyed by unit string
+_conversion_cache = {}  # conversion tuples, keyed by pair of unit strings
 
 def _find_unit(unit):
     """Find unit helper function."""
-    if isinstance(unit, str):
+    if isinstance(unit, basestring):
         name = unit.strip()
         try:
             unit = _unit_cache[name]
@@ -598,6 +623,7 @@ def add_offset_unit(name, baseunit, factor, offset, comment=''):
                             "different factor or powers"
     _unit_lib.unit_table[name] = unit
     _unit_lib.set('units', name, unit)   
+    _conversion_cache.clear()
     if comment: 
         _unit_lib.help.append((name, comment, unit))
         
@@ -617,6 +643,7 @@ def add_unit(name, unit, comment=''):
         
     _unit_lib.unit_table[name] = unit
     _unit_lib.set('units', name, unit)
+    _conversion_cache.clear()
 
 
 _unit_lib = ConfigParser.ConfigParser()
@@ -633,6 +660,7 @@ def import_library(libfilepointer):
     global _unit_lib 
     global _unit_cache
     _unit_cache = {}
+    _conversion_cache.clear()
     _unit_lib = ConfigParser.ConfigParser()
     _unit_lib.optionxform = do_nothing
     _unit_lib.readfp(libfilepointer)
@@ -728,11 +756,26 @@ def import_library(libfilepointer):
 
 def convert_units(value, units, convunits):
     """Return the given value (given in units) converted 
-    to convunits.
+    to convunits. The value may be a numpy array, in which case the
+    whole array is converted at once.
+    """
+    factor, offset = get_conversion_tuple(units, convunits)
+    if offset:
+        return (value + offset) * factor
+    return value * factor
+
+def get_conversion_tuple(units, convunits):
+    """Return the tuple (factor, offset) such that (value+offset)*factor
+    converts a value (or numpy array of values) given in units 
+    to convunits. Tuples are cached, so the unit strings are only parsed
+    the first time a given pair is seen.
     """
-    pq = PhysicalQuantity(value, units)
-    pq.convert_to_unit(convunits)
-    return pq.value
+    try:
+        return _conversion_cache[(units, convunits)]
+    except KeyError:
+        conv = _find_unit(units).conversion_tuple_to(_find_unit(convunits))
+        _conversion_cache[(units, convunits)] = conv
+        return conv
     
 
 try:
@@ -0,0 +1,172 @@
+"""
+A content-addressed store of file chunks.  A file is sent to a server
+having a :class:`BlobStore` by sending the SHA-1 digests of its chunks,
+then only the chunks the store doesn't already have (see
+:func:`openmdao.util.filexfer.send_file`).  Resending an unchanged file
+sends no chunks, and resending a slightly changed one (e.g., a new egg of
+a model with a small edit) sends only the chunks around the change.
+
+Files are split where a hash of a sliding window of bytes matches a
+pattern rather than at fixed offsets, so inserting or deleting data only
+changes the chunks near the change rather than every chunk after it.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import zlib
+
+import numpy
+
+__all__ = ['BlobStore', 'iter_chunks', 'digest']
+
+_WINDOW = 48              # Bytes in the sliding window.
+_MASK = (1 << 16) - 1     # Boundary where window hash & mask is 0.
+_MIN_CHUNK = 1 << 14      # 16KB.
+_MAX_CHUNK = 1 << 18      # 256KB.
+_BLOCK = 1 << 22          # Read 4MB at a time.
+
+# A key is the hex SHA-1 digest of a chunk, so it's also a safe file name.
+_KEY_RE = re.compile(r'[0-9a-f]{40}\Z')
+
+# Random value for each byte, summed over the window.  Computed rather than
+# generated so every host gets the same table.
+_TABLE = numpy.array([int(hashlib.md5(chr(i)).hexdigest()[:15], 16)
+                      for i in range(256)], dtype=numpy.uint64)
+
+
+def _cuts(data):
+    """Return offsets at which to split `data`.  The last piece may be
+    shorter than the minimum chunk size.
+    """
+    size = len(data)
+    if size <= _WINDOW:
+        return []
+    sums = numpy.cumsum(_TABLE[numpy.frombuffer(data, dtype=numpy.uint8)],
+                        dtype=numpy.uint64)
+    # Hash of the window ending just before each offset (wraps around).
+    hashes = sums[_WINDOW-1:-1] - \
+             numpy.concatenate((numpy.zeros(1, numpy.uint64),
+                                sums[:-_WINDOW-1]))
+    candidates = numpy.nonzero((hashes & _MASK) == 0)[0] + _WINDOW
+
+    cuts = []
+    start = 0
+    for pos in candidates:
+        while pos - start > _MAX_CHUNK:
+            start += _MAX_CHUNK
+            cuts.append(start)
+        if pos - start >= _MIN_CHUNK:
+            cuts.append(pos)
+            start = pos
+    while size - start > _MAX_CHUNK:
+        start += _MAX_CHUNK
+        cuts.append(start)
+    return cuts
+
+
+def iter_chunks(stream):
+    """Generates the chunks of the data read from `stream`."""
+    data = ''
+    while True:
+        block = stream.read(_BLOCK)
+        if not block:
+            break
+        data += block
+        start = 0
+        for cut in _cuts(data):
+            yield data[start:cut]
+            start = cut
+        data = data[start:]
+    if data:
+        yield data
+
+
+def digest(data):
+    """Return the key of chunk `data`."""
+    return hashlib.sha1(data).hexdigest()
+
+
+class BlobStore(object):
+    """Stores chunks in `directory`, named by the SHA-1 digest of their
+    data.  Chunks are written atomically, so several processes may share a
+    directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        """Return path to the chunk for `key`.  Raises ValueError if `key`
+        isn't a key, so a key from a client can't name another file.
+        """
+        if not isinstance(key, basestring) or not _KEY_RE.match(key):
+            raise ValueError('invalid chunk key %r' % (key,))
+        return os.path.join(self.directory, key[:2], key)
+
+    def missing_chunks(self, keys):
+        """Return the keys of the given chunks which aren't stored."""
+        missing = []
+        for key in keys:
+            if key not in missing and not os.path.exists(self._path(key)):
+                missing.append(key)
+        return missing
+
+    def put_chunks(self, chunks):
+        """Store `chunks`, a list of ``(key, data, compressed)``.  If
+        `compressed` is True, `data` was compressed by :func:`zlib.compress`.
+        """
+        for key, data, compressed in chunks:
+            if compressed:
+                data = zlib.decompress(data)
+            if digest(data) != key:
+                raise ValueError('chunk %s is corrupt' % key)
+            path = self._path(key)
+            if os.path.exists(path):
+                continue
+            dirname = os.path.dirname(path)
+            if not os.path.exists(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    if not os.path.isdir(dirname):  # Not just a race.
+                        raise
+            fd, tmp = tempfile.mkstemp(dir=dirname)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            try:
+                os.rename(tmp, path)
+            except OSError:  # Windows won't replace an existing file.
+                os.remove(tmp)
+                if not os.path.exists(path):
+                    raise
+
+    def get_chunk(self, key):
+        """Return the data of the chunk for `key`."""
+        with open(self._path(key), 'rb') as inp:
+            return inp.read()
+
+    def assemble_file(self, path, keys, mode=None):
+        """Write file `path` from the chunks for `keys`, creating any
+        missing directories, and set its permission bits to `mode` if it
+        isn't None.  Returns the size of the file.
+        """
+        missing = self.missing_chunks(keys)
+        if missing:
+            raise ValueError("can't assemble %r, %d chunks are missing"
+                             % (path, len(missing)))
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        size = 0
+        with open(path, 'wb') as out:
+            for key in keys:
+                data = self.get_chunk(key)
+                out.write(data)
+                size += len(data)
+        if mode is not None:
+            os.chmod(path, mode)
+        return size
@@ -2,7 +2,9 @@ import glob
 import os
 import sys
 import zipfile
+import zlib
 
+from openmdao.util.blobstore import iter_chunks, digest
 from openmdao.util.log import NullLogger
 
 
@@ -69,6 +71,69 @@ def filexfer(src_server, src_path, dst_server, dst_path, mode=''):
         dst_server.chmod(dst_path, mode)
 
 
+def send_file(src_path, dst_server, dst_path, compress=False,
+              batch_size=1 << 20):
+    """
+    Transfer local file `src_path` to `dst_path` on `dst_server`, sending
+    only the chunks of the file which `dst_server` doesn't already have.
+    `dst_server` must support the methods of
+    :class:`openmdao.util.blobstore.BlobStore`, as :class:`ObjServer` does.
+    The permission bits of `dst_path` are set to those of `src_path`.
+    Returns ``(nbytes, nsent)``, the size of the file written by
+    `dst_server` and the number of bytes of chunk data sent.
+
+    src_path: string
+        Path to local file.
+
+    dst_server: Proxy
+        Host to put file to.
+
+    dst_path: string
+        Path to file on `dst_server`.
+
+    compress: bool
+        If True, chunks are compressed with :mod:`zlib` when that makes
+        them smaller.
+
+    batch_size: int
+        Chunks are sent in batches of about this many bytes.
+    """
+    # Read the file twice rather than keep it all in memory.
+    with open(src_path, 'rb') as inp:
+        keys = [digest(chunk) for chunk in iter_chunks(inp)]
+    missing = set(dst_server.missing_chunks(keys))
+
+    nsent = 0
+    if missing:
+        batch = []
+        size = 0
+        with open(src_path, 'rb') as inp:
+            for key, chunk in zip(keys, iter_chunks(inp)):
+                if key not in missing:
+                    continue
+                missing.remove(key)
+                compressed = False
+                if compress:
+                    data = zlib.compress(chunk)
+                    if len(data) < len(chunk):
+                        chunk = data
+                        compressed = True
+                batch.append((key, chunk, compressed))
+                size += len(chunk)
+                if size >= batch_size:
+                    dst_server.put_chunks(batch)
+                    nsent += size
+                    batch = []
+                    size = 0
+        if batch:
+            dst_server.put_chunks(batch)
+            nsent += size
+
+    nbytes = dst_server.assemble_file(dst_path, keys,
+                                      os.stat(src_path).st_mode)
+    return (nbytes, nsent)
+
+
 def pack_zipfile(patterns, filename, logger=NullLogger):
     """
     Create 'zip' file `filename` of files in `patterns`.
@@ -0,0 +1,128 @@
+"""
+Test BlobStore and send_file().
+"""
+
+import cStringIO
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy
+
+from openmdao.util.blobstore import BlobStore, iter_chunks, digest
+from openmdao.util.filexfer import send_file
+
+
+class BlobStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.startdir = os.getcwd()
+        self.tempdir = tempfile.mkdtemp()
+        os.chdir(self.tempdir)
+        self.store = BlobStore('blobs')
+        rand = numpy.random.RandomState(10)
+        self.data = rand.randint(0, 256, 2000000).astype(numpy.uint8).tostring()
+
+    def tearDown(self):
+        os.chdir(self.startdir)
+        shutil.rmtree(self.tempdir)
+
+    def write(self, path, data):
+        with open(path, 'wb') as out:
+            out.write(data)
+
+    def read(self, path):
+        with open(path, 'rb') as inp:
+            return inp.read()
+
+    def test_chunks(self):
+        chunks = list(iter_chunks(cStringIO.StringIO(self.data)))
+        self.assertEqual(''.join(chunks), self.data)
+        self.assertTrue(len(chunks) > 5)
+        self.assertTrue(max([len(chunk) for chunk in chunks]) <= 1 << 18)
+
+        # An insertion only changes the chunk it's in.
+        edited = self.data[:1000000] + 'inserted' + self.data[1000000:]
+        old = set([digest(chunk) for chunk in chunks])
+        new = [digest(chunk)
+               for chunk in iter_chunks(cStringIO.StringIO(edited))]
+        self.assertEqual(len([key for key in new if key not in old]), 1)
+
+        self.assertEqual(list(iter_chunks(cStringIO.StringIO(''))), [])
+        self.assertEqual(list(iter_chunks(cStringIO.StringIO('abc'))), ['abc'])
+
+    def test_send_file(self):
+        self.write('model.egg', self.data)
+        os.chmod('model.egg', 0640)
+        nbytes, nsent = send_file('model.egg', self.store, 'copy/model.egg')
+        self.assertEqual(nbytes, len(self.data))
+        self.assertEqual(nsent, len(self.data))
+        self.assertEqual(self.read('copy/model.egg'), self.data)
+        if sys.platform != 'win32':
+            self.assertEqual(os.stat('copy/model.egg').st_mode & 0777, 0640)
+
+        # Unchanged file sends nothing.
+        nbytes, nsent = send_file('model.egg', self.store, 'copy2.egg')
+        self.assertEqual((nbytes, nsent), (len(self.data), 0))
+        self.assertEqual(self.read('copy2.egg'), self.data)
+
+        # Changed file sends only the chunks around the change.
+        edited = self.data[:500000] + 'x' + self.data[500010:]
+        self.write('model.egg', edited)
+        nbytes, nsent = send_file('model.egg', self.store, 'copy/model.egg')
+        self.assertEqual(nbytes, len(edited))
+        self.assertTrue(0 < nsent < len(edited) / 4)
+        self.assertEqual(self.read('copy/model.egg'), edited)
+
+    def test_compress(self):
+        text = 'Some compressible input, line %d\n' * 1000
+        self.write('input.txt', text)
+        nbytes, nsent = send_file('input.txt', self.store, 'copy.txt',
+                                  compress=True)
+        self.assertEqual(nbytes, len(text))
+        self.assertTrue(nsent < len(text) / 10)
+        self.assertEqual(self.read('copy.txt'), text)
+
+    def test_errors(self):
+        key = digest('chunk')
+        self.assertEqual(self.store.missing_chunks([key, key]), [key])
+        try:
+            self.store.put_chunks([(key, 'tampered', False)])
+        except ValueError as exc:
+            self.assertEqual(str(exc), 'chunk %s is corrupt' % key)
+        else:
+            self.fail('ValueError expected')
+
+        try:
+            self.store.assemble_file('out', [key])
+        except ValueError as exc:
+            self.assertEqual(str(exc),
+                             "can't assemble 'out', 1 chunks are missing")
+        else:
+            self.fail('ValueError expected')
+
+        # Keys can't name other files.
+        self.write('secret', 'chunk')
+        for bad in (os.path.abspath('secret'), '../secret', key.upper(),
+                    key + '\n', None):
+            for method, args in ((self.store.missing_chunks, ([bad],)),
+                                 (self.store.assemble_file, ('out', [bad])),
+                                 (self.store.get_chunk, (bad,))):
+                try:
+                    method(*args)
+                except ValueError as exc:
+                    self.assertEqual(str(exc), 'invalid chunk key %r' % (bad,))
+                else:
+                    self.fail('ValueError expected')
+
+        self.store.put_chunks([(key, 'chunk', False)])
+        self.store.put_chunks([(key, 'chunk', False)])  # Already stored.
+        self.assertEqual(self.store.missing_chunks([key]), [])
+        self.assertEqual(self.store.assemble_file('out', [key, key]), 10)
+        self.assertEqual(self.read('out'), 'chunkchunk')
+
+
+if __name__ == '__main__':
+    unittest.main()